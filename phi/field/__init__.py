@@ -48,9 +48,11 @@ from ._field_math import (
     pack_dims,
     support, mask,
     safe_mul,
+    axpy,
     # connect, connect_neighbors,
 )
 from ._field_io import write, read
+from ._codecs import Codec, Float16, BFloat16, Quantize, BlockTransform
 from ._scene import Scene
 
 __all__ = [key for key in globals().keys() if not key.startswith('_')]
@@ -0,0 +1,235 @@
+"""
+Incremental checkpointing of simulation states within a `Scene`.
+
+Checkpoints are stored in the `checkpoints` sub-directory of a scene.
+Every `keyframe_interval`-th checkpoint is a *keyframe* holding the full state.
+All other checkpoints are *deltas* that only store the chunks of the data that changed since the last keyframe, XOR-ed with the keyframe data.
+Unchanged bits of the XOR result are zero which makes deltas of slowly-changing states compress well.
+"""
+import atexit
+import os
+import queue
+import re
+import threading
+from os.path import join, isdir
+from typing import Optional, Tuple, List
+
+import numpy as np
+
+from phiml.math._magic_ops import all_attributes
+from phiml.math._tensors import disassemble_tree, assemble_tree, assemble_tensors, attr_paths, serialize_spec, unserialize_spec
+from phiml.backend import choose_backend
+
+
+CHECKPOINT_DIR = 'checkpoints'
+_FILE_PATTERN = re.compile(r"ckpt_(\d+)\.(key|delta)\.npz")
+
+
+def checkpoint_frames(scene_path: str) -> Tuple[Tuple[int, bool], ...]:
+    """
+    Lists the checkpoints stored in a scene directory.
+
+    Returns:
+        Sorted `tuple` of `(frame, is_keyframe)`.
+    """
+    directory = join(scene_path, CHECKPOINT_DIR)
+    if not isdir(directory):
+        return ()
+    matches = [_FILE_PATTERN.fullmatch(f) for f in os.listdir(directory)]
+    return tuple(sorted((int(m.group(1)), m.group(2) == 'key') for m in matches if m))
+
+
+def restore_checkpoint(scene_path: str, frame: int = None):
+    """
+    Reconstructs the state stored by `SceneCheckpointer.save()`.
+
+    Args:
+        scene_path: Scene directory.
+        frame: Frame to restore. If `None`, restores the latest checkpoint.
+
+    Returns:
+        State with the same structure as the saved one. All tensors are backed by NumPy.
+    """
+    frames = dict(checkpoint_frames(scene_path))
+    if not frames:
+        raise FileNotFoundError(f"No checkpoints stored in {scene_path}")
+    if frame is None:
+        frame = max(frames)
+    if frame not in frames:
+        raise FileNotFoundError(f"No checkpoint for frame {frame} in {scene_path}. Available: {tuple(frames)}")
+    with np.load(_checkpoint_file(scene_path, frame, frames[frame]), allow_pickle=True) as stored:
+        tree = stored['tree'].tolist()
+        specs = [unserialize_spec(spec) for spec in stored['specs'].tolist()]
+        count = int(stored['count'])
+        if frames[frame]:
+            arrays = [stored[f'array_{i}'] for i in range(count)]
+        else:
+            keyframe = int(stored['keyframe'])
+            with np.load(_checkpoint_file(scene_path, keyframe, True), allow_pickle=True) as key:
+                arrays = [_apply_delta(stored, key, i) for i in range(count)]
+    tensors = assemble_tensors(arrays, specs)
+    return assemble_tree(tree, tensors, attr_type=all_attributes)
+
+
+class SceneCheckpointer:
+    """
+    Stores simulation states incrementally in a `Scene`. Create checkpointers using `Scene.checkpointer()`.
+
+    The state is copied to host memory when `save()` is called.
+    Computing the delta, compressing and writing happens on a background thread.
+    Errors raised on the background thread are re-raised by the next call to `save()`, `flush()` or `close()`.
+    """
+
+    def __init__(self, scene_path: str, keyframe_interval=10, chunk_bytes=1 << 16, keep_recent=2, keep_old_keyframes: Optional[int] = 8, background=True):
+        assert keyframe_interval >= 1 and keep_recent >= 1
+        self.path = scene_path
+        self.keyframe_interval = keyframe_interval
+        self.chunk_bytes = chunk_bytes
+        self.keep_recent = keep_recent
+        self.keep_old_keyframes = keep_old_keyframes
+        os.makedirs(join(scene_path, CHECKPOINT_DIR), exist_ok=True)
+        self._keyframe: Optional[Tuple[int, List[np.ndarray]]] = None
+        self._since_keyframe = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=2) if background else None
+        if background:
+            self._thread = threading.Thread(target=self._work, name="SceneCheckpointer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def save(self, state, frame: int):
+        """
+        Stores `state` as the checkpoint of `frame`.
+
+        Args:
+            state: `Tensor`, `Field` or any other tree of tensors, e.g. a `tuple` of velocity, pressure and particles.
+            frame: Frame number, must increase with each call.
+        """
+        self._raise_error()
+        assert not self._closed, "SceneCheckpointer has already been closed"
+        tree, tensors = disassemble_tree(state, False, all_attributes)
+        paths = attr_paths(state, all_attributes, 'root')
+        specs = [serialize_spec(t._spec_dict()) for t in tensors]
+        arrays = [np.array(choose_backend(n).numpy(n), copy=True) for t in tensors for n in t._natives()]
+        item = (frame, tree, specs, paths, arrays)
+        if self._queue is None:
+            self._write(*item)
+        else:
+            self._queue.put(item)
+
+    def flush(self):
+        """ Blocks until all checkpoints have been written. """
+        if self._queue is not None:
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """ Writes all pending checkpoints and stops the background thread. """
+        if self._closed:
+            return
+        self._closed = True
+        if self._queue is not None:
+            atexit.unregister(self.close)
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    self._write(*item)
+            except BaseException as exc:
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _write(self, frame: int, tree, specs, paths, arrays: List[np.ndarray]):
+        is_key = self._keyframe is None or self._since_keyframe >= self.keyframe_interval - 1 or not _compatible(self._keyframe[1], arrays)
+        header = dict(tree=np.asarray(tree, dtype=object), specs=specs, paths=paths, count=len(arrays))
+        file = _checkpoint_file(self.path, frame, is_key)
+        if is_key:
+            _save(file, header, {f'array_{i}': a for i, a in enumerate(arrays)})
+            self._keyframe = (frame, arrays)
+            self._since_keyframe = 0
+            self._apply_retention()
+        else:
+            key_frame, key_arrays = self._keyframe
+            deltas = {}
+            for i, (array, key) in enumerate(zip(arrays, key_arrays)):
+                deltas.update(_delta(array, key, self.chunk_bytes, i))
+            _save(file, dict(header, keyframe=key_frame, chunk_bytes=self.chunk_bytes), deltas)
+            self._since_keyframe += 1
+
+    def _apply_retention(self):
+        """ Keeps all checkpoints of the `keep_recent` latest keyframes. Of older keyframes, keeps at most `keep_old_keyframes` evenly spaced ones and removes their deltas. """
+        frames = checkpoint_frames(self.path)
+        keyframes = [f for f, is_key in frames if is_key]
+        if len(keyframes) <= self.keep_recent:
+            return
+        oldest_recent = keyframes[-self.keep_recent]
+        old_keyframes = keyframes[:-self.keep_recent]
+        if self.keep_old_keyframes is not None and len(old_keyframes) > self.keep_old_keyframes:
+            keep = set(old_keyframes[int(round(i))] for i in np.linspace(0, len(old_keyframes) - 1, self.keep_old_keyframes)) if self.keep_old_keyframes > 0 else set()
+        else:
+            keep = set(old_keyframes)
+        for frame, is_key in frames:
+            if frame < oldest_recent and (not is_key or frame not in keep):
+                os.remove(_checkpoint_file(self.path, frame, is_key))
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            try:
+                self.close()
+            except BaseException:
+                pass  # don't mask the original error
+
+
+def _checkpoint_file(scene_path: str, frame: int, is_key: bool) -> str:
+    return join(scene_path, CHECKPOINT_DIR, f"ckpt_{frame:06d}.{'key' if is_key else 'delta'}.npz")
+
+
+def _save(file: str, header: dict, arrays: dict):
+    tmp_file = file + '.part'
+    with open(tmp_file, 'wb') as stream:
+        np.savez_compressed(stream, **header, **arrays)
+    os.replace(tmp_file, file)
+
+
+def _compatible(key_arrays: List[np.ndarray], arrays: List[np.ndarray]) -> bool:
+    return len(key_arrays) == len(arrays) and all(k.shape == a.shape and k.dtype == a.dtype for k, a in zip(key_arrays, arrays))
+
+
+def _delta(array: np.ndarray, key: np.ndarray, chunk_bytes: int, index: int) -> dict:
+    """ XOR of the bytes of all chunks of `array` that differ from `key`. """
+    data = np.ascontiguousarray(array).view(np.uint8).ravel()
+    key_data = np.ascontiguousarray(key).view(np.uint8).ravel()
+    n_chunks = -(-data.size // chunk_bytes)
+    padding = n_chunks * chunk_bytes - data.size
+    xor = np.pad(data ^ key_data, (0, padding)).reshape(n_chunks, chunk_bytes)
+    changed = np.flatnonzero(np.any(xor != 0, axis=1))
+    return {f'chunks_{index}': changed.astype(np.int64), f'xor_{index}': xor[changed]}
+
+
+def _apply_delta(stored, key, index: int) -> np.ndarray:
+    key_array = key[f'array_{index}']
+    chunk_bytes = int(stored['chunk_bytes'])
+    data = np.ascontiguousarray(key_array).view(np.uint8).ravel()
+    n_chunks = -(-data.size // chunk_bytes)
+    chunks = np.pad(data, (0, n_chunks * chunk_bytes - data.size)).reshape(n_chunks, chunk_bytes)
+    chunks[stored[f'chunks_{index}']] ^= stored[f'xor_{index}']
+    return chunks.ravel()[:data.size].view(key_array.dtype).reshape(key_array.shape)
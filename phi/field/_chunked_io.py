@@ -0,0 +1,141 @@
+"""
+Chunked, appendable storage for the frames of a single field.
+
+Instead of one `.npz` file per frame, all frames of a field are stored in a directory `<name>.chunks` containing
+
+* `meta.npz`: the frame-independent metadata written by `phi.field.write()` (field type, bounds, extrapolation, dimensions) as well as the data shape, data type and chunk size.
+* `frames.i64`: the frame index, a raw `int64` array. The i-th entry is the frame number stored at position i.
+* `chunk_XXXXXX.npy`: uncompressed NumPy arrays of shape `(chunk_size, *data_shape)` holding the data of consecutive positions.
+
+Chunks are memory-mapped for reading and writing so that single frames can be accessed without reading the whole chunk.
+"""
+import os
+import re
+from os.path import join, isdir, isfile
+from typing import Dict, Tuple, Optional
+
+import numpy as np
+
+from ._codecs import decode
+
+
+CHUNK_DIR_SUFFIX = '.chunks'
+
+
+class ChunkedFieldStore:
+    """
+    Appendable storage for all frames of one field in one scene.
+    Frames must have the same data shape, data type and metadata.
+    Writing an existing frame overwrites its data in place.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._meta = None
+        self._frame_positions = None
+
+    @property
+    def exists(self) -> bool:
+        return isfile(join(self.path, 'meta.npz'))
+
+    @property
+    def meta(self) -> Dict[str, np.ndarray]:
+        if self._meta is None:
+            with np.load(join(self.path, 'meta.npz'), allow_pickle=True) as stored:
+                self._meta = {k: stored[k] for k in stored.files}
+        return self._meta
+
+    @property
+    def chunk_size(self) -> int:
+        return int(self.meta['chunk_size'])
+
+    @property
+    def frames(self) -> Tuple[int, ...]:
+        """ Stored frame numbers in order of storage. """
+        return tuple(self._positions)
+
+    @property
+    def _positions(self) -> Dict[int, int]:
+        """ Maps stored frame numbers to their storage positions. Iterates in order of storage. """
+        if self._frame_positions is None:
+            index_file = join(self.path, 'frames.i64')
+            frames = np.fromfile(index_file, np.int64).tolist() if isfile(index_file) else []
+            self._frame_positions = {frame: position for position, frame in enumerate(frames)}
+        return self._frame_positions
+
+    def append(self, frame: int, arrays: Dict[str, np.ndarray], chunk_size=32):
+        """
+        Stores the data of `frame`.
+
+        Args:
+            frame: Frame number.
+            arrays: Data and metadata as produced by `phi.field._field_io.field_arrays()`.
+                Data written with a codec is decoded since chunks store the raw data array.
+            chunk_size: Number of frames per chunk file. Only used when the store is created.
+        """
+        if 'codec' in arrays:
+            arrays = {**{k: v for k, v in arrays.items() if k != 'codec' and not k.startswith('codec_')}, 'data': decode(arrays)}
+        data = np.asarray(arrays['data'])
+        if not self.exists:
+            os.makedirs(self.path, exist_ok=True)
+            meta = {k: v for k, v in arrays.items() if k != 'data'}
+            np.savez(join(self.path, 'meta.npz'), data_shape=data.shape, data_dtype=data.dtype.str, chunk_size=chunk_size, **meta)
+            self._meta = None
+        meta = self.meta
+        assert tuple(meta['data_shape']) == data.shape, f"All frames stored in {self.path} must have shape {tuple(meta['data_shape'])} but got {data.shape}"
+        assert tuple(meta['dim_names']) == tuple(arrays['dim_names']), f"All frames stored in {self.path} must have dimensions {tuple(meta['dim_names'])} but got {tuple(arrays['dim_names'])}"
+        positions = self._positions
+        position = positions.get(frame, len(positions))
+        chunk = self._chunk(position // self.chunk_size, mode='r+')
+        chunk[position % self.chunk_size] = data
+        chunk.flush()
+        del chunk
+        if position == len(positions):
+            with open(join(self.path, 'frames.i64'), 'ab') as index_file:
+                np.asarray([frame], np.int64).tofile(index_file)
+            positions[frame] = position
+
+    def read(self, frame: int, mmap=False) -> Dict[str, np.ndarray]:
+        """
+        Reads the data and metadata of `frame`.
+
+        Args:
+            frame: Frame number.
+            mmap: If `True`, the data is returned as a read-only view into the memory-mapped chunk file.
+                Otherwise, the data is copied into memory.
+
+        Returns:
+            `dict` with the same entries as a `.npz` file written by `phi.field.write()`.
+        """
+        if frame not in self._positions:
+            self._frame_positions = None  # another process may have appended
+        if frame not in self._positions:
+            raise FileNotFoundError(f"Frame {frame} is not stored in {self.path}")
+        position = self._positions[frame]
+        data = self._chunk(position // self.chunk_size, mode='r')[position % self.chunk_size]
+        return {**self.meta, 'data': data if mmap else np.array(data)}
+
+    def _chunk(self, index: int, mode: str) -> np.memmap:
+        file = join(self.path, f"chunk_{index:06d}.npy")
+        if not isfile(file):
+            if mode == 'r':
+                raise FileNotFoundError(file)
+            shape = (self.chunk_size, *[int(s) for s in self.meta['data_shape']])
+            return np.lib.format.open_memmap(file, mode='w+', dtype=np.dtype(str(self.meta['data_dtype'])), shape=shape)
+        return np.load(file, mmap_mode=mode)
+
+
+def chunked_fieldnames(scene_path: str) -> Tuple[str, ...]:
+    """ Names of all fields in `scene_path` that are stored in chunked format. """
+    return tuple(f[:-len(CHUNK_DIR_SUFFIX)] for f in os.listdir(scene_path) if f.endswith(CHUNK_DIR_SUFFIX) and isdir(join(scene_path, f)))
+
+
+def chunk_store_for_file(file: str) -> Tuple[Optional[ChunkedFieldStore], Optional[int]]:
+    """
+    Returns the chunked store and frame corresponding to the `.npz` file path of a field in a scene.
+    If the file name does not follow the scene format `<name>_<frame>.npz`, returns `(None, None)`.
+    """
+    directory, file_name = os.path.split(file)
+    if not re.fullmatch(r".+_\d{6}\.npz", file_name):
+        return None, None
+    return ChunkedFieldStore(join(directory, file_name[:-11] + CHUNK_DIR_SUFFIX)), int(file_name[-10:-4])
@@ -0,0 +1,191 @@
+"""
+Lossy codecs for storing field data, see `phi.field.write()`.
+
+Each codec converts the data array of a field into one or multiple arrays that are stored in place of `data`.
+The codec name and its parameters are stored alongside with keys prefixed by `codec`, so that reading does not require knowing the codec.
+"""
+from typing import Dict, Union, Sequence
+
+import numpy as np
+
+
+class Codec:
+    """
+    Base class for lossy encodings of field data.
+    Subclasses must be registered in `CODECS` by their `name` to be decodable.
+    """
+
+    name: str = None
+
+    def encode(self, data: np.ndarray, spatial_axes: Sequence[int]) -> Dict[str, np.ndarray]:
+        """
+        Args:
+            data: Data array to encode.
+            spatial_axes: Axes of `data` that correspond to spatial dimensions.
+
+        Returns:
+            Arrays to store. Keys must start with `codec_`.
+        """
+        raise NotImplementedError(self)
+
+    @staticmethod
+    def decode(stored: Dict[str, np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class Float16(Codec):
+    """ Stores the data as IEEE half-precision floats (10 mantissa bits, max value 65504). """
+
+    name = 'float16'
+
+    def encode(self, data: np.ndarray, spatial_axes: Sequence[int]) -> Dict[str, np.ndarray]:
+        return {'codec_data': data.astype(np.float16), 'codec_dtype': np.asarray(data.dtype.str)}
+
+    @staticmethod
+    def decode(stored: Dict[str, np.ndarray]) -> np.ndarray:
+        return stored['codec_data'].astype(str(stored['codec_dtype']))
+
+
+class BFloat16(Codec):
+    """ Stores the upper 16 bits of the 32-bit floats (7 mantissa bits, same range as `float32`), rounded to nearest even. """
+
+    name = 'bfloat16'
+
+    def encode(self, data: np.ndarray, spatial_axes: Sequence[int]) -> Dict[str, np.ndarray]:
+        bits = np.ascontiguousarray(data, np.float32).view(np.uint32)
+        rounded = (bits + np.uint32(0x7FFF) + ((bits >> 16) & 1)) >> 16
+        return {'codec_data': rounded.astype(np.uint16), 'codec_dtype': np.asarray(data.dtype.str)}
+
+    @staticmethod
+    def decode(stored: Dict[str, np.ndarray]) -> np.ndarray:
+        bits = stored['codec_data'].astype(np.uint32) << 16
+        return bits.view(np.float32).astype(str(stored['codec_dtype']))
+
+
+class Quantize(Codec):
+    """
+    Uniform quantization with a maximum absolute error.
+    The values are stored as the smallest unsigned integer type that can hold all quantization levels.
+    The data must not contain NaN or inf.
+    The integer values compress well when written with `compress=True`.
+    """
+
+    name = 'quantize'
+
+    def __init__(self, max_abs_error: float):
+        assert max_abs_error > 0, f"max_abs_error must be positive but got {max_abs_error}"
+        self.max_abs_error = max_abs_error
+
+    def encode(self, data: np.ndarray, spatial_axes: Sequence[int]) -> Dict[str, np.ndarray]:
+        _check_finite(data, self)
+        step = 2 * self.max_abs_error
+        offset = np.min(data) if data.size else 0
+        levels = np.rint((data - offset) / step)
+        return {'codec_data': levels.astype(_uint_type(np.max(levels) if data.size else 0)),
+                'codec_step': np.asarray(step, np.float64),
+                'codec_offset': np.asarray(offset, np.float64),
+                'codec_max_abs_error': np.asarray(self.max_abs_error),
+                'codec_dtype': np.asarray(data.dtype.str)}
+
+    @staticmethod
+    def decode(stored: Dict[str, np.ndarray]) -> np.ndarray:
+        return (stored['codec_data'] * stored['codec_step'] + stored['codec_offset']).astype(str(stored['codec_dtype']))
+
+
+class BlockTransform(Codec):
+    """
+    ZFP-style transform coding with a maximum absolute error.
+
+    The spatial axes are split into blocks of `4^d` values which are decorrelated using an orthonormal DCT-II along each spatial axis.
+    The transform coefficients are quantized uniformly with a step size `2 max_abs_error / 2^d`.
+    Since the transform is orthonormal, the error of each reconstructed value is bounded by the L2 norm of the coefficient errors of its block,
+    which guarantees the error bound.
+    Smooth data results in mostly zero coefficients that compress well when written with `compress=True`.
+    The data must not contain NaN or inf.
+    """
+
+    name = 'block_transform'
+    BLOCK = 4
+
+    def __init__(self, max_abs_error: float):
+        assert max_abs_error > 0, f"max_abs_error must be positive but got {max_abs_error}"
+        self.max_abs_error = max_abs_error
+
+    def encode(self, data: np.ndarray, spatial_axes: Sequence[int]) -> Dict[str, np.ndarray]:
+        _check_finite(data, self)
+        spatial_axes = tuple(spatial_axes)
+        step = 2 * self.max_abs_error / np.sqrt(self.BLOCK ** len(spatial_axes))
+        padded = np.pad(data.astype(np.float64), [(0, -s % self.BLOCK if i in spatial_axes else 0) for i, s in enumerate(data.shape)], mode='edge')
+        coefficients = _block_transform(padded, spatial_axes, _dct_matrix(self.BLOCK))
+        levels = np.rint(coefficients / step)
+        max_level = np.max(np.abs(levels)) if levels.size else 0
+        return {'codec_data': levels.astype(_int_type(max_level)),
+                'codec_shape': np.asarray(data.shape),
+                'codec_spatial_axes': np.asarray(spatial_axes, np.int64),
+                'codec_step': np.asarray(step, np.float64),
+                'codec_max_abs_error': np.asarray(self.max_abs_error),
+                'codec_dtype': np.asarray(data.dtype.str)}
+
+    @staticmethod
+    def decode(stored: Dict[str, np.ndarray]) -> np.ndarray:
+        spatial_axes = tuple(int(a) for a in stored['codec_spatial_axes'])
+        coefficients = stored['codec_data'] * stored['codec_step']
+        padded = _block_transform(coefficients, spatial_axes, _dct_matrix(BlockTransform.BLOCK).T)
+        return padded[tuple(slice(0, int(s)) for s in stored['codec_shape'])].astype(str(stored['codec_dtype']))
+
+
+CODECS = {c.name: c for c in [Float16, BFloat16, Quantize, BlockTransform]}
+
+
+def as_codec(codec: Union[str, Codec]) -> Codec:
+    """ Converts codec names `'float16'` and `'bfloat16'` to `Codec` objects. """
+    if isinstance(codec, str):
+        assert codec in ('float16', 'bfloat16'), f"Codec '{codec}' requires parameters. Pass a Codec object instead, e.g. Quantize(max_abs_error=1e-3)"
+        return CODECS[codec]()
+    assert isinstance(codec, Codec), f"codec must be a str or Codec but got {type(codec)}"
+    return codec
+
+
+def decode(stored: Dict[str, np.ndarray]) -> np.ndarray:
+    """ Decodes the `data` array of a file written with a codec. """
+    name = str(stored['codec'])
+    assert name in CODECS, f"Unknown codec '{name}'. Available: {tuple(CODECS)}"
+    return CODECS[name].decode(stored)
+
+
+def _block_transform(data: np.ndarray, axes: Sequence[int], matrix: np.ndarray) -> np.ndarray:
+    """ Multiplies `matrix` onto all blocks of `len(matrix)` consecutive values along each axis in `axes`. """
+    n = len(matrix)
+    for axis in axes:
+        blocks = data.reshape(data.shape[:axis] + (data.shape[axis] // n, n) + data.shape[axis + 1:])
+        blocks = np.moveaxis(np.tensordot(blocks, matrix, axes=([axis + 1], [1])), -1, axis + 1)
+        data = blocks.reshape(data.shape)
+    return data
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """ Orthonormal DCT-II matrix. """
+    k, i = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def _check_finite(data: np.ndarray, codec: Codec):
+    """ Error-bounded codecs cannot represent NaN or inf since they would corrupt the quantization of all values. """
+    if not np.all(np.isfinite(data)):
+        raise ValueError(f"{type(codec).__name__} can only encode finite values but data contains {np.sum(~np.isfinite(data))} NaN or inf values. Use 'float16', 'bfloat16' or no codec instead.")
+
+
+def _uint_type(max_value) -> type:
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def _int_type(max_abs_value) -> type:
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_abs_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
@@ -1,4 +1,7 @@
-from typing import Union
+import os
+import struct
+import zipfile
+from typing import Union, List, Tuple, Dict, Mapping, Optional
 
 import numpy as np
 
@@ -6,10 +9,12 @@ from phi import geom, math
 from ._field import Field
 from ._grid import unstack_staggered_tensor, CenteredGrid, StaggeredGrid
 from ._field_math import stack
+from ._chunked_io import chunk_store_for_file
+from ._codecs import Codec, as_codec, decode
 from ..math import extrapolation, wrap, tensor, Shape, channel, Tensor, spatial
 
 
-def write(field: Field, file: Union[str, Tensor]):
+def write(field: Field, file: Union[str, Tensor], compress=True, codec: Union[str, Codec] = None):
     """
     Writes a field to disc using a NumPy file format.
     Depending on `file`, the data may be split up into multiple files.
@@ -25,23 +30,42 @@ def write(field: Field, file: Union[str, Tensor]):
             If `file` is a tensor, the dimensions of `field` are matched to the dimensions of `file`.
             Dimensions of `file` that are missing in `field` result in data duplication.
             Dimensions of `field` that are missing in `file` result in larger files.
+        compress: Whether to compress the data using `numpy.savez_compressed`.
+            Uncompressed files are larger but much faster to write and read.
+        codec: (Optional) Lossy encoding of the data as `Codec` or codec name, e.g. `'float16'`, `'bfloat16'`, `Quantize(max_abs_error)` or `BlockTransform(max_abs_error)`.
+            The codec and its parameters are stored in the file and `read()` decodes the data automatically.
+    """
+    for file_, arrays in field_arrays(field, file, codec):
+        save_arrays(file_, arrays, compress)
+
+
+def field_arrays(field: Field, file: Union[str, Tensor], codec: Union[str, Codec] = None) -> List[Tuple[str, Dict[str, np.ndarray]]]:
+    """
+    Converts `field` to NumPy arrays, split up according to the dimensions of `file` as in `write()`.
+    This copies all data to host memory but does not access the file system.
+
+    Returns:
+        `list` of `(file, arrays)` pairs that can be passed to `save_arrays()`.
     """
     if isinstance(file, str):
-        write_single_field(field, file)
+        return [(file, _single_field_arrays(field, codec))]
     elif isinstance(file, Tensor):
         if file.rank == 0:
-            write_single_field(field, file.native())
+            return [(file.native(), _single_field_arrays(field, codec))]
         else:
             dim = file.shape.names[0]
             files = math.unstack(file, dim)
             fields = field.dimension(dim).unstack(file.shape.get_size(dim))
-            for field_, file_ in zip(fields, files):
-                write(field_, file_)
+            return [pair for field_, file_ in zip(fields, files) for pair in field_arrays(field_, file_, codec)]
     else:
         raise ValueError(file)
 
 
-def write_single_field(field: Field, file: str):
+def write_single_field(field: Field, file: str, compress=True, codec: Union[str, Codec] = None):
+    save_arrays(file, _single_field_arrays(field, codec), compress)
+
+
+def _single_field_arrays(field: Field, codec: Union[str, Codec] = None) -> Dict[str, np.ndarray]:
     if field.is_staggered and field.is_grid:
         data = field.staggered_tensor().numpy(field.shape.names)
     else:
@@ -53,21 +77,38 @@ def write_single_field(field: Field, file: str):
         bounds_item_names = field.bounds.size.vector.item_names
         extrap = field.extrapolation.to_dict()
         field_type = 'StaggeredGrid' if field.is_staggered else 'CenteredGrid'
-        np.savez_compressed(file,
-                            dim_names=dim_names,
-                            dim_types=field.shape.types,
-                            dim_item_names=np.asarray(field.shape.item_names, dtype=object),
-                            field_type=field_type,
-                            lower=lower,
-                            upper=upper,
-                            bounds_item_names=bounds_item_names,
-                            extrapolation=extrap,
-                            data=data)
+        if codec is not None:
+            codec = as_codec(codec)
+            encoded = dict(codec=codec.name, **codec.encode(data, [i for i, t in enumerate(field.shape.types) if t == 'spatial']))
+        else:
+            encoded = dict(data=data)
+        return dict(dim_names=dim_names,
+                    dim_types=field.shape.types,
+                    dim_item_names=np.asarray(field.shape.item_names, dtype=object),
+                    field_type=field_type,
+                    lower=lower,
+                    upper=upper,
+                    bounds_item_names=bounds_item_names,
+                    extrapolation=extrap,
+                    **encoded)
     else:
         raise NotImplementedError(f"{type(field)} not implemented. Only Grid allowed.")
 
 
-def read(file: Union[str, Tensor], convert_to_backend=True) -> Field:
+def save_arrays(file: str, arrays: Dict[str, np.ndarray], compress=True):
+    """
+    Writes `arrays` to a `.npz` file.
+    The data is first written to a temporary file which then replaces `file` so that readers never see partially written files.
+    """
+    if not file.endswith('.npz'):
+        file += '.npz'  # same as numpy.savez
+    tmp_file = file + '.part'
+    with open(tmp_file, 'wb') as stream:
+        (np.savez_compressed if compress else np.savez)(stream, **arrays)
+    os.replace(tmp_file, file)
+
+
+def read(file: Union[str, Tensor], convert_to_backend=True, lazy=False) -> Field:
     """
     Loads a previously saved `Field` from disc.
 
@@ -78,30 +119,71 @@ def read(file: Union[str, Tensor], convert_to_backend=True) -> Field:
         file: Single file as `str` or `Tensor` of string type.
             If `file` is a tensor, all contained files are loaded an stacked according to the dimensions of `file`.
         convert_to_backend: Whether to convert the read data to the data format of the default backend, e.g. TensorFlow tensors.
+        lazy: If `True`, memory-maps the data instead of reading it.
+            The values of the returned field are NumPy memory maps and only the parts that are accessed, e.g. by slicing the field, are read from disc.
+            This requires the data to be stored uncompressed, i.e. written with `compress=False` or in a chunked store.
+            Compressed files are read fully.
+            `convert_to_backend` is ignored for lazy reads.
+            Files of a batch are stacked which reads their data.
 
     Returns:
         Loaded `Field`.
     """
     if isinstance(file, str):
-        return read_single_field(file, convert_to_backend=convert_to_backend)
+        return read_single_field(file, convert_to_backend=convert_to_backend, lazy=lazy)
     if isinstance(file, Tensor):
         if file.rank == 0:
-            return read_single_field(file.native(), convert_to_backend=convert_to_backend)
+            return read_single_field(file.native(), convert_to_backend=convert_to_backend, lazy=lazy)
         else:
             dim = file.shape[0]
             files = math.unstack(file, dim.name)
-            fields = [read(file_, convert_to_backend=convert_to_backend) for file_ in files]
+            fields = [read(file_, convert_to_backend=convert_to_backend, lazy=lazy) for file_ in files]
             return stack(fields, dim)
     else:
         raise ValueError(file)
 
 
-def read_single_field(file: str, convert_to_backend=True) -> Field:
+def read_single_field(file: str, convert_to_backend=True, lazy=False) -> Field:
+    if not os.path.isfile(file) and not os.path.isfile(file + '.npz'):
+        store, frame = chunk_store_for_file(file)
+        if store is not None and store.exists:
+            return field_from_arrays(store.read(frame, mmap=lazy), convert_to_backend and not lazy)
     stored = np.load(file, allow_pickle=True)
+    if lazy and 'data' in stored:
+        data = _mmap_npz_array(file, 'data')
+        if data is not None:
+            return field_from_arrays({**{k: stored[k] for k in stored.files if k != 'data'}, 'data': data}, convert_to_backend=False)
+    return field_from_arrays(stored, convert_to_backend)
+
+
+def _mmap_npz_array(file: str, key: str) -> Optional[np.memmap]:
+    """
+    Memory-maps the array `key` of an uncompressed `.npz` file.
+    Returns `None` if the array is compressed or cannot be memory-mapped.
+    """
+    with zipfile.ZipFile(file) as archive:
+        info = archive.getinfo(key + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(file, 'rb') as stream:
+        stream.seek(info.header_offset)
+        name_length, extra_length = struct.unpack('<HH', stream.read(30)[26:30])  # local file header
+        stream.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(stream)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(stream)
+        offset = stream.tell()
+    if dtype.hasobject:
+        return None
+    return np.memmap(file, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+def field_from_arrays(stored: Mapping[str, np.ndarray], convert_to_backend=True) -> Field:
+    """ Creates a `Field` from the data and metadata written by `write()`. """
     ftype = stored['field_type']
     if ftype not in ('CenteredGrid', 'StaggeredGrid'):
         raise NotImplementedError(f"{ftype} not implemented")
-    data_arr = stored['data']
+    data_arr = decode(stored) if 'codec' in stored else stored['data']
     dim_item_names = stored.get('dim_item_names', (None,) * len(data_arr.shape))
     data = tensor(data_arr, Shape(data_arr.shape, tuple(stored['dim_names']), tuple(stored['dim_types']), tuple(dim_item_names)), convert=convert_to_backend)
     bounds_item_names = stored.get('bounds_item_names', None)
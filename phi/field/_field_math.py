@@ -1259,3 +1259,29 @@ def safe_mul(x, y):
     x, y = _auto_resample(x, y)
     values = math.safe_mul(x.values, y.values)
     return x.with_values(values)
+
+
+def axpy(a: Union[float, Tensor], x: Union[Field, Tensor], y: Union[Field, Tensor], b: Union[float, Tensor] = 1, in_place=False):
+    """
+    Computes `a * x + b * y`, optionally writing the result into the memory of `y`.
+    See `phiml.math.axpy()`.
+
+    Args:
+        a: Factor of `x`.
+        x: `Field` or `Tensor`.
+        y: `Field` or `Tensor` to update.
+        b: Factor of `y`.
+        in_place: Whether the values of `y` may be overwritten with the result.
+            This modifies all fields sharing values with `y`.
+
+    Returns:
+        `Field` or `Tensor`. The result must always be used in place of `y`.
+    """
+    if isinstance(y, Field) and isinstance(x, Field) and x.geometry == y.geometry:
+        values = math.axpy(a, x.values, y.values, b, in_place=in_place)
+        return Field(y.geometry, values, x.boundary + y.boundary)
+    if isinstance(y, Field) and not isinstance(x, Field):
+        return y.with_values(math.axpy(a, x, y.values, b, in_place=in_place))
+    if isinstance(y, Tensor) and not isinstance(x, Field):
+        return math.axpy(a, x, y, b, in_place=in_place)
+    return a * x + (y if b == 1 else b * y)
@@ -1,18 +1,28 @@
+import atexit
 import inspect
 import json
 import os
+import queue
 import re
 import shutil
+import stat
 import sys
+import threading
 import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from os.path import join, isfile, isdir, abspath, expanduser, basename, split
-from typing import Tuple, Union
+from typing import Tuple, Union, Dict, Optional, Iterator, Callable, Any
 
 import numpy as np
 
 from phi import math, __version__ as phi_version
 from ._field import Field
-from ._field_io import read, write
+from ._field_io import read, field_arrays, save_arrays, read_single_field
+from ._field_math import stack as stack_fields
+from ._codecs import Codec
+from ._chunked_io import ChunkedFieldStore, CHUNK_DIR_SUFFIX, chunked_fieldnames
+from ._checkpoint import SceneCheckpointer, checkpoint_frames, restore_checkpoint
 from phiml.math import Shape, batch, stack, unpack_dim, wrap
 from phiml.math.magic import BoundDim
 
@@ -32,23 +42,293 @@ def _str(bytes_or_str):  # on Linux, os.listdir returns bytes instead of strings
 
 
 def get_fieldnames(simpath) -> tuple:
-    fieldnames_set = {_str(f)[:-11] for f in os.listdir(simpath) if _str(f).endswith(".npz")}
-    return tuple(sorted(fieldnames_set))
+    return tuple(sorted(frame_index(simpath)))
 
 
 def get_frames(path: str, field_name: str = None, mode=set.intersection) -> tuple:
+    index = frame_index(path)
     if field_name is not None:
-        all_frames = {int(f[-10:-4]) for f in os.listdir(path) if _str(f).startswith(field_name) and _str(f).endswith(".npz")}
-        return tuple(sorted(all_frames))
+        return tuple(sorted(index.get(field_name, ())))
     else:
-        fields = get_fieldnames(path)
-        if not fields:
+        if not index:
             return ()
-        frames_sets = [set(get_frames(path, field)) for field in fields]
-        frames = mode(*frames_sets)
+        frames = mode(*index.values())
         return tuple(sorted(frames))
 
 
+_FRAME_INDEX_FILE = 'frame_index.jsonl'
+_FRAME_INDEX_LOCK = threading.Lock()  # chains the index entries of threads writing to the same scene
+_FRAME_INDEX_COMPACT = 256  # writers replace the index file by a single snapshot once it has this many entries
+_FRAME_INDEX_CACHE = {}  # scene path -> _ParsedFrameIndex of the part of the index file that was read so far
+
+
+class _ParsedFrameIndex:
+
+    def __init__(self, inode: int):
+        self.inode = inode
+        self.offset = 0  # bytes of the index file that have been parsed
+        self.index = {}
+        self.dir_mtime = None  # directory modification time at the end of the chain, None before the snapshot was read
+        self.entries = 0
+        self.broken = False
+
+    def parse(self, line: str):
+        data = json.loads(line)
+        if self.dir_mtime is None:
+            self.index = {name: set(frames) for name, frames in data['fields'].items()}
+        elif data['prev_dir_mtime_ns'] != self.dir_mtime:
+            self.broken = True
+            return
+        else:
+            self.entries += 1
+            if 'field' in data:
+                self.index.setdefault(data['field'], set()).add(data['frame'])
+        self.dir_mtime = data['dir_mtime_ns']
+
+
+def frame_index(path: str) -> Dict[str, set]:
+    """
+    Returns the stored frames of all fields in the scene directory `path`.
+
+    The index is kept in the file `frame_index.jsonl` which is extended by `Scene.write_field()`.
+    It tracks the modification time of the scene directory so that changes not made through `Scene`, such as added or deleted files, are detected.
+    In that case, the directory is listed instead. Reading never modifies the scene, the index is repaired by the next write.
+
+    Returns:
+        `dict` mapping field names to sets of frame numbers.
+    """
+    index = _read_frame_index(path)
+    if index is None:
+        return _scan_frame_index(path)
+    return {name: set(frames) for name, frames in index.items()}
+
+
+def _parse_frame_index(path: str) -> Optional[_ParsedFrameIndex]:
+    """
+    Parses the lines appended to the index file since the last call and returns the cached result.
+    Returns `None` if the index file does not exist or cannot be parsed.
+
+    The first line of the index file holds all stored frames and the modification time of the directory when it was listed.
+    Each following line is appended by one write and holds the directory modification times before and after the write.
+    If these times do not form an unbroken chain, `broken` is set.
+    """
+    try:
+        with open(join(path, _FRAME_INDEX_FILE), 'rb') as index_file:
+            file_stat = os.fstat(index_file.fileno())
+            parsed = _FRAME_INDEX_CACHE.get(path)
+            if parsed is None or parsed.inode != file_stat.st_ino or parsed.offset > file_stat.st_size:  # new or replaced index file
+                parsed = _ParsedFrameIndex(file_stat.st_ino)
+            if not parsed.broken and parsed.offset < file_stat.st_size:
+                index_file.seek(parsed.offset)
+                for line in index_file:
+                    if not line.endswith(b'\n'):
+                        break  # incomplete line that is still being written
+                    parsed.parse(line.decode('utf-8'))
+                    parsed.offset += len(line)
+                    if parsed.broken:
+                        break
+            _FRAME_INDEX_CACHE[path] = parsed
+            return parsed if parsed.dir_mtime is not None else None
+    except (OSError, ValueError, KeyError):
+        _FRAME_INDEX_CACHE.pop(path, None)
+        return None
+
+
+def _read_frame_index(path: str) -> Optional[Dict[str, set]]:
+    """
+    Returns the stored index or `None` if it does not exist or misses changes to the directory.
+
+    The index is valid if its chain of directory modification times ends at the current modification time.
+    File modification times have a limited resolution, so changes made right after the index was written may not change the directory time stamp.
+    Therefore, the index is only trusted if it was written after the last modification of the directory.
+    """
+    parsed = _parse_frame_index(path)
+    if parsed is None or parsed.broken:
+        return None
+    try:
+        dir_mtime = os.stat(path).st_mtime_ns
+        if parsed.dir_mtime != dir_mtime or os.stat(join(path, _FRAME_INDEX_FILE)).st_mtime_ns <= dir_mtime:
+            return None
+    except OSError:
+        return None
+    return parsed.index
+
+
+_FRAME_FILE_PATTERN = re.compile(r'(.+)_(\d{6})\.npz')  # <field>_<frame>.npz, see _filename()
+
+
+def _scan_frame_index(path: str) -> Dict[str, set]:
+    """ Lists the scene directory. Files not matching `<field>_<6 digits>.npz`, such as other `.npz` files, are ignored. """
+    index = {}
+    for f in os.listdir(path):
+        match = _FRAME_FILE_PATTERN.fullmatch(_str(f))
+        if match:
+            index.setdefault(match.group(1), set()).add(int(match.group(2)))
+    for name in chunked_fieldnames(path):
+        index.setdefault(name, set()).update(ChunkedFieldStore(join(path, name + CHUNK_DIR_SUFFIX)).frames)
+    return index
+
+
+def _rebuild_frame_index(path: str, index: Dict[str, set] = None) -> Dict[str, set]:
+    """
+    Replaces the index file by a single snapshot.
+    Only called by writers while holding `_FRAME_INDEX_LOCK`.
+
+    Args:
+        path: Scene directory.
+        index: Current index to compact. If `None`, the directory is listed.
+    """
+    index_path = join(path, _FRAME_INDEX_FILE)
+    dir_mtime = os.stat(path).st_mtime_ns  # before listing so that changes made while listing invalidate the index
+    if index is None:
+        index = _scan_frame_index(path)
+    tmp_path = index_path + '.part'
+    with open(tmp_path, 'w') as index_file:
+        index_file.write(json.dumps({'dir_mtime_ns': dir_mtime, 'fields': {name: sorted(frames) for name, frames in index.items()}}) + '\n')
+    os.replace(tmp_path, index_path)
+    _append_frame_index(path, dir_mtime)  # replacing the index file modified the directory
+    return index
+
+
+def _append_frame_index(path: str, prev_dir_mtime: int, name: str = None, frame: int = None):
+    entry = {'prev_dir_mtime_ns': prev_dir_mtime, 'dir_mtime_ns': os.stat(path).st_mtime_ns}
+    if name is not None:
+        entry.update(field=name, frame=frame)
+    with open(join(path, _FRAME_INDEX_FILE), 'a') as index_file:  # single small write in append mode
+        index_file.write(json.dumps(entry) + '\n')
+
+
+def _write_indexed(file: str, write_file: Callable):
+    """
+    Calls `write_file()` to store the frame of a field and appends it to the frame index of the scene.
+    If the index misses changes to the directory, it is rebuilt. Long indices are compacted into a single snapshot.
+
+    Args:
+        file: Scene file path `<scene>/<name>_<frame>.npz` of the field and frame, see `_filename()`.
+        write_file: Function writing the data.
+    """
+    path, file_name = split(file)
+    with _FRAME_INDEX_LOCK:
+        dir_mtime = os.stat(path).st_mtime_ns
+        write_file()
+        if not isfile(join(path, _FRAME_INDEX_FILE)):
+            _rebuild_frame_index(path)
+            return
+        _append_frame_index(path, dir_mtime, file_name[:-11], int(file_name[-10:-4]))
+        parsed = _parse_frame_index(path)
+        if parsed is None or parsed.broken or parsed.dir_mtime != os.stat(path).st_mtime_ns:
+            _rebuild_frame_index(path)
+        elif parsed.entries >= _FRAME_INDEX_COMPACT:
+            _rebuild_frame_index(path, parsed.index)
+
+
+def _may_write_cache(parent_directory: str) -> bool:
+    """
+    Whether hidden cache files may be written to `parent_directory`.
+    Directories that are read-only, owned by another user or shared via the sticky bit, such as `/tmp`, are left untouched.
+    """
+    try:
+        dir_stat = os.stat(parent_directory)
+    except OSError:
+        return False
+    if not os.access(parent_directory, os.W_OK):
+        return False
+    if hasattr(os, 'getuid') and (dir_stat.st_uid != os.getuid() or dir_stat.st_mode & stat.S_ISVTX):
+        return False
+    return True
+
+
+def _allocate_scene_ids(parent_directory: str, name: str, count: int) -> typing_list:
+    """
+    Creates `count` new scene directories `<name>_<id>` and returns their ids, starting after the highest existing id.
+
+    `os.mkdir()` fails if the directory exists, so each id is claimed atomically, even across processes.
+    """
+    indices = [f[len(name)+1:] for f in os.listdir(parent_directory) if f.startswith(f"{name}_")]
+    next_id = max([-1] + [int(i) for i in indices if i.isdigit()]) + 1
+    ids = []
+    while len(ids) < count:
+        try:
+            os.mkdir(join(parent_directory, f"{name}_{next_id:06d}"))
+            ids.append(next_id)
+        except FileExistsError:
+            pass
+        next_id += 1
+    return ids
+
+
+_SCENE_INDEX_FILE = '.scene_index.json'
+
+
+def _scene_index(parent_directory: str, cache: bool) -> dict:
+    """
+    Returns the index of `parent_directory`.
+    If `cache`, the index is read from `.scene_index.json`, rescanning the directory if it was modified since the index was written.
+
+    Returns:
+        `dict` with entries `'entries'` mapping all directory entries to whether they are directories and
+        `'properties'` mapping scene names to `(description.json mtime, raw properties)`.
+    """
+    if not cache:
+        return {'entries': {e.name: e.is_dir() for e in os.scandir(parent_directory)}, 'properties': {}}
+    index_path = join(parent_directory, _SCENE_INDEX_FILE)
+    try:
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        if index['dir_mtime_ns'] == os.stat(parent_directory).st_mtime_ns and os.stat(index_path).st_mtime_ns > index['dir_mtime_ns']:
+            return index
+        properties = index['properties']
+    except (OSError, ValueError, KeyError):
+        properties = {}
+    entries = {e.name: e.is_dir() for e in os.scandir(parent_directory)}
+    index = {'entries': entries, 'properties': {n: p for n, p in properties.items() if n in entries}}
+    _write_scene_index(parent_directory, index)
+    return index
+
+
+def _write_scene_index(parent_directory: str, index: dict):
+    if not _may_write_cache(parent_directory):
+        return
+    index_path = join(parent_directory, _SCENE_INDEX_FILE)
+    try:
+        if not isfile(index_path):
+            open(index_path, 'w').close()  # creating the file modifies the directory, overwriting it later does not
+        index['dir_mtime_ns'] = os.stat(parent_directory).st_mtime_ns
+        with open(index_path, 'w') as index_file:
+            json.dump(index, index_file)
+    except OSError:
+        pass  # read-only directory
+
+
+def _indexed_properties(parent_directory: str, names: typing_list, index: dict, cache: bool) -> Dict[str, dict]:
+    """ Returns the decoded properties of the scenes `names`, reading `description.json` only for scenes that are not indexed or have changed. """
+    cached = index['properties']
+    changed = False
+    for n in names:
+        json_file = join(parent_directory, n, "description.json")
+        try:
+            mtime = os.stat(json_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        if n not in cached or cached[n][0] != mtime:
+            if mtime is None:
+                cached[n] = [None, {}]
+            else:
+                with open(json_file) as stream:
+                    cached[n] = [mtime, json.load(stream)]
+            changed = True
+    if changed and cache:
+        _write_scene_index(parent_directory, index)
+    return {n: _decode_properties(dict(cached[n][1])) for n in names}
+
+
+def _decode_properties(props: dict) -> dict:
+    if '__tensors__' in props:
+        for key in props['__tensors__']:
+            props[key] = math.from_dict(props[key])
+    return props
+
+
 class Scene:
     """
     Provides methods for reading and writing simulation data.
@@ -123,6 +403,8 @@ class Scene:
             parent_directory: Directory to hold the new `Scene`. If it doesn't exist, it will be created.
             shape: Determines number of scenes to create. Multiple scenes will be represented by a `Scene` with `is_batch=True`.
             name: Name of the directory (excluding index). Default is `'sim'`.
+                Ids are allocated by atomically creating the scene directories, so concurrent processes never obtain the same id.
+                Ids of scenes created concurrently may not be consecutive.
             copy_calling_script: Whether to copy the Python file that invoked this method into the `src` folder of all created scenes.
                 See `Scene.copy_calling_script()`.
             dimensions: Additional batch dimensions
@@ -133,13 +415,8 @@ class Scene:
         shape = shape & math.batch(**dimensions)
         parent_directory = expanduser(parent_directory)
         abs_dir = abspath(parent_directory)
-        if not isdir(abs_dir):
-            os.makedirs(abs_dir)
-            next_id = 0
-        else:
-            indices = [int(f[len(name)+1:]) for f in os.listdir(abs_dir) if f.startswith(f"{name}_")]
-            next_id = max([-1] + indices) + 1
-        ids = unpack_dim(wrap(tuple(range(next_id, next_id + shape.volume))), 'vector', shape)
+        os.makedirs(abs_dir, exist_ok=True)
+        ids = unpack_dim(wrap(tuple(_allocate_scene_ids(abs_dir, name, shape.volume))), 'vector', shape)
         paths = math.map(lambda id_: join(parent_directory, f"{name}_{id_:06d}"), ids)
         scene = Scene(paths)
         scene.mkdir()
@@ -154,7 +431,9 @@ class Scene:
     def list(parent_directory: str,
              name='sim',
              include_other: bool = False,
-             dim: Union[Shape, None] = None) -> Union['Scene', tuple]:
+             dim: Union[Shape, None] = None,
+             where: Union[dict, Callable[[dict], bool], None] = None,
+             cache: bool = False) -> Union['Scene', tuple]:
         """
         Lists all scenes inside the given directory.
 
@@ -166,6 +445,13 @@ class Scene:
             name: Name of the directory (excluding index). Default is `'sim'`.
             include_other: Whether folders that do not match the scene format should also be treated as scenes.
             dim: Stack dimension. If None, returns tuple of `Scene` objects. Otherwise, returns a scene batch with this dimension.
+            where: (Optional) Filter by scene properties, see `Scene.properties`.
+                Either a `dict` of required property values or a function mapping the properties `dict` to `bool`.
+                Scenes that do not have all properties listed in a `dict` are excluded.
+            cache: Whether to cache the directory listing and the contents of `description.json` of all scenes in the file `.scene_index.json` inside `parent_directory`.
+                The listing is refreshed when the modification time of `parent_directory` changes and properties are re-read only for scenes whose `description.json` changed.
+                This speeds up repeated listing of directories with many scenes.
+                The cache is not written to read-only or shared directories.
 
         Returns:
             `tuple` of scenes.
@@ -174,8 +460,15 @@ class Scene:
         abs_dir = abspath(parent_directory)
         if not isdir(abs_dir):
             return ()
-        names = [sim for sim in os.listdir(abs_dir) if sim.startswith(f"{name}_") or (include_other and isdir(join(abs_dir, sim)))]
+        index = _scene_index(abs_dir, cache)
+        names = [sim for sim, is_dir in index['entries'].items() if sim.startswith(f"{name}_") or (include_other and is_dir)]
         names = list(sorted(names))
+        if where is not None:
+            properties = _indexed_properties(abs_dir, names, index, cache)
+            if isinstance(where, dict):
+                names = [n for n in names if all(k in properties[n] and math.all(properties[n][k] == v) for k, v in where.items())]
+            else:
+                names = [n for n in names if where(properties[n])]
         if dim is None:
             return tuple(Scene(join(parent_directory, n)) for n in names)
         else:
@@ -251,11 +544,7 @@ class Scene:
             json_file = join(path, "description.json")
             if isfile(json_file):
                 with open(json_file) as stream:
-                    props = json.load(stream)
-                if '__tensors__' in props:
-                    for key in props['__tensors__']:
-                        props[key] = math.from_dict(props[key])
-                return props
+                    return _decode_properties(json.load(stream))
             else:
                 return {}
 
@@ -351,25 +640,28 @@ class Scene:
             with open(join(path, "description.json"), "w") as out:
                 json.dump(instance_properties, out, indent=2)
 
-    def write(self, data: dict = None, frame=0, **kw_data):
+    def write(self, data: dict = None, frame=0, compress: Union[bool, Dict[str, bool]] = True, chunked: Union[bool, int] = False, codec: Union[str, Codec, Dict[str, Union[str, Codec, None]]] = None, **kw_data):
         """
         Writes fields to this scene.
         One NumPy file will be created for each `phi.field.Field`
 
         See Also:
-            `Scene.read()`.
+            `Scene.read()`, `Scene.async_writer()`.
 
         Args:
             data: `dict` mapping field names to `Field` objects that can be written using `phi.field.write()`.
             kw_data: Additional data, overrides elements in `data`.
             frame: Frame number.
+            compress: Whether to compress the files. Either a single `bool` or a `dict` mapping field names to `bool`.
+            chunked: Whether to append the frames to a chunked, memory-mapped store instead of writing one file per frame, see `Scene.write_field()`.
+            codec: Lossy encoding, see `phi.field.write()`. Either a single codec or a `dict` mapping field names to codecs.
         """
         data = dict(data) if data else {}
         data.update(kw_data)
         for name, field in data.items():
-            self.write_field(field, name, frame)
+            self.write_field(field, name, frame, _per_field(compress, name, True), chunked, _per_field(codec, name, None))
 
-    def write_field(self, field: Field, name: str, frame: int):
+    def write_field(self, field: Field, name: str, frame: int, compress=True, chunked: Union[bool, int] = False, codec: Union[str, Codec] = None):
         """
         Write a `Field` to a file.
         The filenames are created from the provided names and the frame index in accordance with the
@@ -379,14 +671,114 @@ class Scene:
             field: single field or structure of Fields to save.
             name: Base file name.
             frame: Frame number as `int`, typically time step index.
+            compress: Whether to compress the file. Chunked stores are never compressed.
+            chunked: If `True` or an `int` chunk size, appends the frame to the directory `<name>.chunks` which stores all frames of this field in a few uncompressed, memory-mapped files.
+                This avoids creating one file per frame. `Scene.read_field()` reads chunked fields transparently.
+                A field should either be stored chunked or as individual files, not both.
+            codec: (Optional) Lossy encoding, see `phi.field.write()`. Not supported for chunked stores.
         """
+        if chunked:
+            assert codec is None, f"Codecs are not supported for chunked storage"
+            chunk_size = 32 if chunked is True else chunked
+            stores = wrap(math.map(lambda dir_: join(dir_, slugify(_slugify_filename(name)) + CHUNK_DIR_SUFFIX), self._paths))
+            for store_path, arrays in field_arrays(field, stores):
+                _write_indexed(_filename(os.path.dirname(store_path), _slugify_filename(name), frame), lambda: ChunkedFieldStore(store_path).append(frame, arrays, chunk_size))
+        else:
+            for file, arrays in field_arrays(field, self._field_files(field, name, frame), codec):
+                _write_indexed(file, lambda: save_arrays(file, arrays, compress))
+
+    def convert_to_chunked(self, names: Union[str, tuple, typing_list] = None, chunk_size=32, remove_files=True):
+        """
+        Moves fields stored as individual `.npz` files per frame into chunked stores, see `Scene.write_field()`.
+
+        Args:
+            names: Field names to convert. Converts all fields by default.
+            chunk_size: Number of frames per chunk.
+            remove_files: Whether to delete the `.npz` files after conversion.
+        """
+        names = (names,) if isinstance(names, str) else names
+        for path in math.flatten(self._paths, flatten_batch=True):
+            for name in names or get_fieldnames(path):
+                store = ChunkedFieldStore(join(path, name + CHUNK_DIR_SUFFIX))
+                for frame in get_frames(path, name):
+                    file = _filename(path, name, frame)
+                    if isfile(file):
+                        with np.load(file, allow_pickle=True) as stored:
+                            store.append(frame, {k: stored[k] for k in stored.files}, chunk_size)
+                        if remove_files:
+                            os.remove(file)
+
+    def _field_files(self, field: Field, name: str, frame: int) -> math.Tensor:
         if not isinstance(field, Field):
             raise ValueError(f"Only Field instances can be saved but got {field}")
         name = _slugify_filename(name)
-        files = wrap(math.map(lambda dir_: _filename(dir_, name, frame), self._paths))
-        write(field, files)
+        return wrap(math.map(lambda dir_: _filename(dir_, name, frame), self._paths))
+
+    def async_writer(self, max_pending=8, workers=1, compress: Union[bool, Dict[str, bool]] = True, codec: Union[str, Codec, Dict[str, Union[str, Codec, None]]] = None) -> 'AsyncSceneWriter':
+        """
+        Creates a writer that stores fields of this scene on background threads so that file I/O and compression overlap with computation.
+
+        Example:
+            >>> with scene.async_writer() as writer:
+            >>>     for frame in range(100):
+            >>>         velocity, pressure = step(velocity)
+            >>>         writer.write(velocity=velocity, pressure=pressure, frame=frame)
+
+        Args:
+            max_pending: Maximum number of files queued for writing. `AsyncSceneWriter.write()` blocks while the queue is full.
+            workers: Number of background threads. NumPy releases the GIL during compression, so multiple threads can compress files in parallel.
+            compress: Default compression, see `Scene.write()`.
+            codec: Default lossy encoding, see `Scene.write()`.
+
+        Returns:
+            `AsyncSceneWriter`
+        """
+        return AsyncSceneWriter(self, max_pending, workers, compress, codec)
+
+    def checkpointer(self, keyframe_interval=10, chunk_bytes=1 << 16, keep_recent=2, keep_old_keyframes: Optional[int] = 8, background=True) -> SceneCheckpointer:
+        """
+        Creates a checkpointer that stores simulation states incrementally.
+        Every `keyframe_interval`-th checkpoint stores the full state, all others only store the chunks that changed since the last keyframe.
+        Use `Scene.restore()` to reconstruct a checkpointed state.
+
+        Example:
+            >>> with scene.checkpointer(keyframe_interval=20) as checkpointer:
+            >>>     for frame in range(1000):
+            >>>         velocity, pressure = step(velocity)
+            >>>         checkpointer.save((velocity, pressure), frame)
+
+        Args:
+            keyframe_interval: Number of checkpoints per keyframe, including the keyframe.
+            chunk_bytes: Chunk size in bytes. Deltas store all chunks that contain at least one changed byte.
+            keep_recent: Number of most recent keyframes that are kept together with their deltas.
+            keep_old_keyframes: Maximum number of older keyframes to keep. These are thinned out evenly over time and their deltas are removed.
+                If `None`, all keyframes are kept.
+            background: Whether to compute deltas and write files on a background thread.
+
+        Returns:
+            `SceneCheckpointer`
+        """
+        assert not self.is_batch, "Checkpoints can only be written to a single scene"
+        return SceneCheckpointer(self.path, keyframe_interval, chunk_bytes, keep_recent, keep_old_keyframes, background)
+
+    @property
+    def checkpoints(self) -> Tuple[int, ...]:
+        """ Frame numbers of all stored checkpoints, see `Scene.checkpointer()`. """
+        return tuple(frame for frame, _ in checkpoint_frames(self.path))
+
+    def restore(self, frame: int = None):
+        """
+        Reconstructs a state stored using `Scene.checkpointer()`.
+
+        Args:
+            frame: Frame to restore. If `None`, restores the latest checkpoint.
+
+        Returns:
+            State with the same structure as the saved one, backed by NumPy.
+        """
+        return restore_checkpoint(self.path, frame)
 
-    def read_field(self, name: str, frame: int, convert_to_backend=True) -> Field:
+    def read_field(self, name: str, frame: int, convert_to_backend=True, lazy=False) -> Field:
         """
         Reads a single `Field` from files contained in this `Scene` (batch).
 
@@ -394,17 +786,19 @@ class Scene:
             name: Base file name.
             frame: Frame number as `int`, typically time step index.
             convert_to_backend: Whether to convert the read data to the data format of the default backend, e.g. TensorFlow tensors.
+            lazy: Whether to memory-map the data so that only the accessed parts are read from disc.
+                This requires the field to be written with `compress=False` or `chunked=True`. See `phi.field.read()`.
 
         Returns:
             `Field`
         """
         name = _slugify_filename(name)
         files = math.map(lambda dir_: _filename(dir_, name, frame), self._paths)
-        return read(files, convert_to_backend=convert_to_backend)
+        return read(files, convert_to_backend=convert_to_backend, lazy=lazy)
 
     read_array = read_field
 
-    def read(self, *names: str, frame=0, convert_to_backend=True):
+    def read(self, *names: str, frame=0, convert_to_backend=True, lazy=False):
         """
         Reads one or multiple fields from disc.
 
@@ -415,15 +809,66 @@ class Scene:
             names: Single field name or sequence of field names.
             frame: Frame number.
             convert_to_backend: Whether to convert the read data to the data format of the default backend, e.g. TensorFlow tensors.
+            lazy: Whether to memory-map the data, see `Scene.read_field()`.
 
         Returns:
             Single `phi.field.Field` or sequence of fields, depending on the type of `names`.
         """
         if len(names) == 1 and isinstance(names[0], (tuple, list)):
             names = names[0]
-        result = [self.read_array(name, frame, convert_to_backend) for name in names]
+        result = [self.read_array(name, frame, convert_to_backend, lazy) for name in names]
         return result[0] if len(names) == 1 else result
 
+    def dataset(self,
+                names: Union[str, tuple, typing_list],
+                frames: Union[int, tuple, typing_list, range, None] = None,
+                batch: Union[int, Shape] = 1,
+                shuffle=False,
+                seed: int = None,
+                drop_last=False,
+                workers: int = None,
+                prefetch=2,
+                convert_to_backend=True) -> Iterator[Union[Field, Tuple[Field, ...]]]:
+        """
+        Iterates over batches of fields read from all scenes and frames of this `Scene` (batch).
+
+        Files are read concurrently on a thread pool.
+        While a batch is being processed, the files of the next `prefetch` batches are already being read and converted to the default backend.
+
+        Example:
+            >>> for smoke, vel in Scene.list('data', dim=batch('scenes')).dataset(('smoke', 'vel'), batch=32, shuffle=True):
+            >>>     loss = train_step(smoke, vel)
+
+        Args:
+            names: Single field name or sequence of field names.
+            frames: Frames to read from each scene. If `None`, reads all frames of each scene for which all fields in `names` are stored.
+            batch: Batch size as `int` or batch dimension `Shape` with a size. An `int` creates batches along the dimension `batch`.
+            shuffle: Whether to iterate over the (scene, frame) samples in random order.
+            seed: Random seed for shuffling.
+            drop_last: Whether to skip the last batch if it holds fewer than `batch` samples.
+            workers: Number of reader threads. Defaults to the number of CPUs.
+            prefetch: Number of batches to read ahead.
+            convert_to_backend: Whether to convert the read data to the data format of the default backend, e.g. TensorFlow tensors.
+
+        Returns:
+            Iterator over batches. Each batch is a single `Field` if `names` is a `str` and a `tuple` of fields otherwise.
+            The fields are stacked along the batch dimension in the order of the samples.
+        """
+        batch_dim = batch if isinstance(batch, Shape) else math.batch(batch=batch)
+        batch_size = batch_dim.size
+        assert batch_dim.rank == 1 and batch_size, f"batch must be an int or a batch dimension with size but got {batch}"
+        single = isinstance(names, str)
+        names = [_slugify_filename(n) for n in ((names,) if single else names)]
+        frames = (frames,) if isinstance(frames, int) else frames
+        def stored_frames(path: str) -> tuple:
+            return tuple(sorted(set.intersection(*[set(get_frames(path, n)) for n in names])))
+        samples = [(path, frame) for path in math.flatten(self._paths, flatten_batch=True) for frame in (frames if frames is not None else stored_frames(path))]
+        order = np.random.default_rng(seed).permutation(len(samples)) if shuffle else np.arange(len(samples))
+        batches = [order[i:i + batch_size] for i in range(0, len(samples), batch_size)]
+        if drop_last and batches and len(batches[-1]) < batch_size:
+            batches = batches[:-1]
+        return _read_batches(samples, batches, names, single, batch_dim, workers, prefetch, convert_to_backend)
+
     @property
     def fieldnames(self) -> tuple:
         """ Determines all field names present in this `Scene`, independent of frame. """
@@ -514,6 +959,149 @@ class Scene:
                 shutil.move(p, new_path)
 
 
+def _read_batches(samples: typing_list, batches: typing_list, names: typing_list, single: bool, batch_dim: Shape, workers: Optional[int], prefetch: int, convert_to_backend: bool):
+    pool = ThreadPoolExecutor(workers or os.cpu_count())
+    pending = deque()
+
+    def submit(indices):
+        return [[pool.submit(read_single_field, _filename(samples[i][0], name, samples[i][1]), convert_to_backend) for i in indices] for name in names]
+
+    try:
+        for indices in batches[:prefetch + 1]:
+            pending.append(submit(indices))
+        for next_indices in batches[prefetch + 1:] + [None] * min(len(batches), prefetch + 1):
+            futures = pending.popleft()
+            if next_indices is not None:
+                pending.append(submit(next_indices))
+            fields = tuple(stack_fields([f.result() for f in name_futures], batch_dim.with_size(len(name_futures))) for name_futures in futures)
+            yield fields[0] if single else fields
+    finally:
+        for futures in pending:
+            for name_futures in futures:
+                for future in name_futures:
+                    future.cancel()
+        pool.shutdown(wait=True)
+
+
+class AsyncSceneWriter:
+    """
+    Writes fields to a `Scene` on background threads. Create writers using `Scene.async_writer()`.
+
+    The data of each field is copied to host memory when `write()` is called so that later changes to the field do not affect the stored data.
+    Only compression and file I/O are deferred.
+    Errors raised on the background threads are re-raised by the next call to `write()`, `flush()` or `close()`.
+    Pending files are written before the interpreter exits, even if the writer was never closed.
+    """
+
+    def __init__(self, scene: Scene, max_pending=8, workers=1, compress: Union[bool, Dict[str, bool]] = True, codec: Union[str, Codec, Dict[str, Union[str, Codec, None]]] = None):
+        assert workers >= 1, f"workers must be at least 1 but got {workers}"
+        self.scene = scene
+        self.compress = compress
+        self.codec = codec
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._written_paths = set()
+        self._threads = [threading.Thread(target=self._work, name=f"AsyncSceneWriter-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.close)
+
+    def write(self, data: dict = None, frame=0, compress: Union[bool, Dict[str, bool], None] = None, codec: Union[str, Codec, Dict[str, Union[str, Codec, None]]] = None, **kw_data):
+        """
+        Queues fields for writing, see `Scene.write()`.
+        Blocks while the queue is full.
+
+        Args:
+            data: `dict` mapping field names to `Field` objects.
+            frame: Frame number.
+            compress: Overrides the compression of this writer for these fields.
+            codec: Overrides the lossy encoding of this writer for these fields.
+            kw_data: Additional data, overrides elements in `data`.
+        """
+        self._raise_error()
+        assert not self._closed, "AsyncSceneWriter has already been closed"
+        data = dict(data) if data else {}
+        data.update(kw_data)
+        for name, field in data.items():
+            compress_field = _per_field(self.compress if compress is None else compress, name, True)
+            codec_field = _per_field(self.codec if codec is None else codec, name, None)
+            for file, arrays in field_arrays(field, self.scene._field_files(field, name, frame), codec_field):
+                if 'data' in arrays:
+                    arrays['data'] = np.array(arrays['data'], copy=True)  # .numpy() may return a view of the field's memory
+                self._queue.put((file, arrays, compress_field))
+
+    def write_field(self, field: Field, name: str, frame: int, compress: bool = None, codec: Union[str, Codec] = None):
+        """ Queues a single field for writing, see `Scene.write_field()`. """
+        self.write({name: field}, frame, compress, codec)
+
+    @property
+    def pending(self) -> int:
+        """ Number of files that are queued but not yet written. """
+        return self._queue.unfinished_tasks
+
+    def flush(self):
+        """ Blocks until all queued files have been written. """
+        self._queue.join()
+        self._update_frame_indices()
+        self._raise_error()
+
+    def _update_frame_indices(self):
+        # files are written concurrently without updating the frame index, so it is rebuilt once all files are written
+        written, self._written_paths = self._written_paths, set()
+        with _FRAME_INDEX_LOCK:
+            for path in written:
+                _rebuild_frame_index(path)
+
+    def close(self):
+        """ Writes all pending files and stops the background threads. Calling `close()` multiple times has no effect. """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._update_frame_indices()
+        self._raise_error()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    save_arrays(*item)
+                    self._written_paths.add(os.path.dirname(item[0]))
+            except BaseException as exc:
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            try:
+                self.close()
+            except BaseException:
+                pass  # don't mask the original error
+
+
+def _per_field(value: Union[Any, Dict[str, Any]], name: str, default):
+    return value.get(name, default) if isinstance(value, dict) else value
+
+
 def _slugify_filename(struct_name):
     struct_name = struct_name.replace('._', '.').replace('.', '_')
     if struct_name.startswith('_'):
@@ -24,7 +24,7 @@ from ._grid import UniformGrid, enclosing_grid
 from ._graph import Graph, graph
 from ._mesh import Mesh, mesh, load_su2, load_gmsh, load_stl, mesh_from_numpy, build_mesh
 from ._heightmap import Heightmap
-from ._sdf_grid import SDFGrid, sample_sdf
+from ._sdf_grid import SDFGrid, BlockSDFGrid, sample_sdf
 from ._sdf import SDF, numpy_sdf
 from ._embed import embed, infinite_cylinder
 
@@ -2,6 +2,8 @@ from numbers import Number
 import warnings
 from typing import Union, Dict, Any, Optional, Tuple, Sequence
 
+import numpy as np
+
 from phi import math
 from phiml import math
 from phiml.math import wrap, merge_shapes
@@ -14,10 +16,148 @@ from ._box import bounding_box, Box
 from ._geom import Geometry, NoGeometry
 from ._transform import rotate
 from ._geom import InvertedGeometry
-from ..math import Tensor, instance
+from ..math import Tensor, instance, batch, channel, non_channel
 from ..math.magic import slicing_dict
 
 
+_CULL_MIN_MEMBERS = 8
+"""Minimum number of geometries in a `GeometryStack` for queries to be culled using a bounding volume hierarchy."""
+
+
+class _BoxBVH:
+    """
+    Bounding volume hierarchy over axis-aligned boxes, stored as flat NumPy arrays.
+    Queries traverse the tree breadth-first for all points at once, processing one tree level per iteration.
+    """
+
+    def __init__(self, lower: np.ndarray, upper: np.ndarray, leaf_size=4):
+        """
+        Args:
+            lower: Lower box corners of shape (boxes, d).
+            upper: Upper box corners of shape (boxes, d).
+            leaf_size: Maximum number of boxes per leaf node.
+        """
+        self.lower, self.upper = lower, upper
+        self.perm = np.arange(lower.shape[0])
+        node_lower, node_upper, children, ranges = [], [], [], []
+        pending = [(0, lower.shape[0])]
+        while pending:  # nodes are numbered in the order they are created
+            start, end = pending.pop(0)
+            members = self.perm[start:end]
+            node_lower.append(np.min(lower[members], 0))
+            node_upper.append(np.max(upper[members], 0))
+            ranges.append((start, end))
+            if end - start <= leaf_size:
+                children.append((-1, -1))
+            else:  # median split along the axis of largest extent of the box centers
+                centers = (lower[members] + upper[members]) / 2
+                axis = np.argmax(np.max(centers, 0) - np.min(centers, 0))
+                self.perm[start:end] = members[np.argsort(centers[:, axis], kind='stable')]
+                mid = (start + end) // 2
+                first_child = len(ranges) + len(pending)
+                children.append((first_child, first_child + 1))
+                pending.extend([(start, mid), (mid, end)])
+        self.node_lower = np.stack(node_lower)
+        self.node_upper = np.stack(node_upper)
+        self.children = np.asarray(children)
+        self.ranges = np.asarray(ranges)
+
+    def _expand_leaves(self, query: np.ndarray, node: np.ndarray):
+        start, end = self.ranges[node, 0], self.ranges[node, 1]
+        return np.repeat(query, end - start), self.perm[_expand_ranges(start, end)]
+
+    def _traverse(self, q_lower: np.ndarray, q_upper: np.ndarray, keep_fn):
+        query = np.arange(q_lower.shape[0])
+        node = np.zeros_like(query)
+        result_query, result_box = [], []
+        while query.size:
+            keep = keep_fn(q_lower[query], q_upper[query], self.node_lower[node], self.node_upper[node], query)
+            query, node = query[keep], node[keep]
+            is_leaf = self.children[node, 0] < 0
+            leaf_query, leaf_box = self._expand_leaves(query[is_leaf], node[is_leaf])
+            result_query.append(leaf_query)
+            result_box.append(leaf_box)
+            query = np.repeat(query[~is_leaf], 2)
+            node = self.children[node[~is_leaf]].reshape(-1)
+        return np.concatenate(result_query), np.concatenate(result_box)
+
+    def containing(self, points: np.ndarray, tile_size=64):
+        """Returns all (point, box) index pairs where the box contains the point. The tree is traversed for tiles of `tile_size` points."""
+        order, ptr, t_lower, t_upper = _tile_points(points, tile_size)
+        tile, box = self._traverse(t_lower, t_upper, lambda ql, qu, lo, up, _: np.all((qu >= lo) & (ql <= up), -1))
+        pt, box = _expand_tiles(order, ptr, tile, box)
+        keep = np.all((points[pt] >= self.lower[box]) & (points[pt] <= self.upper[box]), -1)
+        return pt[keep], box[keep]
+
+    def closest(self, points: np.ndarray, tile_size=64):
+        """
+        Returns all (point, box) index pairs where the box may contain the closest surface to the point.
+        A box is culled if its distance to the point exceeds the largest distance to another box that lies closer.
+        The distance lower bound uses the L-infinity norm so that geometries approximating their distance with it, such as `Box`, are never culled wrongly.
+        The tree is traversed for tiles of `tile_size` points.
+        """
+        order, ptr, t_lower, t_upper = _tile_points(points, tile_size)
+        # --- upper bound on the distance from the leaf reached by greedy descent towards the closer child ---
+        node = np.zeros(t_lower.shape[0], dtype=int)
+        internal = np.flatnonzero(self.children[node, 0] >= 0)
+        while internal.size:
+            children = self.children[node[internal]]
+            dist = np.sum(_box_gap(t_lower[internal, None, :], t_upper[internal, None, :], self.node_lower[children], self.node_upper[children]) ** 2, -1)
+            node[internal] = np.where(dist[:, 0] <= dist[:, 1], children[:, 0], children[:, 1])
+            internal = internal[self.children[node[internal], 0] >= 0]
+        tile, box = self._expand_leaves(np.arange(t_lower.shape[0]), node)
+        upper_bound = _min_per_query(_box_max_dist(t_lower[tile], t_upper[tile], self.lower[box], self.upper[box]), tile, t_lower.shape[0])
+        # --- collect all boxes that may lie closer, then refine the bound per point ---
+        tile, box = self._traverse(t_lower, t_upper, lambda ql, qu, lo, up, q: np.max(_box_gap(ql, qu, lo, up), -1) <= upper_bound[q])
+        pt, box = _expand_tiles(order, ptr, tile, box)
+        p_lower, p_upper = self.lower[box], self.upper[box]
+        upper_bound = _min_per_query(_box_max_dist(points[pt], points[pt], p_lower, p_upper), pt, points.shape[0])
+        keep = np.max(_box_gap(points[pt], points[pt], p_lower, p_upper), -1) <= upper_bound[pt]
+        return pt[keep], box[keep]
+
+
+def _box_gap(lower1, upper1, lower2, upper2):
+    """Per-axis gap between two boxes, 0 where they overlap."""
+    return np.maximum(0, np.maximum(lower2 - upper1, lower1 - upper2))
+
+
+def _box_max_dist(lower1, upper1, lower2, upper2):
+    """Largest Euclidean distance between any points of two boxes."""
+    return np.linalg.norm(np.maximum(abs(upper2 - lower1), abs(upper1 - lower2)), axis=-1)
+
+
+def _min_per_query(values: np.ndarray, query: np.ndarray, n: int):
+    order = np.argsort(query, kind='stable')
+    ptr = np.searchsorted(query[order], np.arange(n))
+    result = np.full(n, np.inf)
+    has_values = ptr < values.size
+    result[has_values] = np.minimum.reduceat(values[order], ptr[has_values])
+    return result
+
+
+def _expand_ranges(start: np.ndarray, end: np.ndarray):
+    """Concatenates `arange(s, e)` for all pairs of `start`, `end`."""
+    count = end - start
+    return np.repeat(start - np.cumsum(count) + count, count) + np.arange(np.sum(count))
+
+
+def _tile_points(points: np.ndarray, tile_size: int):
+    """Groups points into spatial tiles of approximately `tile_size` points. Returns the point order, tile pointers into the order and the tile bounds."""
+    lower, upper = np.min(points, 0), np.max(points, 0)
+    extent = np.maximum(upper - lower, 1e-3 * np.max(upper - lower) + 1e-30)
+    cell_size = (np.prod(extent) * tile_size / points.shape[0]) ** (1 / points.shape[1])
+    cell = np.minimum(((points - lower) / cell_size).astype(np.int64), (extent / cell_size).astype(np.int64))
+    key = np.ravel_multi_index(cell.T, tuple(np.max(cell, 0) + 1))
+    order = np.argsort(key, kind='stable')
+    ptr = np.append(np.flatnonzero(np.diff(key[order], prepend=-1)), points.shape[0])
+    return order, ptr, np.minimum.reduceat(points[order], ptr[:-1]), np.maximum.reduceat(points[order], ptr[:-1])
+
+
+def _expand_tiles(order: np.ndarray, ptr: np.ndarray, tile: np.ndarray, box: np.ndarray):
+    """Converts (tile, box) pairs to (point, box) pairs."""
+    return order[_expand_ranges(ptr[tile], ptr[tile + 1])], np.repeat(box, ptr[tile + 1] - ptr[tile])
+
+
 class GeometryStack(Geometry):
     """
     Represents a tensor of Geometries.
@@ -37,6 +177,7 @@ class GeometryStack(Geometry):
             set_op = 'union'
         assert set_op in ['union', 'intersection'], f"Set operation must be 'union' or 'intersection' but got {set_op}"
         self._set_op = set_op
+        self._bvh = None  # (geometries, _BoxBVH or None), built on first query
 
     @property
     def is_union(self):
@@ -141,13 +282,72 @@ class GeometryStack(Geometry):
             return math.min(vol, instance(self._geometries))
         return math.sum(vol, instance(self._geometries))
 
+    def _get_bvh(self) -> Optional[_BoxBVH]:
+        if self._bvh is None or self._bvh[0] is not self._geometries:
+            bvh = None
+            members = object_dims(self._geometries)
+            if members.rank == 1 and members.instance and members.volume >= _CULL_MIN_MEMBERS:
+                if not any(batch(g) for g in self._geometries):
+                    boxes = math.stack([bounding_box(g) for g in self._geometries], instance('members'))
+                    if boxes.lower.available:
+                        bvh = _BoxBVH(boxes.lower.numpy('members,vector'), boxes.upper.numpy('members,vector'))
+                        bvh.vector = channel(boxes)
+            self._bvh = (self._geometries, bvh)
+        return self._bvh[1]
+
+    def _culled_points(self, location: Tensor):
+        """Returns the BVH, the flattened query points and their NumPy representation if queries can be culled, else `None`."""
+        if not isinstance(location, Tensor) or not location.available or batch(location) or 'vector' not in location.shape:
+            return None
+        bvh = self._get_bvh()
+        if bvh is None or bvh.vector.item_names[0] != location.vector.item_names:
+            return None
+        flat = math.pack_dims(location, non_channel(location), instance('_points'))
+        return bvh, flat, flat.numpy('_points,vector')
+
+    def _evaluate_pairs(self, fun, flat: Tensor, pt: np.ndarray, member: np.ndarray) -> Tuple[Tensor, Tensor]:
+        """Evaluates `fun(geometry, points)` for every candidate pair, calling each geometry once. Returns the point indices and values along `_pairs`."""
+        order = np.argsort(member, kind='stable')
+        pt, member = pt[order], member[order]
+        bounds = np.flatnonzero(np.diff(member, prepend=-1, append=-1))
+        geometries = list(self._geometries)
+        values = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            points = flat[{'_points': wrap(pt[start:end], instance('_pairs'))}]
+            values.append(fun(geometries[member[start]], points))
+        return wrap(pt, instance('_pairs')), math.concat(values, '_pairs')
+
     def lies_inside(self, location: math.Tensor):
+        culled = self._culled_points(location)
+        if culled is not None:
+            bvh, flat, points = culled
+            if self._set_op == 'union':  # points can only lie inside geometries whose bounding box contains them
+                pt, member = bvh.containing(points)
+                if pt.size == 0:
+                    return math.expand(False, non_channel(location))
+                idx, inside = self._evaluate_pairs(lambda g, l: g.lies_inside(l), flat, pt, member)
+                inside = math.scatter(math.expand(False, instance(flat)), idx, inside, mode='any')
+            else:  # only points inside all bounding boxes need to be checked, dropping points as soon as one geometry excludes them
+                candidates = np.flatnonzero(np.all((points >= np.max(bvh.lower, 0)) & (points <= np.min(bvh.upper, 0)), -1))
+                for g in self._geometries:
+                    if candidates.size == 0:
+                        break
+                    candidates = candidates[g.lies_inside(flat[{'_points': wrap(candidates, instance('_pairs'))}]).numpy('_pairs')]
+                inside = wrap(np.isin(np.arange(instance(flat).size), candidates), instance(flat))
+            return math.unpack_dim(inside, '_points', non_channel(location))
         inside = math.map(lambda g, l: g.lies_inside(l), self._geometries, location, dims=object)
         if self._set_op == 'intersection':
             return math.all(inside, instance(self._geometries))
         return math.any(inside, instance(self._geometries))
 
     def approximate_signed_distance(self, location: math.Tensor):
+        culled = self._culled_points(location) if self._set_op == 'union' else None
+        if culled is not None:  # evaluate only geometries whose bounding box may hold the closest surface
+            bvh, flat, points = culled
+            pt, member = bvh.closest(points)
+            idx, dist = self._evaluate_pairs(lambda g, l: g.approximate_signed_distance(l), flat, pt, member)
+            dist = math.scatter(math.expand(math.INF, instance(flat)), idx, dist, mode='min')
+            return math.unpack_dim(dist, '_points', non_channel(location))
         dist = math.map(lambda g, l: g.approximate_signed_distance(l), self._geometries, location, dims=object)
         if self._set_op == 'union':
             return math.min(dist, instance(self._geometries))
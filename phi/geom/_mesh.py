@@ -99,7 +99,7 @@ class Mesh(Geometry):
 
     @cached_property
     def _faces(self) -> Dict[str, Any]:
-        if self.element_rank == 2:
+        if self.element_rank in (2, 3):
             centers, normals, areas, boundary_slices = build_faces(self.vertices.center, self.elements, self.boundaries, self.element_rank, self.periodic, self._vertex_mean, self.face_format)
             return {
                 'center': centers,
@@ -576,7 +576,8 @@ def mesh_from_numpy(points: Sequence[Sequence],
         polygons: List of elements. Each polygon is defined as a sequence of point indices mapping into `points'.
             E.g. `[(0, 1, 2)]` denotes a single triangle connecting points 0, 1, and 2.
         boundaries: An unstructured mesh can have multiple boundaries, each defined by a name `str` and a list of faces, defined by their vertices.
-            The `boundaries` `dict` maps boundary names to a list of edges (point pairs) in 2D and faces (3 or more points) in 3D (not yet supported).
+            The `boundaries` `dict` maps boundary names to a list of edges (point pairs) in 2D and faces (3 or 4 points) in 3D.
+            For 3D elements, a boundary with value `None` collects all boundary faces not listed explicitly.
         cell_dim: Dimension along which to list the cells. This should be an instance dimension.
         face_format: Storage format for cell connectivity, must be one of `csc`, `coo`, `csr`, `dense`.
 
@@ -617,7 +618,8 @@ def mesh(vertices: Geometry | Tensor,
         boundaries: Pass a `str` to assign one name to all boundary faces.
             For multiple boundaries, pass a `dict` mapping group names `str` to lists of faces, defined by their vertices.
             The last entry can be `None` to group all boundary faces not explicitly listed before.
-            The `boundaries` `dict` maps boundary names to a list of edges (point pairs) in 2D and faces (3 or more points) in 3D (not yet supported).
+            The `boundaries` `dict` maps boundary names to a list of edges (point pairs) in 2D and faces (3 or 4 points) in 3D.
+        element_rank: Spatial rank of the elements. Tetrahedral meshes must specify `element_rank=3` as they cannot be distinguished from quad surface meshes.
         face_format: Storage format for cell connectivity, must be one of `csc`, `coo`, `csr`, `dense`.
 
     Returns:
@@ -666,11 +668,13 @@ def build_faces(vertices: Tensor,  # (vertices:i, vector)
         vertices: `Tensor` representing list (instance) of vectors (channel)
         elements: Sparse matrix listing all elements (instance). Each entry represents a vertex (dual) belonging to an element.
         boundaries: Named sequences of edges (vertex pairs).
-        element_rank: Spatial rank of the elements (currently only 2 is supported)
+        element_rank: Spatial rank of the elements. 3D elements must be tetrahedra, pyramids, wedges or hexahedra.
         periodic: Which dims are periodic.
         vertex_mean: Mean vertex position for each element.
         face_format: Sparse matrix format to use for the element-element matrices.
     """
+    if element_rank == 3:
+        return _build_faces_3d(vertices, elements, boundaries, periodic, face_format)
     n_v = instance(vertices).size
     n_e = instance(elements).size
     # --- Periodic: map vertices of boundary+ to the corresponding vertex in boundary- ---
@@ -705,12 +709,7 @@ def build_faces(vertices: Tensor,  # (vertices:i, vector)
         edge_len = vec_length(edge_dir)
         normal = vec_normalize(stack([-edge_dir[1], edge_dir[0]], channel(edge_dir)))
     else:
-        raise NotImplementedError("Only 2D Mesh faces are currently supported")
-        # e_v = to_format(elements, 'coo').numpy().astype(np.int32)
-        # e_v.col = vertex_id[e_v.col]
-        # e_f = coo_matrix(...)
-        # f_v = coo_matrix(...)
-        # f_v_pos = vertices[...]
+        raise NotImplementedError(f"Faces can only be built for 2D and 3D elements but got element_rank={element_rank}")
     # --- Add virtual boundary elements to f_v for non-periodic boundaries ---
     boundary_slices = {}
     e_end, f_end = e_f.shape
@@ -744,6 +743,126 @@ def build_faces(vertices: Tensor,  # (vertices:i, vector)
     return edge_center[shared_edge], normal[shared_edge], edge_len[shared_edge], boundary_slices
 
 
+_SOLID_FACETS = {  # vertex count -> local vertex indices of each facet, following the gmsh / VTK vertex ordering
+    4: ((0, 2, 1), (0, 1, 3), (1, 2, 3), (0, 3, 2)),  # tetrahedron
+    5: ((0, 3, 2, 1), (0, 1, 4), (1, 2, 4), (2, 3, 4), (3, 0, 4)),  # pyramid
+    6: ((0, 2, 1), (3, 4, 5), (0, 1, 4, 3), (1, 2, 5, 4), (2, 0, 3, 5)),  # wedge
+    8: ((0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)),  # hexahedron
+}
+
+
+def _facet_keys(facet_vertices: np.ndarray, counts: np.ndarray, n_v: int) -> np.ndarray:
+    """
+    Computes an orientation- and rotation-independent key for each facet so that coinciding facets get the same key.
+
+    Args:
+        facet_vertices: Vertex indices of shape (facets, 4). Entries beyond `counts` are ignored.
+        counts: Number of vertices per facet.
+        n_v: Total number of vertices.
+
+    Returns:
+        1D array of keys. The four sorted vertex indices are packed into one `int64` using `ceil(log2(n_v + 1))` bits each if they fit into 63 bits.
+        Otherwise, each key is the raw bytes of the sorted indices as a `void` scalar.
+    """
+    srt = np.sort(np.where(np.arange(4) < counts[:, None], facet_vertices, n_v), axis=1).astype(np.int64)
+    bits = max(1, int(n_v).bit_length())  # indices range from 0 to n_v, the latter marking unused corners
+    if 4 * bits <= 63:
+        return (srt[:, 0] << 3 * bits) | (srt[:, 1] << 2 * bits) | (srt[:, 2] << bits) | srt[:, 3]
+    return np.ascontiguousarray(srt).view(np.dtype((np.void, 4 * srt.itemsize))).reshape(-1)
+
+
+def _build_faces_3d(vertices: Tensor,  # (vertices:i, vector)
+                    elements: Tensor,  # (elements:i, ~vertices)
+                    boundaries: str | Dict[str, Sequence] | None,  # vertex lists per face
+                    periodic: Sequence[str],  # periodic dim names
+                    face_format: str):
+    """
+    Vectorized face extraction for solid 3D elements.
+    All element facets are extracted per element type, then coinciding facets are matched by sorting their canonical vertex keys.
+    Facets without an interior partner must be listed in `boundaries`.
+    A boundary with value `None` collects all boundary facets not explicitly listed, and passing a `str` for `boundaries` assigns all boundary facets to a single boundary of that name.
+    """
+    if boundaries is None or isinstance(boundaries, str):
+        boundaries = {boundaries or 'boundary': None}
+    n_v = instance(vertices).size
+    n_e = instance(elements).size
+    # --- Periodic: map vertices of boundary+ to the corresponding vertex in boundary- ---
+    vertex_id = np.arange(n_v)
+    for dim in periodic:
+        vertex_id[np.concatenate(boundaries[dim+'+'])] = np.concatenate(boundaries[dim+'-'])
+    # --- extract all facets (padded to 4 vertices) of all elements, grouped by element type ---
+    e_v = stored_indices(elements).index[dual(elements).name].numpy()
+    v_count = dsum(elements).numpy()
+    ptr = np.cumsum(v_count) - v_count
+    f_vertices, f_elements, f_counts = [], [], []
+    for count in np.unique(v_count):
+        assert count in _SOLID_FACETS, f"3D elements must be tetrahedra, pyramids, wedges or hexahedra (4, 5, 6 or 8 vertices) but got element with {count} vertices"
+        e_idx = np.flatnonzero(v_count == count)
+        for local in _SOLID_FACETS[count]:
+            local = local + local[-1:] * (4 - len(local))
+            f_vertices.append(e_v[ptr[e_idx, None] + np.asarray(local)])
+            f_elements.append(e_idx)
+            f_counts.append(np.full(e_idx.size, len(set(local))))
+    f_vertices = np.concatenate(f_vertices)
+    f_elements = np.concatenate(f_elements)
+    f_counts = np.concatenate(f_counts)
+    n_f = f_vertices.shape[0]
+    # --- explicitly listed boundary facets ---
+    b_vertices, b_counts, b_owner, boundary_slices = [], [], [], {}
+    e_end = n_e
+    for bnd_key, bnd_faces in boundaries.items():
+        if bnd_key[:-1] in periodic or bnd_faces is None:
+            continue
+        bnd = [tuple(f) + tuple(f[-1:]) * (4 - len(f)) for f in bnd_faces]
+        b_vertices.append(np.asarray(bnd, dtype=f_vertices.dtype).reshape(-1, 4))
+        b_counts.append(np.asarray([len(f) for f in bnd_faces], dtype=f_counts.dtype))
+        b_owner.append(np.arange(e_end, e_end + len(bnd)))
+        boundary_slices[bnd_key] = {instance(elements).as_dual().name: slice(e_end, e_end + len(bnd))}
+        e_end += len(bnd)
+    b_vertices = np.concatenate(b_vertices) if b_vertices else np.zeros((0, 4), f_vertices.dtype)
+    b_counts = np.concatenate(b_counts) if b_counts else np.zeros((0,), f_counts.dtype)
+    b_owner = np.concatenate(b_owner) if b_owner else np.zeros((0,), np.int64)
+    # --- match coinciding facets by sorting their keys ---
+    keys = _facet_keys(vertex_id[np.concatenate([f_vertices, b_vertices])], np.concatenate([f_counts, b_counts]), n_v)
+    _, group, group_size = np.unique(keys, return_inverse=True, return_counts=True)
+    group = group.reshape(-1)
+    assert np.all(group_size <= 2), f"Non-manifold mesh: {np.sum(group_size > 2)} faces are shared by more than two elements or boundary faces"
+    order = np.argsort(group, kind='stable')
+    first = np.flatnonzero(np.diff(group[order], prepend=-1))
+    pairs = first[group_size[group[order[first]]] == 2]
+    partner = np.full(keys.shape[0], -1)
+    partner[order[pairs]] = order[pairs + 1]
+    partner[order[pairs + 1]] = order[pairs]
+    partner = partner[:n_f]
+    owner = np.concatenate([f_elements, b_owner])
+    # --- assign unmatched facets to the catch-all boundary ---
+    unmatched = np.flatnonzero(partner < 0)
+    if unmatched.size:
+        catch_all = [k for k, v in boundaries.items() if v is None]
+        assert catch_all, f"{unmatched.size} element faces are neither shared by two elements nor listed in boundaries. Add a boundary with value None to collect them."
+        partner[unmatched] = np.arange(owner.size, owner.size + unmatched.size)
+        owner = np.concatenate([owner, np.arange(e_end, e_end + unmatched.size)])
+        boundary_slices[catch_all[0]] = {instance(elements).as_dual().name: slice(e_end, e_end + unmatched.size)}
+        e_end += unmatched.size
+    # --- Compute facet properties by fan-triangulating around the vertex mean: center, normal, area ---
+    f_v_pos = vertices[reshaped_tensor(f_vertices, [instance('facets'), dual('corner')])]
+    f_v_next = vertices[reshaped_tensor(f_vertices[:, [1, 2, 3, 0]], [instance('facets'), dual('corner')])]
+    counts = wrap(f_counts, 'facets:i')
+    is_unique = wrap(np.arange(4) < f_counts[:, None], 'facets:i,~corner')
+    v_mean = dsum(where(is_unique, f_v_pos, 0)) / counts
+    tri_area = cross(f_v_pos - v_mean, f_v_next - v_mean) / 2
+    area_vec = dsum(tri_area)
+    area = vec_length(area_vec)
+    normal = vec_normalize(area_vec)
+    tri_weight = tri_area.vector @ normal.vector
+    center = dsum(tri_weight * (v_mean + f_v_pos + f_v_next) / 3) / dsum(tri_weight)
+    # --- element connectivity storing the outgoing facet_index+1 for each element pair ---
+    e_e = coo_matrix((np.arange(1, n_f+1), (f_elements, owner[partner])), shape=(n_e, e_end)).tocsr()
+    shared_face = wrap(e_e, instance(elements).without_sizes() & dual) - 1
+    shared_face = to_format(shared_face, face_format)
+    return center[shared_face], normal[shared_face], area[shared_face], boundary_slices
+
+
 def build_mesh(bounds: Box = None,
                resolution=EMPTY_SHAPE,
                obstacles: Union[Geometry, Dict[str, Geometry]] = None,
@@ -1,13 +1,18 @@
+import itertools
+from functools import reduce
 from numbers import Number
+from operator import mul
 from typing import Union, Tuple, Dict, Any, Optional, Sequence
 
+import numpy as np
+
 from phiml import math
 from phiml.math import Shape, Tensor, spatial, channel, non_spatial, expand, instance, dual, clip, wrap
 from phiml.math.magic import slicing_dict
 from ._geom import Geometry
 from ._functions import clip_length
 from ._grid import UniformGrid
-from ._box import BaseBox, Cuboid
+from ._box import BaseBox, Cuboid, Box
 
 
 class SDFGrid(Geometry):
@@ -242,6 +247,211 @@ class SDFGrid(Geometry):
         return SDFGrid(s, self._bounds, self._approximate_outside, g, t, n, i, self._center, self._volume, self._bounding_radius)
 
 
+class BlockSDFGrid(Geometry):
+    """
+    Hierarchical signed distance field consisting of a coarse dense `SDFGrid` and fine blocks that are only stored near the surface.
+
+    Each coarse cell corresponds to `block_size`^d fine cells.
+    Queries inside a refined block interpolate the fine values, all other queries are answered by the coarse grid.
+    Use `sample_sdf()` with `block_size` to build a `BlockSDFGrid` from any `Geometry`.
+    """
+
+    def __init__(self, coarse: SDFGrid, block_values: Tensor, block_index: Tensor, block_size: int):
+        """
+        Args:
+            coarse: Dense SDF grid with one cell per block.
+            block_values: Fine SDF values of all refined blocks. `Tensor` with one instance dim listing the blocks and spatial dims of size `block_size + 2`.
+                Each block stores one additional layer of cells on each side so that interpolation does not require neighboring blocks.
+            block_index: Integer `Tensor` with the spatial dims of `coarse`, holding the index of the refined block along the instance dim of `block_values` or -1 for coarse cells that are not refined.
+            block_size: Number of fine cells per coarse cell along each dim.
+        """
+        super().__init__()
+        self._coarse = coarse
+        self._block_values = block_values
+        self._block_index = block_index
+        self._block_size = block_size
+
+    def __variable_attrs__(self):
+        return '_coarse', '_block_values'
+
+    def __value_attrs__(self):
+        return '_coarse', '_block_values'
+
+    @property
+    def coarse(self) -> SDFGrid:
+        """Coarse SDF grid used away from the surface."""
+        return self._coarse
+
+    @property
+    def block_size(self) -> int:
+        return self._block_size
+
+    @property
+    def block_count(self) -> int:
+        """Number of refined blocks."""
+        return instance(self._block_values).size
+
+    @property
+    def bounds(self) -> BaseBox:
+        return self._coarse.bounds
+
+    @property
+    def size(self) -> Tensor:
+        return self._coarse.size
+
+    @property
+    def resolution(self) -> Shape:
+        """Resolution of the fine grid."""
+        return self._coarse.resolution.with_sizes([n * self._block_size for n in self._coarse.resolution.sizes])
+
+    @property
+    def dx(self) -> Tensor:
+        """Fine cell size."""
+        return self._coarse.dx / self._block_size
+
+    @property
+    def grid(self) -> UniformGrid:
+        return UniformGrid(self.resolution, self.bounds)
+
+    @property
+    def center(self) -> Tensor:
+        return self._coarse.center
+
+    @property
+    def shape(self) -> Shape:
+        return self._coarse.shape
+
+    @property
+    def volume(self) -> Tensor:
+        return self._coarse.volume
+
+    @property
+    def faces(self) -> 'Geometry':
+        raise NotImplementedError(f"SDF does not support faces")
+
+    @property
+    def face_centers(self) -> Tensor:
+        raise NotImplementedError(f"SDF does not support faces")
+
+    @property
+    def face_areas(self) -> Tensor:
+        raise NotImplementedError(f"SDF does not support faces")
+
+    @property
+    def face_normals(self) -> Tensor:
+        raise NotImplementedError(f"SDF does not support faces")
+
+    @property
+    def boundary_elements(self) -> Dict[Any, Dict[str, slice]]:
+        return {}
+
+    @property
+    def boundary_faces(self) -> Dict[Any, Dict[str, slice]]:
+        return {}
+
+    @property
+    def face_shape(self) -> Shape:
+        return math.EMPTY_SHAPE
+
+    @property
+    def corners(self) -> Tensor:
+        raise NotImplementedError(f"SDF does not support corners")
+
+    def _sample_fine(self, location: Tensor, gradient: bool):
+        """Interpolates the fine blocks at `location`. Returns the refined mask, the SDF values and optionally the SDF gradient."""
+        dims = self._coarse.resolution
+        float_idx = (location - self.bounds.lower) / self.dx
+        coarse_idx = math.to_int32(math.floor(float_idx / self._block_size))
+        refined = self.bounds.lies_inside(location)
+        coarse_idx = clip(coarse_idx, 0, wrap(dims.sizes, channel(location)) - 1)
+        block = self._block_index[coarse_idx]
+        refined &= block >= 0
+        block = math.maximum(block, 0)
+        local = float_idx - coarse_idx * self._block_size + .5  # index into block including one cell of padding
+        i0 = clip(math.to_int32(math.floor(local)), 0, self._block_size)
+        t = clip(local - i0, 0, 1)
+        block_dim = instance(self._block_values).name
+        value = 0
+        grad = [0] * dims.rank
+        for corner in itertools.product((0, 1), repeat=dims.rank):
+            idx = math.stack({block_dim: block, **{d: i0[d] + o for d, o in zip(dims.names, corner)}}, channel('index'))
+            v = self._block_values[idx]
+            weights = [t[d] if o else 1 - t[d] for d, o in zip(dims.names, corner)]
+            value += v * reduce(mul, weights)
+            if gradient:
+                for k, o in enumerate(corner):
+                    grad[k] += v * reduce(mul, [(1 if o else -1) if j == k else w for j, w in enumerate(weights)])
+        if gradient:
+            grad = math.stack(grad, channel(location)) / self.dx
+            return refined, value, grad
+        return refined, value
+
+    def lies_inside(self, location: Tensor) -> Tensor:
+        return self.approximate_signed_distance(location) <= 0
+
+    def approximate_signed_distance(self, location: Tensor) -> Tensor:
+        refined, fine_sdf = self._sample_fine(location, gradient=False)
+        return math.where(refined, fine_sdf, self._coarse.approximate_signed_distance(location))
+
+    def approximate_closest_surface(self, location: Tensor) -> Tuple[Tensor, Tensor, Tensor, Tensor, Tensor]:
+        refined, fine_sdf, fine_grad = self._sample_fine(location, gradient=True)
+        sgn_dist, to_surf, normal, _, _ = self._coarse.approximate_closest_surface(location)
+        fine_normal = math.vec_normalize(fine_grad)
+        sgn_dist = math.where(refined, fine_sdf, sgn_dist)
+        normal = math.where(refined, fine_normal, normal)
+        to_surf = math.where(refined, -fine_sdf * fine_normal, to_surf)
+        offset = normal.vector @ (location + to_surf).vector
+        return sgn_dist, to_surf, normal, offset, None
+
+    def sample_uniform(self, *shape: math.Shape) -> Tensor:
+        raise NotImplementedError
+
+    def bounding_radius(self) -> Tensor:
+        return self._coarse.bounding_radius()
+
+    def bounding_half_extent(self) -> Tensor:
+        return self._coarse.bounding_half_extent()
+
+    def shifted(self, delta: Tensor) -> 'Geometry':
+        return BlockSDFGrid(self._coarse.shifted(delta), self._block_values, self._block_index, self._block_size)
+
+    def at(self, center: Tensor) -> 'Geometry':
+        return self.shifted(center - self.center)
+
+    def rotated(self, angle: Union[float, Tensor]) -> 'Geometry':
+        raise NotImplementedError("SDF does not yet support rotation")
+
+    def scaled(self, factor: Union[float, Tensor]) -> 'Geometry':
+        raise NotImplementedError("BlockSDFGrid does not yet support scaling")
+
+    def __getitem__(self, item):
+        item = slicing_dict(self, item)
+        if 'vector' in item:
+            raise NotImplementedError("SDF projection not yet supported")
+        return BlockSDFGrid(self._coarse[item], self._block_values[item], self._block_index, self._block_size)
+
+
+def _sample_block_sdf(geometry: Geometry, grid: UniformGrid, block_size: int, approximate_outside: bool, center, volume, bounding_radius) -> BlockSDFGrid:
+    res = grid.resolution
+    assert all(n % block_size == 0 for n in res.sizes), f"Resolution must be divisible by block_size={block_size} but got {res}"
+    coarse_res = res.with_sizes([n // block_size for n in res.sizes])
+    coarse_sdf = geometry.approximate_signed_distance(UniformGrid(coarse_res, grid.bounds).center)
+    coarse = SDFGrid(coarse_sdf, grid.bounds, approximate_outside, gradient=True, center=center, volume=volume, bounding_radius=bounding_radius)
+    # --- refine coarse cells that may contain surface points (including the padding layer of fine cells) ---
+    max_dist = .5 * math.vec_length(coarse.dx) + 1.5 * math.vec_length(grid.dx)
+    refine = math.any(abs(coarse_sdf) <= max_dist, non_spatial)
+    refine_np = refine.numpy(coarse_res)
+    block_origins = np.argwhere(refine_np)
+    block_index = np.full(coarse_res.sizes, -1, np.int32)
+    block_index[tuple(block_origins.T)] = np.arange(block_origins.shape[0])
+    block_index = wrap(block_index, coarse_res)
+    # --- query geometry on fine blocks ---
+    block_lower = grid.bounds.lower + wrap(block_origins, instance(blocks=block_origins.shape[0]), channel(grid)) * block_size * grid.dx
+    local = UniformGrid(res.with_sizes(block_size + 2), Box(-grid.dx, (block_size + 1) * grid.dx)).center
+    block_values = geometry.approximate_signed_distance(block_lower + local)
+    return BlockSDFGrid(coarse, block_values, block_index, block_size)
+
+
 def sample_sdf(geometry: Geometry,
                bounds: BaseBox | UniformGrid = None,
                resolution: Shape = math.EMPTY_SHAPE,
@@ -251,7 +461,8 @@ def sample_sdf(geometry: Geometry,
                rel_margin=.1,
                abs_margin=0.,
                cache_surface=False,
-               **resolution_: int) -> SDFGrid:
+               block_size: int = None,
+               **resolution_: int) -> Union[SDFGrid, 'BlockSDFGrid']:
     """
     Build a grid of signed distance values for a given `Geometry` object.
 
@@ -262,11 +473,15 @@ def sample_sdf(geometry: Geometry,
         **resolution_: Grid resolution as `kwargs`, e.g. `x=64, y=32`.
         approximate_outside: Whether queries outside the SDF grid should return approximate values. This requires additional computations.
         rebuild: If `'from-surface'`, SDF values are calculated from a narrow strip above the enclosed surface. This is more accurate but requires additional steps.
+            If `'fast-sweep'`, `geometry` is only queried on a coarse grid and in a narrow band of width `valid_dist` around the surface.
+            The remaining values are obtained by solving the Eikonal equation, see `fast_sweep_sdf()`.
             If `None` (default), SDF values are queried from `geometry`.
             `'auto'` rebuilds when geometry querying is expected to be in accurate.
+        block_size: If specified, returns a `BlockSDFGrid` that only stores the full resolution in blocks of `block_size`^d cells close to the surface and a coarse grid elsewhere.
+            This reduces memory and sampling cost for large resolutions. The resolution must be divisible by `block_size`.
 
     Returns:
-        SDF grid as `Geometry`.
+        SDF grid as `Geometry`, `BlockSDFGrid` if `block_size` is specified.
     """
     resolution = resolution & spatial(**resolution_)
     if bounds is None:
@@ -288,6 +503,13 @@ def sample_sdf(geometry: Geometry,
         volume = geometry.volume
         bounding_radius = geometry.bounding_radius()
         rebuild = None if rebuild == 'auto' else rebuild
+    if block_size is not None:
+        assert rebuild is None and not cache_surface, f"rebuild and cache_surface are not supported for block SDFs"
+        return _sample_block_sdf(geometry, UniformGrid(resolution, bounds), block_size, approximate_outside, center, volume, bounding_radius)
+    if rebuild == 'fast-sweep':
+        assert not cache_surface, f"cache_surface is not supported with rebuild='fast-sweep'"
+        sdf = fast_sweep_sdf(geometry, UniformGrid(resolution, bounds), valid_dist)
+        return SDFGrid(sdf, bounds, approximate_outside, center=center, volume=volume, bounding_radius=bounding_radius)
     if cache_surface or rebuild is not None:
         sdf, delta, normal, _, idx = geometry.approximate_closest_surface(points)
         approximate = SDFGrid(sdf, bounds, approximate_outside, None, delta, normal, idx, center=center, volume=volume, bounding_radius=bounding_radius)
@@ -336,4 +558,140 @@ def refine_closest(sample_points, closest, refine: Geometry, max_step, steps=10)
     # plot(PointCloud(sample_points, stack(trj, batch('t')) - sample_points), animate='t', frame_time=250)
     _, delta, *_ = refine.approximate_closest_surface(closest)
     closest += delta
-    return closest
\ No newline at end of file
+    return closest
+
+
+def fast_sweep_sdf(geometry: Geometry, grid: UniformGrid, band: Union[float, Tensor] = None, coarse_factor=4, max_rounds=3) -> Tensor:
+    """
+    Computes signed distance values of `geometry` on `grid` by querying `geometry` only near its surface and solving the Eikonal equation `|grad d| = 1` elsewhere.
+
+    First, `geometry` is sampled on a grid that is `coarse_factor` times coarser to locate the surface and determine the sign of far-away cells.
+    Then, distances are queried on all fine cells within coarse cells that may lie within `band` of the surface.
+    These values are propagated outward by the parallel fast sweeping method which updates whole hyperplanes of cells at once.
+
+    Args:
+        geometry: `Geometry` to sample.
+        grid: Grid whose cell centers to compute the SDF values for.
+        band: Distance from the surface within which SDF values are queried from `geometry`. Defaults to one cell diagonal.
+        coarse_factor: Resolution factor between the fine grid and the grid used to locate the surface.
+        max_rounds: Maximum number of rounds, each sweeping along all 2^d diagonal directions. Sweeping stops early once converged.
+
+    Returns:
+        SDF values as `Tensor` with the spatial dims of `grid`.
+    """
+    res = grid.resolution
+    dx = grid.dx
+    band = math.vec_length(dx) if band is None else math.maximum(band, math.vec_length(dx))
+    # --- locate surface on coarse grid ---
+    coarse_res = res.with_sizes([-(-n // coarse_factor) for n in res.sizes])
+    coarse_size = dx * coarse_factor * wrap(coarse_res.sizes, channel(vector=res.names))
+    coarse_grid = UniformGrid(coarse_res, Box(grid.bounds.lower, grid.bounds.lower + coarse_size))
+    coarse_sdf = geometry.approximate_signed_distance(coarse_grid.center)
+    threshold = .5 * coarse_factor * math.vec_length(dx) + band
+    nsp = non_spatial(coarse_sdf)
+    coarse_np = math.reshaped_numpy(coarse_sdf, [nsp, coarse_res]).reshape(-1, *coarse_res.sizes)
+    threshold = float(math.max(threshold))
+    up = coarse_np
+    for axis, n in enumerate(res.sizes):
+        up = np.repeat(up, coarse_factor, axis=axis + 1).take(np.arange(n), axis=axis + 1)
+    sign = np.sign(up).reshape(up.shape[0], -1)
+    in_band = np.any(np.abs(up) <= threshold, 0).reshape(-1)
+    # --- query geometry in narrow band ---
+    centers = math.pack_dims(grid.center, res, instance('cells'))
+    dist = np.full(sign.shape, np.inf, dtype=coarse_np.dtype)
+    band_idx = np.flatnonzero(in_band)
+    if band_idx.size:
+        _query_sdf(geometry, centers, band_idx, nsp, dist, sign, np.ones(dist.shape[0], bool))
+    # --- surface far from the grid: query the outermost cells instead ---
+    missing = ~np.any(np.isfinite(dist), 1)
+    if missing.any():
+        boundary = np.zeros(res.sizes, bool)
+        for axis in range(res.rank):
+            boundary[(slice(None),) * axis + ([0, -1],)] = True
+        _query_sdf(geometry, centers, np.flatnonzero(boundary), nsp, dist, sign, missing)
+    # --- propagate distances ---
+    dx_np = math.reshaped_numpy(dx, [channel(grid)])
+    dist = _fast_sweep(dist.reshape(-1, *res.sizes), dx_np, max_rounds).reshape(dist.shape)
+    return math.reshaped_tensor(sign * dist, [nsp, res], convert=False)
+
+
+def _query_sdf(geometry: Geometry, centers: Tensor, idx: np.ndarray, nsp: Shape, dist: np.ndarray, sign: np.ndarray, batches: np.ndarray):
+    """ Writes the SDF values of `geometry` at the flat cell indices `idx` into `dist` and `sign` for the selected `batches`. """
+    points = centers[{'cells': wrap(idx, instance('cells'))}]
+    sdf = math.reshaped_numpy(geometry.approximate_signed_distance(points), [nsp, instance(points)])
+    sdf = np.broadcast_to(sdf, (dist.shape[0], idx.size))[batches]
+    dist[np.ix_(batches, idx)] = np.abs(sdf)
+    sign[np.ix_(batches, idx)] = np.where(sdf < 0, -1, 1)
+
+
+def _fast_sweep(dist: np.ndarray, dx: np.ndarray, max_rounds: int) -> np.ndarray:
+    """
+    Parallel fast sweeping (Detrixhe et al. 2013) on a regular grid.
+    Cells with finite `dist` are treated as fixed, all other cells are computed.
+
+    Args:
+        dist: Unsigned distances of shape (batch, *resolution) with `inf` marking unknown cells.
+        dx: Cell size per spatial dim.
+        max_rounds: Maximum number of rounds over all sweep directions.
+
+    Returns:
+        Unsigned distances of same shape as `dist`.
+    """
+    b, *res = dist.shape
+    padded = np.pad(dist, [(0, 0)] + [(1, 1)] * len(res), constant_values=np.inf)
+    strides = [int(np.prod(padded.shape[2+i:])) for i in range(len(res))]
+    flat = padded.reshape(b, -1)
+    fixed = np.isfinite(dist).reshape(b, -1)
+    aranges = [np.arange(n).reshape([n if j == i else 1 for j in range(len(res))]) for i, n in enumerate(res)]
+    padded_idx = sum((a + 1) * s for a, s in zip(aranges, strides)).reshape(-1)
+    free = np.flatnonzero(~np.all(fixed, 0))  # cells that are fixed in all batches need not be swept
+    level_count = sum(res) - len(res) + 1
+    level_dtype = np.uint16 if level_count < 2 ** 16 else np.int64  # 16-bit integers are radix-sorted in linear time
+    for _ in range(max_rounds):
+        converged = True
+        for flips in itertools.product((False, True), repeat=len(res)):
+            # --- cells on a hyperplane sum(i) = L only depend on L-1 and L+1 and can be updated together ---
+            level = sum(((n - 1 - a) if f else a).astype(level_dtype) for a, n, f in zip(aranges, res, flips)).reshape(-1)[free]
+            perm = np.argsort(level, kind='stable')
+            order = free[perm]
+            ptr = np.searchsorted(level[perm], np.arange(level_count + 1))
+            for start, end in zip(ptr[:-1], ptr[1:]):
+                cells = order[start:end]
+                p_idx = padded_idx[cells]
+                nb = np.stack([np.minimum(flat[:, p_idx - s], flat[:, p_idx + s]) for s in strides], -1)
+                current = flat[:, p_idx]
+                new = np.where(fixed[:, cells], current, np.minimum(current, _eikonal_update(nb, dx)))
+                if converged and np.any(new < current):
+                    converged = False
+                flat[:, p_idx] = new
+        if converged:
+            break
+    return flat.reshape(padded.shape)[(slice(None),) + (slice(1, -1),) * len(res)]
+
+
+def _eikonal_update(nb: np.ndarray, dx: np.ndarray) -> np.ndarray:
+    """
+    Godunov upwind solution of `sum_i ((u - nb_i)^+ / dx_i)^2 = 1`.
+
+    Args:
+        nb: Smallest neighbor distance along each axis of shape (..., d).
+        dx: Cell size along each axis (d,).
+    """
+    if np.all(dx == dx[0]):
+        nb = np.sort(nb, -1)
+        h = np.broadcast_to(dx[0], nb.shape)
+    else:
+        order = np.argsort(nb, -1)
+        nb = np.take_along_axis(nb, order, -1)
+        h = dx[order]
+    w = 1 / h ** 2
+    u = nb[..., 0] + h[..., 0]
+    a_sum, b_sum, c_sum = w[..., 0], nb[..., 0] * w[..., 0], nb[..., 0] ** 2 * w[..., 0] - 1
+    with np.errstate(invalid='ignore'):
+        for m in range(1, nb.shape[-1]):
+            a_sum = a_sum + w[..., m]
+            b_sum = b_sum + nb[..., m] * w[..., m]
+            c_sum = c_sum + nb[..., m] ** 2 * w[..., m]
+            u_m = (b_sum + np.sqrt(np.maximum(b_sum ** 2 - a_sum * c_sum, 0))) / a_sum
+            u = np.where(u > nb[..., m], u_m, u)
+    return u
@@ -7,6 +7,7 @@ Examples:
 * mac_cormack (grid)
 * runge_kutta_4 (particle)
 """
+from contextlib import nullcontext
 from typing import Union
 
 from phi import math
@@ -14,6 +15,7 @@ from phi.field import Field, PointCloud, Grid, spatial_gradient, unstack, stack,
 from phi.geom import Geometry
 from phi.math import Solve, channel
 from phiml.math import Tensor
+from phiml.math._lazy import materialize
 from phiml.math.extrapolation import NONE
 
 
@@ -24,15 +26,17 @@ def euler(data: Field, velocity: Field, dt: float, v0: Tensor = None) -> Tensor:
     return data.points + v0 * dt
 
 
-def rk4(data: Field, velocity: Field, dt: float, v0: Tensor = None) -> Tensor:
-    """ Runge-Kutta-4 integrator. """
+def rk4(data: Field, velocity: Field, dt: float, v0: Tensor = None, fuse=False) -> Tensor:
+    """ Runge-Kutta-4 integrator. Pass `fuse=True`, e.g. via `functools.partial`, to evaluate the final update with `phiml.math.fuse()`. """
     if v0 is None:
         v0 = sample(velocity, data.geometry, at=data.sampled_at, boundary=data.boundary)
     v_half = sample(velocity, data.points + 0.5 * dt * v0, at=data.sampled_at, boundary=data.boundary)
     v_half2 = sample(velocity, data.points + 0.5 * dt * v_half, at=data.sampled_at, boundary=data.boundary)
     v_full = sample(velocity, data.points + dt * v_half2, at=data.sampled_at, boundary=data.boundary)
-    v_rk4 = (1 / 6.) * (v0 + 2 * (v_half + v_half2) + v_full)
-    return data.points + dt * v_rk4
+    with math.fuse() if fuse else nullcontext():
+        v_rk4 = (1 / 6.) * (v0 + 2 * (v_half + v_half2) + v_full)
+        points = data.points + dt * v_rk4
+    return materialize(points) if fuse else points
 
 
 def finite_rk4(data: Field, velocity: Grid, dt: float, v0: math.Tensor = None) -> Tensor:
@@ -183,7 +187,8 @@ def mac_cormack(field: Field,
                 velocity: Field,
                 dt: float,
                 correction_strength=1.0,
-                integrator=euler) -> Field:
+                integrator=euler,
+                fuse=False) -> Field:
     """
     MacCormack advection uses a forward and backward lookup to determine the first-order error of semi-Lagrangian advection.
     It then uses that error estimate to correct the field values.
@@ -196,6 +201,7 @@ def mac_cormack(field: Field,
         correction_strength: The estimated error is multiplied by this factor before being applied.
             The case correction_strength=0 equals semi-lagrangian advection. Set lower than 1.0 to avoid oscillations.
         integrator: ODE integrator for solving the movement.
+        fuse: If `True`, evaluates the correction with `phiml.math.fuse()`.
 
     Returns:
         Advected field of type `type(field)`
@@ -206,7 +212,8 @@ def mac_cormack(field: Field,
     # --- forward+backward semi-Lagrangian advection ---
     fwd_adv = field.with_values(reduce_sample(field, points_bwd))
     bwd_adv = field.with_values(reduce_sample(fwd_adv, points_fwd))
-    new_field = fwd_adv + correction_strength * 0.5 * (field - bwd_adv)
+    with math.fuse() if fuse else nullcontext():
+        new_field = fwd_adv + correction_strength * 0.5 * (field - bwd_adv)
     # --- Clamp overshoots ---
     limits = field.closest_values(points_bwd)
     lower_limit = math.min(limits, [f'closest_{dim}' for dim in field.shape.spatial.names])
@@ -87,12 +87,14 @@ def implicit(field: Field,
     Returns:
         Diffused field of same type as `field`.
     """
-    @jit_compile_linear
-    def sharpen(x):
-        return explicit(x, diffusivity, -dt, gradient=gradient, upwind=upwind, correct_skew=correct_skew)
     if not solve.x0:
         solve = copy_with(solve, x0=field)
-    return solve_linear(sharpen, y=field, solve=solve, grad_for_f=gradient_for_diffusivity)
+    return solve_linear(_sharpen, field, solve, diffusivity, dt, gradient, upwind, correct_skew, grad_for_f=gradient_for_diffusivity)
+
+
+@jit_compile_linear(forget_traces=True, stable_pattern=True)  # changing diffusivity or dt only updates the matrix values
+def _sharpen(x, diffusivity, dt, gradient, upwind, correct_skew):
+    return explicit(x, diffusivity, -dt, gradient=gradient, upwind=upwind, correct_skew=correct_skew)
 
 
 def differential(u: Field,
@@ -4,16 +4,17 @@ Functions for simulating incompressible fluids, both grid-based and particle-bas
 The main function for incompressible fluids (Eulerian as well as FLIP / PIC) is `make_incompressible()` which removes the divergence of a velocity field.
 """
 import warnings
+from collections import OrderedDict
 from typing import Tuple, Callable, Union, List, Optional
 
 from phi import math, field
 from phi.math import wrap, channel, Solve
-from phi.field import AngularVelocity, Grid, divergence, spatial_gradient, where, CenteredGrid, PointCloud, Field, resample
-from phi.geom import union, Geometry
+from phi.field import AngularVelocity, Grid, divergence, spatial_gradient, where, CenteredGrid, PointCloud, Field, resample, sample
+from phi.geom import union, Geometry, UniformGrid
 from phiml.math import Tensor
 from ..field._embed import FieldEmbedding
 from ..field._grid import StaggeredGrid
-from ..math import extrapolation, NUMPY, batch, shape, non_channel, expand
+from ..math import extrapolation, NUMPY, batch, dual, shape, non_channel, expand
 from phiml.math._magic_ops import copy_with
 from ..math.extrapolation import combine_sides, Extrapolation
 
@@ -148,10 +149,7 @@ def make_incompressible(velocity: Field,
     hard_bcs = None
     if obstacles:
         accessible_boundary = _accessible_extrapolation(input_velocity.extrapolation)
-        with NUMPY:
-            accessible = Field(velocity.geometry, ~union([obs.geometry for obs in obstacles]), accessible_boundary)
-            # accessible = CenteredGrid(~union([obs.geometry for obs in obstacles]), accessible_boundary, velocity.bounds, velocity.resolution)
-            hard_bcs = field.stagger(accessible, math.minimum, velocity.boundary, at=velocity.sampled_at, dims=velocity.vector.item_names)
+        accessible, hard_bcs = _obstacle_masks(velocity, obstacles, accessible_boundary)
         active = accessible.with_extrapolation(extrapolation.NONE) if active is None else active * accessible  # no pressure inside obstacles
         velocity = apply_boundary_conditions(velocity, obstacles)
     div = divergence(velocity, order=order)
@@ -179,7 +177,7 @@ def make_incompressible(velocity: Field,
     return velocity, pressure
 
 
-@math.jit_compile_linear(forget_traces=True)
+@math.jit_compile_linear(forget_traces=True, stable_pattern=True)  # moving obstacles only change the matrix values
 def masked_laplace(pressure: Field,
                    v_boundary: Extrapolation,
                    hard_bcs: Field,
@@ -249,7 +247,7 @@ def apply_boundary_conditions(velocity: Grid or PointCloud, obstacles: Obstacle
         if isinstance(obstacle, Geometry):
             obstacle = Obstacle(obstacle)
         assert isinstance(obstacle, Obstacle)
-        obs_mask = resample(obstacle.geometry, velocity, soft=True, balance=1)
+        obs_mask = _soft_obstacle_mask(obstacle, velocity)
         if obstacle.is_stationary:
             velocity = field.safe_mul(1 - obs_mask, velocity)
         else:
@@ -261,6 +259,123 @@ def apply_boundary_conditions(velocity: Grid or PointCloud, obstacles: Obstacle
     return velocity
 
 
+_MASK_CACHE_SIZE = 32
+_MASK_CACHE = OrderedDict()  # (kind, geometries, grid, sampled_at, boundaries, backend) -> rasterized masks, least recently used first
+
+
+def _cached_masks(key: Optional[tuple], compute: Callable):
+    """
+    Looks up rasterized obstacle masks by `key`, computing and storing them on a miss.
+    Keys contain the obstacle geometries themselves so that hits require equal geometry values, not just equal shapes.
+    If `key` is `None`, the masks are not cacheable and `compute` is always called.
+    """
+    if key is None:
+        return compute()
+    try:
+        result = _MASK_CACHE.pop(key)
+    except KeyError:
+        result = compute()
+    _MASK_CACHE[key] = result
+    while len(_MASK_CACHE) > _MASK_CACHE_SIZE:
+        _MASK_CACHE.popitem(last=False)
+    return result
+
+
+def _mask_cache_key(kind: str, obstacles: List[Obstacle], velocity: Field, boundary) -> Optional[tuple]:
+    """ Returns the cache key for masks of stationary obstacles on the grid of `velocity` or `None` if the masks cannot be cached. """
+    if not velocity.is_grid or not all(obs.is_stationary for obs in obstacles):
+        return None
+    geometries = tuple(obs.geometry for obs in obstacles)
+    if not math.all_available(*geometries):
+        return None  # tracing obstacle geometry
+    return kind, geometries, velocity.geometry, velocity.sampled_at, boundary, velocity.values.default_backend
+
+
+def _obstacle_masks(velocity: Field, obstacles: List[Obstacle], accessible_boundary: Extrapolation) -> Tuple[Field, Field]:
+    """
+    Computes the centered `accessible` mask and the face connectivity `hard_bcs` for `make_incompressible()`.
+    The masks of stationary obstacles are cached while moving obstacles are rasterized within their bounding box only.
+    """
+    stationary = [obs for obs in obstacles if obs.is_stationary]
+    moving = [obs for obs in obstacles if not obs.is_stationary]
+
+    def stagger(accessible: Field) -> Field:
+        with NUMPY:
+            return field.stagger(accessible, math.minimum, velocity.boundary, at=velocity.sampled_at, dims=velocity.vector.item_names)
+
+    def rasterize_stationary() -> Tuple[Field, Field]:
+        with NUMPY:
+            accessible = Field(velocity.geometry, ~union([obs.geometry for obs in stationary]), accessible_boundary)
+        return accessible, stagger(accessible)
+
+    key = _mask_cache_key('accessible', stationary, velocity, (accessible_boundary, velocity.boundary))  # hard_bcs are padded with the velocity boundary
+    accessible, hard_bcs = _cached_masks(key, rasterize_stationary) if stationary else (None, None)
+    if not moving:
+        return accessible, hard_bcs
+    with NUMPY:
+        for obs in moving:
+            inside = _windowed_sample(obs.geometry, velocity, 'center', accessible_boundary)
+            obs_accessible = Field(velocity.geometry, ~obs.geometry, accessible_boundary) if inside is None else Field(velocity.geometry, 1 - inside, accessible_boundary)
+            accessible = obs_accessible if accessible is None else accessible * obs_accessible
+    return accessible, stagger(accessible)
+
+
+def _soft_obstacle_mask(obstacle: Obstacle, velocity: Field) -> Field:
+    """ Soft mask of `obstacle` sampled at the sample points of `velocity`. """
+    key = _mask_cache_key('soft', [obstacle], velocity, velocity.extrapolation)
+    if key is not None:
+        return _cached_masks(key, lambda: resample(obstacle.geometry, velocity, soft=True, balance=1))
+    if velocity.is_grid:
+        values = _windowed_sample(obstacle.geometry, velocity, velocity.sampled_at, velocity.extrapolation, soft=True, balance=1)
+        if values is not None:
+            return velocity.with_values(values)
+    return resample(obstacle.geometry, velocity, soft=True, balance=1)
+
+
+def _windowed_sample(geometry: Geometry, velocity: Field, at: str, boundary: Extrapolation, **kwargs) -> Optional[Tensor]:
+    """
+    Samples the mask of `geometry` only on the cells of `velocity.geometry` overlapping its bounding box (plus one cell) and pads the rest with zeros.
+    This keeps the cost of re-rasterizing moving obstacles proportional to the region they sweep instead of the whole domain.
+
+    Returns:
+        Values matching `sample(geometry, velocity.geometry, at, boundary)` or `None` if windowing does not apply or would not save work.
+        The window depends on the position of `geometry`, so `None` is returned while tracing, e.g. in `jit_compile`.
+    """
+    grid = velocity.geometry
+    if not isinstance(grid, UniformGrid) or non_channel(geometry) or (at == 'face' and not velocity.is_staggered):
+        return None
+    if not math.all_available(geometry, grid):
+        return None
+    bounds = geometry.bounding_box()
+    lower = math.floor((bounds.lower - grid.bounds.lower) / grid.dx) - 1
+    upper = math.ceil((bounds.upper - grid.bounds.lower) / grid.dx) + 1
+    window = {}
+    for dim in grid.resolution.names:
+        n = grid.resolution.get_size(dim)
+        window[dim] = int(math.clip(lower[dim], 0, n)), max(int(math.clip(upper[dim], 0, n)), int(math.clip(lower[dim], 0, n)) + 1)
+    window_volume = 1
+    for lo, hi in window.values():
+        window_volume *= hi - lo
+    if 2 * window_volume > grid.resolution.volume:
+        return None
+    sub_grid = grid[{dim: slice(lo, hi) for dim, (lo, hi) in window.items()}]
+    if at == 'center':
+        values = sample(geometry, sub_grid, 'center', boundary, **kwargs)
+        return math.pad(values, {dim: (lo, grid.resolution.get_size(dim) - hi) for dim, (lo, hi) in window.items()}, 0)
+    # --- Staggered: with open boundaries, the sub-grid holds all faces lo...hi along each component axis ---
+    values = sample(geometry, sub_grid, 'face', extrapolation.ZERO_GRADIENT, dot_face_normal=sub_grid, **kwargs)
+    components = []
+    for component, reference, axis in zip(math.unstack(values, dual), math.unstack(velocity.values, dual), grid.resolution.names):
+        for dim, (lo, hi) in window.items():
+            n_ref, n_sub = reference.shape.get_size(dim), component.shape.get_size(dim)
+            start = 1 if dim == axis and n_ref == grid.resolution.get_size(dim) - 1 else 0  # constant boundary faces are not stored
+            before, after = lo - start, start + n_ref - lo - n_sub
+            component = component[{dim: slice(max(0, -before), n_sub - max(0, -after))}]
+            component = math.pad(component, {dim: (max(0, before), max(0, after))}, 0)
+        components.append(component)
+    return math.stack(components, dual(**grid.shape['vector'].untyped_dict))
+
+
 def boundary_push(particles: PointCloud, obstacles: tuple or list, separation: float = 0.5) -> PointCloud:
     """
     Enforces boundary conditions by correcting possible errors of the advection step and shifting particles out of
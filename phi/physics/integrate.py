@@ -1,15 +1,88 @@
+"""
+Explicit time integrators for systems of partial differential equations given as functions computing the time derivatives of the state.
+"""
+from contextlib import nullcontext
 from typing import Callable
 
+from phi import math
+from phi.field import axpy
+from phiml.math._lazy import materialize
 
-def rk4(pde: Callable, *state, dt=1., **pde_aux_kwargs):
+
+def rk4(pde: Callable, *state, dt=1., in_place=False, fuse=False, **pde_aux_kwargs):
+    """
+    Classic fourth-order Runge-Kutta step.
+
+    Args:
+        pde: Function computing the time derivatives of all state variables.
+        *state: State variables as `Field` or `Tensor` objects.
+        dt: Time increment.
+        in_place: If `True`, the given `state` may be overwritten with the result, see `phi.field.axpy()`.
+        fuse: If `True`, evaluates the element-wise updates between the stages with `phiml.math.fuse()`.
+            This mainly pays off for large grids.
+        **pde_aux_kwargs: Additional keyword arguments passed to `pde`.
+
+    Returns:
+        New state as `tuple`.
+    """
+    fused = math.fuse if fuse else nullcontext
     tan0 = pde(*state, **pde_aux_kwargs)
-    tan_half = pde(*[s + t * dt * .5 for (s, t) in zip(state, tan0)], **pde_aux_kwargs)
-    tan_half2 = pde(*[s + t * dt * .5 for (s, t) in zip(state, tan_half)], **pde_aux_kwargs)
-    tan_full = pde(*[s + t * dt for (s, t) in zip(state, tan_half2)], **pde_aux_kwargs)
-    tan_rk4 = [(1 / 6.) * (t0 + 2 * (th + th2) + tf) for (s, t0, th, th2, tf) in zip(state, tan0, tan_half, tan_half2, tan_full)]
-    return tuple([s + t * dt for (s, t) in zip(state, tan_rk4)])
+    with fused():
+        state_half = [s + t * dt * .5 for (s, t) in zip(state, tan0)]
+    tan_half = pde(*state_half, **pde_aux_kwargs)
+    with fused():
+        state_half2 = [s + t * dt * .5 for (s, t) in zip(state, tan_half)]
+    tan_half2 = pde(*state_half2, **pde_aux_kwargs)
+    with fused():
+        state_full = [s + t * dt for (s, t) in zip(state, tan_half2)]
+    tan_full = pde(*state_full, **pde_aux_kwargs)
+    if in_place:  # accumulate tangents into state without allocating their weighted sum
+        for weight, tan in zip((dt / 6., dt / 3., dt / 3., dt / 6.), (tan0, tan_half, tan_half2, tan_full)):
+            state = [axpy(weight, t, s, in_place=True) for (s, t) in zip(state, tan)]
+        return tuple(state)
+    with fused():
+        tan_rk4 = [(1 / 6.) * (t0 + 2 * (th + th2) + tf) for (s, t0, th, th2, tf) in zip(state, tan0, tan_half, tan_half2, tan_full)]
+        new_state = tuple([s + t * dt for (s, t) in zip(state, tan_rk4)])
+    return materialize(new_state) if fuse else new_state
 
 
-def euler(pde: Callable, *state, dt=1., **pde_aux_kwargs):
+def euler(pde: Callable, *state, dt=1., in_place=False, **pde_aux_kwargs):
     tan = pde(*state, **pde_aux_kwargs)
+    if in_place:
+        return tuple([axpy(dt, t, s, in_place=True) for s, t in zip(state, tan)])
     return tuple([s + t * dt for s, t in zip(state, tan)])
+
+
+# Carpenter & Kennedy (1994), five-stage fourth-order 2N-storage Runge-Kutta scheme
+_LSRK4_A = (0., -567301805773 / 1357537059087, -2404267990393 / 2016746695238, -3550918686646 / 2091501179385, -1275806237668 / 842570457699)
+_LSRK4_B = (1432997174477 / 9575080441755, 5161836677717 / 13612068292357, 1720146321549 / 2090206949498, 3134564353537 / 4481467310338, 2277821191437 / 14882151754819)
+
+
+def low_storage_rk4(pde: Callable, *state, dt=1., in_place=False, **pde_aux_kwargs):
+    """
+    Fourth-order Runge-Kutta step that only stores two registers per state variable, the state and its accumulated update.
+    Compared to `rk4()`, this requires one more evaluation of `pde` but avoids keeping all intermediate tangents in memory.
+
+    Args:
+        pde: Function computing the time derivatives of all state variables.
+            The returned tangents must not be referenced by `pde` after it returns.
+        *state: State variables as `Field` or `Tensor` objects.
+        dt: Time increment.
+        in_place: If `True`, the given `state` may be overwritten with the result.
+            Otherwise, the first stage allocates new state buffers which are then updated in-place.
+            See `phi.field.axpy()`.
+        **pde_aux_kwargs: Additional keyword arguments passed to `pde`.
+
+    Returns:
+        New state as `tuple`.
+    """
+    state = list(state)
+    du = None
+    for i, (a_i, b_i) in enumerate(zip(_LSRK4_A, _LSRK4_B)):
+        tan = pde(*state, **pde_aux_kwargs)
+        if i == 0:
+            du = [t * dt for t in tan]
+        else:
+            du = [axpy(dt, t, d, a_i, in_place=True) for t, d in zip(tan, du)]
+        state = [axpy(b_i, d, s, in_place=in_place or i > 0) for s, d in zip(state, du)]
+    return tuple(state)
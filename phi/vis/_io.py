@@ -24,7 +24,7 @@ def load_scalars(scene: Scene or str,
         scene: `Scene` or `str`. Directory containing the log files.
         name: Log file base name.
         prefix: Log file prefix.
-        suffix: Log file suffix.
+        suffix: Suffix of legacy text logs. Binary logs `<prefix><name>.bin` are preferred if present.
         x: 'steps'  or 'time'
         entries_dim: Curve dimension.
 
@@ -36,8 +36,7 @@ def load_scalars(scene: Scene or str,
         scene = Scene.at(scene)
     assert isinstance(scene, Scene), f"scene must be a Scene or str but got {type(scene)}"
     assert shape(scene).rank == 0, f"Use math.map(load_scalars, ...) to load data from multiple scenes"
-    ML_LOGGER.debug(f"Reading {os.path.join(scene.path, f'{prefix}{name}{suffix}')}")
-    curve = numpy.loadtxt(os.path.join(scene.path, f"log_{name}.txt"))
+    curve = load_scalar_rows(scene.path, name, prefix, suffix)
     if curve.ndim == 2:
         x_values = curve[:, 0]
         values = curve[:, 1:]
@@ -49,8 +48,7 @@ def load_scalars(scene: Scene or str,
         x_values = numpy.arange(len(values))
     if x == 'time':
         assert x == 'time', f"x must be 'steps' or 'time' but got {x}"
-        ML_LOGGER.debug(f"Reading {os.path.join(scene.path, 'log_step_time.txt')}")
-        _, x_values, *_ = numpy.loadtxt(os.path.join(scene.path, "log_step_time.txt")).T
+        _, x_values, *_ = load_scalar_rows(scene.path, 'step_time').T
         values = values[:len(x_values + 1)]
         x_values = numpy.cumsum(x_values[:len(values) - 1])
         x_values = numpy.concatenate([[0.], x_values])
@@ -59,3 +57,30 @@ def load_scalars(scene: Scene or str,
     if x is not None:
         return math.stack([x_values, values], channel(vector=[x, name]))
     return values
+
+
+def load_scalar_rows(path: str, name: str, prefix='log_', suffix='.txt') -> numpy.ndarray:
+    """
+    Reads a scalar log written by `SceneLog.log_scalars()`.
+
+    Binary logs `<prefix><name>.bin` are memory-mapped.
+    They consist of `float64` values, the first one being the number of entries per row, followed by the rows `(frame, *values)`.
+    Incomplete trailing rows, e.g. from a concurrent writer, are ignored.
+    If no binary log exists, the legacy text format `<prefix><name><suffix>` is read.
+
+    Returns:
+        Binary logs: NumPy array of shape `(rows, 1 + values)`.
+        Text logs: The result of `numpy.loadtxt()`.
+    """
+    bin_file = os.path.join(path, f"{prefix}{name}.bin")
+    if os.path.isfile(bin_file):
+        ML_LOGGER.debug(f"Reading {bin_file}")
+        if os.path.getsize(bin_file) < 8:
+            return numpy.zeros((0, 2))
+        data = numpy.memmap(bin_file, numpy.float64, 'r')
+        width = int(data[0])
+        rows = (len(data) - 1) // width
+        return data[1:1 + rows * width].reshape(rows, width)
+    text_file = os.path.join(path, f"{prefix}{name}{suffix}")
+    ML_LOGGER.debug(f"Reading {text_file}")
+    return numpy.loadtxt(text_file)
@@ -1,6 +1,7 @@
+import atexit
 import logging
 import sys
-from numbers import Number
+import time
 from os.path import isfile
 from typing import Union, Callable, Optional
 
@@ -12,10 +13,26 @@ from phi.field import Scene
 
 class SceneLog:
 
-    def __init__(self, scene: Scene):
+    def __init__(self, scene: Scene, flush_interval: float = 1.):
+        """
+        Args:
+            scene: Scene to write the logs to or `None` to keep logged scalars in memory only.
+            flush_interval: Logged scalars are buffered and written to disk at most every `flush_interval` seconds.
+
+        Call `close()` or use the log as a context manager to write the remaining scalars and close the log files.
+        Open logs are closed when the interpreter exits.
+        """
         self.scene = scene
-        self._scalars = {}  # name -> (frame, value)
+        self.flush_interval = flush_interval
+        self._curves = {}  # name -> (frames, mean values), kept in memory for get_scalar_curve()
+        self._scalar_names = []
         self._scalar_streams = {}
+        self._scalar_widths = {}  # name -> entries per row, including frame
+        self._pending = {}  # name -> rows not yet written
+        self._last_flush = time.perf_counter()
+        self._closed = False
+        if scene is not None:
+            atexit.register(self.close)
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.WARNING)
         self.logger = logging.Logger("vis", logging.DEBUG)
@@ -50,7 +67,8 @@ class SceneLog:
         Adds `values` to the curves by name.
         This can be used to log the evolution of scalar quantities or summaries.
 
-        The values are stored in a text file within the scene directory.
+        The values are stored in a binary file `log_<name>.bin` within the scene directory, see `phi.vis.load_scalars()`.
+        Writes are buffered for `flush_interval` seconds, call `flush()` to write them immediately.
         The curves may also be directly viewed in the user interface.
 
         Args:
@@ -58,27 +76,63 @@ class SceneLog:
             values: Values and names to append to the curves, must be numbers or `phiml.math.Tensor`.
                 If a curve does not yet exists, a new one is created.
         """
+        assert not self._closed, "Cannot log scalars after the SceneLog was closed"
         for name, value in values.items():
             assert isinstance(name, str)
             if reduce:
                 value = float(reduce(value, math.shape(value)))
             else:
                 value = math.convert(value, math.NUMPY)
-            if name not in self._scalars:
-                self._scalars[name] = []
-                if self.scene is not None:
-                    path = self.scene.subpath(f"log_{name}.txt")
-                    self._scalar_streams[name] = open(path, "w")
-            self._scalars[name].append((frame, value))
-            if self.scene is not None:
-                self._scalar_streams[name].write(f"{frame} {value if isinstance(value, Number) else ' '.join([str(float(v)) for v in value])}\n")
+            if name not in self._scalar_names:
+                self._scalar_names.append(name)
+            frames, means = self._curves.setdefault(name, ([], []))
+            frames.append(frame)
+            means.append(float(value.mean) if isinstance(value, math.Tensor) else float(value))
+            if self.scene is None:
+                continue
+            row = np.concatenate([[frame], np.ravel(value.numpy() if isinstance(value, math.Tensor) else value)]).astype(np.float64)
+            if name not in self._scalar_streams:
+                self._scalar_streams[name] = open(self.scene.subpath(f"log_{name}.bin"), "wb")
+                self._scalar_widths[name] = len(row)
+                np.asarray([len(row)], np.float64).tofile(self._scalar_streams[name])  # header
+            assert len(row) == self._scalar_widths[name], f"Curve '{name}' was logged with {self._scalar_widths[name] - 1} values per frame before but got {len(row) - 1}"
+            self._pending.setdefault(name, []).append(row)
+        if time.perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """ Writes all buffered scalars to disk. """
+        for name, rows in self._pending.items():
+            if rows:
+                np.stack(rows).tofile(self._scalar_streams[name])
                 self._scalar_streams[name].flush()
+        self._pending = {}
+        self._last_flush = time.perf_counter()
+
+    def close(self):
+        """ Writes all buffered scalars and closes the log files. Calling `close()` multiple times has no effect. """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.flush()
+        for stream in self._scalar_streams.values():
+            stream.close()
+        if self.log_file is not None:
+            self.logger.removeHandler(self.file_handler)
+            self.file_handler.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def get_scalar_curve(self, name) -> tuple:
-        frames = np.array([item[0] for item in self._scalars[name]])
-        values = np.array([float(item[1].mean) if isinstance(item[1], math.Tensor) else item[1] for item in self._scalars[name]])
-        return frames, values
+        """ Returns the frames and values of curve `name` logged by this `SceneLog`, averaged over all values per frame. This does not access the disk. """
+        frames, means = self._curves[name]
+        return np.array(frames), np.array(means)
 
     @property
     def scalar_curve_names(self) -> tuple:
-        return tuple(self._scalars.keys())
+        return tuple(self._scalar_names)
@@ -14,6 +14,7 @@ from phiml.math import Tensor, batch
 from phiml.backend import ML_LOGGER
 from phi.vis._plot_util import smooth_uniform_curve
 from phi.vis._vis_base import display_name
+from phi.vis._io import load_scalar_rows
 from ._matplotlib_plots import MATPLOTLIB
 
 
@@ -73,7 +74,7 @@ def plot_scalars(scene: Union[str, tuple, list, Scene, math.Tensor],
     if names is None:
         first_path = next(iter(math.flatten(scene.paths)))
         names = [_str(n) for n in os.listdir(first_path)]
-        names = [n[4:-4] for n in names if n.endswith('.txt') and n.startswith('log_')]
+        names = sorted({n[4:-4] for n in names if n.endswith(('.txt', '.bin')) and n.startswith('log_')})
         names = math.wrap(names, batch('names'))
         additional_reduce = ['names']
     elif isinstance(names, str):
@@ -118,8 +119,7 @@ def plot_scalars(scene: Union[str, tuple, list, Scene, math.Tensor],
             curve_labels = math.map(lambda p, n: f"{os.path.basename(p)} - {n}", scene.paths[b], names[b])
 
         def single_plot(name, path, label, i, color, dashed_, smooth):
-            ML_LOGGER.debug(f"Reading {os.path.join(path, f'log_{name}.txt')}")
-            curve = numpy.loadtxt(os.path.join(path, f"log_{name}.txt"))
+            curve = load_scalar_rows(path, name)
             if curve.ndim == 2:
                 x_values, values, *_ = curve.T
             else:
@@ -129,8 +129,7 @@ def plot_scalars(scene: Union[str, tuple, list, Scene, math.Tensor],
                 pass
             else:
                 assert x == 'time', f"x must be 'steps' or 'time' but got {x}"
-                ML_LOGGER.debug(f"Reading {os.path.join(path, 'log_step_time.txt')}")
-                _, x_values, *_ = numpy.loadtxt(os.path.join(path, "log_step_time.txt")).T
+                _, x_values, *_ = load_scalar_rows(path, 'step_time').T
                 values = values[:len(x_values+1)]
                 x_values = np.cumsum(x_values[:len(values)-1])
                 x_values = np.concatenate([[0.], x_values])
@@ -8,6 +8,7 @@ from ._backend import (
     ComputeDevice,
     default_backend, set_global_default_backend, BACKENDS, context_backend, _DEFAULT,
     get_precision, precision, set_global_precision,
+    set_num_threads, get_num_threads,
     convert,
     ML_LOGGER,
 )
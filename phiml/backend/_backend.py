@@ -1,5 +1,6 @@
 import dataclasses
 import logging
+import os
 import sys
 import warnings
 from builtins import ValueError
@@ -464,7 +465,37 @@ class Backend:
         multiples = [size // current_size if i == axis else 1 for i in range(self.ndims(x))]
         return self.tile(x, multiples)
 
-    def jit_compile(self, f: Callable) -> Callable:
+    def jit_compile(self, f: Callable, donate_argnums: Tuple[int, ...] = ()) -> Callable:
+        """
+        Compiles `f` into a function of native tensors.
+
+        Args:
+            f: Function of native tensors returning a `tuple` of native tensors.
+            donate_argnums: Indices of arguments whose memory may be reused for the outputs.
+                Donated arguments must not be used after the call.
+                Backends that cannot donate buffers ignore this.
+
+        Returns:
+            Compiled function.
+        """
+        raise NotImplementedError(self.__class__)
+
+    def export_compiled(self, f: Callable, args: tuple) -> bytes:
+        """
+        Compiles `f` for arguments matching the shapes and data types of `args` and serializes the result.
+        Backends implementing this method must also implement `import_compiled()`.
+
+        Args:
+            f: Function of native tensors returning a `tuple` of native tensors.
+            args: Example arguments.
+
+        Returns:
+            Serialized executable that can be loaded in another process using `import_compiled()`.
+        """
+        raise NotImplementedError(self.__class__)
+
+    def import_compiled(self, data: bytes) -> Callable:
+        """ Loads an executable previously serialized with `export_compiled()`. """
         raise NotImplementedError(self.__class__)
 
     def jacobian(self, f: Callable, wrt: Union[tuple, list], get_output: bool, is_f_scalar: bool):
@@ -1590,6 +1621,17 @@ class Backend:
             return {k: self.stop_gradient_tree(v) for k, v in tree.items()}
         return self.stop_gradient(tree)
 
+    def set_num_threads(self, num_threads: int):
+        """
+        Sets the number of threads this backend may use within a single operation on the CPU.
+        Backends without control over their threading ignore this.
+        Use `set_num_threads()` to configure all backends.
+
+        Args:
+            num_threads: Number of threads.
+        """
+        pass
+
     def grid_sample(self, grid, coordinates, extrapolation: str):
         """
         Interpolates a regular grid at the specified coordinates.
@@ -1674,6 +1716,24 @@ class Backend:
         numerator, denominator = self.auto_cast(numerator, denominator)
         return numerator / denominator
 
+    def axpy(self, a, x, y, b=1, in_place=False):
+        """
+        Computes `a * x + b * y`.
+
+        Args:
+            a: Scalar factor of `x`.
+            x: Native tensor that can be broadcast to the shape of `y`.
+            y: Native tensor.
+            b: Scalar factor of `y`.
+            in_place: Whether the result may be written into the memory of `y`.
+                Backends that do not support in-place updates, or cannot apply them to the given arguments, return a new tensor instead.
+
+        Returns:
+            Native tensor. If the update was performed in-place, this is `y`.
+        """
+        ax = self.mul(a, x)
+        return self.add(ax, y if b == 1 else self.mul(b, y))
+
     def pow(self, base, exp):
         base, exp = self.auto_cast(base, exp)
         return base ** exp
@@ -1716,6 +1776,7 @@ BACKENDS: List[Backend] = []
 """ Global list of all registered backends. Register a `Backend` by adding it to the list. """
 _DEFAULT = []  # [0] = global default, [1:] from 'with' blocks
 _PRECISION = [32]  # [0] = global precision in bits, [1:] from 'with' blocks
+_NUM_THREADS = [1]  # intra-op threads of CPU backends
 
 
 def choose_backend(*values, prefer_default=False) -> Backend:
@@ -1933,6 +1994,32 @@ def set_global_precision(floating_point_bits: int):
     _PRECISION[0] = floating_point_bits
 
 
+def set_num_threads(num_threads: int):
+    """
+    Sets the number of threads CPU backends may use within a single operation.
+
+    The NumPy backend splits batch dimensions of convolutions, scatter, grid sampling and sparse-dense products among a thread pool
+    and passes the thread count to `scipy.fft`.
+    PyTorch sets its intra-op thread count via `torch.set_num_threads()`.
+    BLAS threading is not affected.
+
+    Args:
+        num_threads: Number of threads, `1` to run single-threaded, or `None` to use all CPUs.
+    """
+    num_threads = num_threads or os.cpu_count() or 1
+    assert num_threads >= 1, f"num_threads must be positive but got {num_threads}"
+    _NUM_THREADS[0] = num_threads
+    for backend in BACKENDS:
+        backend.set_num_threads(num_threads)
+
+
+def get_num_threads() -> int:
+    """
+    Gets the number of threads CPU backends may use within a single operation, see `set_num_threads()`.
+    """
+    return _NUM_THREADS[0]
+
+
 def get_precision() -> int:
     """
     Gets the current target floating point precision in bits.
@@ -5,13 +5,13 @@ from typing import Union, Optional, Tuple, Callable, Sequence
 
 import numpy as np
 import numpy.random
-import scipy.signal
+import scipy.linalg.blas
 import scipy.sparse
 from scipy.sparse import issparse, csr_matrix, coo_matrix, csc_matrix
 from scipy.sparse.linalg import spsolve_triangular
 
 from . import Backend, ComputeDevice
-from ._backend import combined_dim, SolveResult, TensorType
+from ._backend import combined_dim, SolveResult, TensorType, get_num_threads
 from ._dtype import from_numpy_dtype, to_numpy_dtype, DType
 
 
@@ -30,6 +30,31 @@ class NumPyBackend(Backend):
     def prefers_channels_last(self) -> bool:
         return True
 
+    # scipy.special, scipy.signal, scipy.fft and scipy.ndimage are imported on first use as they take long to import
+
+    def erf(self, x):
+        from scipy.special import erf
+        return erf(x)
+
+    def log_gamma(self, x):
+        from scipy.special import loggamma
+        return loggamma(x)
+
+    def gamma_inc_l(self, a, x):
+        from scipy.special import gammainc
+        return gammainc(a, x)
+
+    def gamma_inc_u(self, a, x):
+        from scipy.special import gammaincc
+        return gammaincc(a, x)
+
+    def _map_batches(self, f: Callable, count: int) -> list:
+        """ Evaluates `f(i)` for `i in range(count)`, distributing the calls among a thread pool if `set_num_threads()` allows it. """
+        num_threads = min(get_num_threads(), count)
+        if num_threads <= 1:
+            return [f(i) for i in range(count)]
+        return list(_thread_pool(get_num_threads()).map(f, range(count)))
+
     seed = np.random.seed
     clip = staticmethod(np.clip)
     argmax = staticmethod(np.argmax)
@@ -45,7 +70,6 @@ class NumPyBackend(Backend):
     transpose = staticmethod(np.transpose)
     sqrt = np.sqrt
     exp = np.exp
-    erf = scipy.special.erf
     sin = np.sin
     arcsin = np.arcsin
     cos = np.cos
@@ -70,9 +94,6 @@ class NumPyBackend(Backend):
     round = staticmethod(np.round)
     ceil = np.ceil
     floor = np.floor
-    log_gamma = scipy.special.loggamma
-    gamma_inc_l = scipy.special.gammainc
-    gamma_inc_u = scipy.special.gammaincc
     shape = staticmethod(np.shape)
     staticshape = staticmethod(np.shape)
     imag = staticmethod(np.imag)
@@ -271,6 +292,18 @@ class NumPyBackend(Backend):
         else:
             return Backend.mul(self, a, b)
 
+    def axpy(self, a, x, y, b=1, in_place=False):
+        if in_place and isinstance(y, np.ndarray) and y.flags.writeable and isinstance(a, numbers.Number) and isinstance(b, numbers.Number) and not issparse(x):
+            if self.combine_types(self.dtype(x), self.dtype(y)) == self.dtype(y) and np.can_cast(np.result_type(a, b), y.dtype, 'same_kind') and np.broadcast_shapes(np.shape(x), y.shape) == y.shape:
+                if b != 1:
+                    np.multiply(y, b, out=y)
+                if isinstance(x, np.ndarray) and x.shape == y.shape and x.dtype == y.dtype and y.dtype.kind in 'fc' and x.flags.c_contiguous and y.flags.c_contiguous and (x is y or not np.may_share_memory(x, y)):
+                    scipy.linalg.blas.get_blas_funcs('axpy', (x, y))(x.ravel(), y.ravel(), a=a)  # writes to y
+                else:
+                    np.add(y, np.multiply(x, a, dtype=y.dtype), out=y)
+                return y
+        return Backend.axpy(self, a, x, y, b)
+
     def mul_matrix_batched_vector(self, A, b):
         return np.stack([A.dot(b[i]) for i in range(b.shape[0])])
 
@@ -294,11 +327,13 @@ class NumPyBackend(Backend):
             valid = [value.shape[i + 2] - kernel.shape[i + 3] + 1 for i in range(value.ndim - 2)]
             result = np.zeros([value.shape[0], kernel.shape[1], *valid], dtype=to_numpy_dtype(self.float_type))
         mode = 'same' if zero_padding else 'valid'
-        for b in range(value.shape[0]):
+        import scipy.signal
+        def conv_single(index: int):
+            b, o = divmod(index, kernel.shape[1])
             b_kernel = kernel[min(b, kernel.shape[0] - 1)]
-            for o in range(kernel.shape[1]):
-                for i in range(value.shape[1]):
-                    result[b, o, ...] += scipy.signal.correlate(value[b, i, ...], b_kernel[o, i, ...], mode=mode)
+            for i in range(value.shape[1]):
+                result[b, o, ...] += scipy.signal.correlate(value[b, i, ...], b_kernel[o, i, ...], mode=mode)
+        self._map_batches(conv_single, value.shape[0] * kernel.shape[1])
         return result
 
     def expand_dims(self, a, axis=0, number=1):
@@ -374,18 +409,30 @@ class NumPyBackend(Backend):
             result = np.tile(base_grid, (batch_size, *[1] * (base_grid.ndim - 1)))
         if not isinstance(indices, (tuple, list)):
             indices = self.unstack(indices, axis=-1)
-        if mode == 'add':
-            for b in range(batch_size):
-                np.add.at(result, (b, *[i[min(b, i.shape[0]-1)] for i in indices]), values[min(b, values.shape[0]-1)])
-        elif mode == 'update':
-            for b in range(batch_size):
-                result[(b, *[i[min(b, i.shape[0]-1)] for i in indices])] = values[min(b, values.shape[0]-1)]
-        elif mode == 'max':
-            for b in range(batch_size):
-                np.maximum.at(result, (b, *[i[min(b, i.shape[0]-1)] for i in indices]), values[min(b, values.shape[0]-1)])
-        elif mode == 'min':
-            for b in range(batch_size):
-                np.minimum.at(result, (b, *[i[min(b, i.shape[0]-1)] for i in indices]), values[min(b, values.shape[0]-1)])
+        ufunc = {'add': np.add, 'max': np.maximum, 'min': np.minimum}.get(mode)
+        def scatter_single(b: int):
+            b_indices = tuple([i[min(b, i.shape[0]-1)] for i in indices])
+            b_values = values[min(b, values.shape[0]-1)]
+            if mode == 'update':
+                result[b][b_indices] = b_values
+            else:
+                ufunc.at(result[b], b_indices, b_values)
+        self._map_batches(scatter_single, batch_size)
+        return result
+
+    def grid_sample(self, grid, coordinates, extrapolation: str):
+        mode = {'undefined': 'nearest', 'zeros': 'grid-constant', 'boundary': 'nearest', 'periodic': 'grid-wrap', 'symmetric': 'reflect', 'reflect': 'mirror'}.get(extrapolation, None)
+        if mode is None or not isinstance(grid, np.ndarray) or grid.dtype.kind != 'f' or coordinates.shape[-1] != grid.ndim - 2:
+            return NotImplemented
+        import scipy.ndimage
+        batch_size = combined_dim(grid.shape[0], coordinates.shape[0])
+        channel_count = grid.shape[-1]
+        result = np.empty((batch_size, *coordinates.shape[1:-1], channel_count), grid.dtype)
+        def sample_single(index: int):
+            b, c = divmod(index, channel_count)
+            b_coordinates = np.moveaxis(coordinates[min(b, coordinates.shape[0]-1)], -1, 0)
+            result[b, ..., c] = scipy.ndimage.map_coordinates(grid[min(b, grid.shape[0]-1), ..., c], b_coordinates, order=1, mode=mode, prefilter=False)
+        self._map_batches(sample_single, batch_size * channel_count)
         return result
 
     def histogram1d(self, values, weights, bin_edges):
@@ -423,22 +470,14 @@ class NumPyBackend(Backend):
         x = self.to_complex(x)
         if not axes:
             return x
-        if len(axes) == 1:
-            return np.fft.fft(x, axis=axes[0]).astype(x.dtype)
-        elif len(axes) == 2:
-            return np.fft.fft2(x, axes=axes).astype(x.dtype)
-        else:
-            return np.fft.fftn(x, axes=axes).astype(x.dtype)
+        import scipy.fft
+        return scipy.fft.fftn(x, axes=axes, workers=get_num_threads()).astype(x.dtype, copy=False)
 
     def ifft(self, k, axes: Union[tuple, list]):
         if not axes:
             return k
-        if len(axes) == 1:
-            return np.fft.ifft(k, axis=axes[0]).astype(k.dtype)
-        elif len(axes) == 2:
-            return np.fft.ifft2(k, axes=axes).astype(k.dtype)
-        else:
-            return np.fft.ifftn(k, axes=axes).astype(k.dtype)
+        import scipy.fft
+        return scipy.fft.ifftn(k, axes=axes, workers=get_num_threads()).astype(k.dtype, copy=False)
 
     def dtype(self, array) -> DType:
         if isinstance(array, bool):
@@ -468,14 +507,13 @@ class NumPyBackend(Backend):
 
     def mul_csr_dense(self, column_indices, row_pointers, values, shape: tuple, dense):
         batch_size, nnz, channel_count = values.shape
-        result = []
-        for b in range(batch_size):
+        def mul_single(b: int):
             b_result = []
             for c in range(channel_count):
                 mat = csr_matrix((values[b, :, c], column_indices[b], row_pointers[b]), shape=shape)
                 b_result.append((mat * dense[b, :, c, :]))
-            result.append(np.stack(b_result, 1))
-        return np.stack(result)
+            return np.stack(b_result, 1)
+        return np.stack(self._map_batches(mul_single, batch_size))
 
     def csc_matrix(self, column_pointers, row_indices, values, shape: tuple):
         return csc_matrix((values, row_indices, column_pointers), shape=shape)
@@ -552,4 +590,18 @@ class NumPyBackend(Backend):
         return result[0], result[1], result[2]
 
 
+_THREAD_POOL = [None]
+
+
+def _thread_pool(num_threads: int):
+    """ Returns a shared thread pool with `num_threads` workers, replacing the previous pool if the thread count changed. """
+    pool = _THREAD_POOL[0]
+    if pool is None or pool[0] != num_threads:
+        from concurrent.futures import ThreadPoolExecutor
+        if pool is not None:
+            pool[1].shutdown(wait=False)
+        pool = _THREAD_POOL[0] = (num_threads, ThreadPoolExecutor(num_threads, thread_name_prefix='phiml-numpy'))
+    return pool[1]
+
+
 NUMPY = NumPyBackend()
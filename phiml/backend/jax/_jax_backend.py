@@ -245,16 +245,26 @@ class JaxBackend(Backend):
             from jax.experimental.host_callback import call
             return call(aux_f, args, result_shape=output_specs)
 
-    def jit_compile(self, f: Callable) -> Callable:
+    def jit_compile(self, f: Callable, donate_argnums: Tuple[int, ...] = ()) -> Callable:
         def run_jit_f(*args):
             # print(jax.make_jaxpr(f)(*args))
             ML_LOGGER.debug(f"JaxBackend: running jit-compiled '{f.__name__}' with shapes {[self.shape(arg) for arg in args]} and dtypes {[self.dtype(arg) for arg in args]}")
             return self.as_registered.call(jit_f, *args, name=f"run jit-compiled '{f.__name__}'")
 
         run_jit_f.__name__ = f"Jax-Jit({f.__name__})"
-        jit_f = jax.jit(f, device=self._default_device.ref)
+        jit_f = jax.jit(f, device=self._default_device.ref, donate_argnums=tuple(donate_argnums))
         return run_jit_f
 
+    def export_compiled(self, f: Callable, args: tuple) -> bytes:
+        from jax import export
+        exported = export.export(jax.jit(f))(*[jax.ShapeDtypeStruct(jnp.shape(a), a.dtype) for a in args])
+        return bytes(exported.serialize())
+
+    def import_compiled(self, data: bytes) -> Callable:
+        from jax import export
+        exported = export.deserialize(bytearray(data))
+        return lambda *args: self.as_registered.call(exported.call, *args, name=f"run exported '{exported.fun_name}'")
+
     def block_until_ready(self, values):
         if hasattr(values, 'block_until_ready'):
             values.block_until_ready()
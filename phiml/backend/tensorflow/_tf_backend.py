@@ -153,7 +153,7 @@ class TFBackend(Backend):
             self.set_shapes_tree(result, output_shapes)
             return result
 
-    def jit_compile(self, f: Callable) -> Callable:
+    def jit_compile(self, f: Callable, donate_argnums: Tuple[int, ...] = ()) -> Callable:
         compiled = tf.function(f)
         return lambda *args: self.as_registered.call(compiled, *args, name=f"run jit-compiled '{f.__name__}'")
 
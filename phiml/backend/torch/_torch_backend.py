@@ -226,9 +226,18 @@ class TorchBackend(Backend):
                 raise NotImplementedError
         return NumPyFunction.apply(*args)
 
-    def jit_compile(self, f: Callable) -> Callable:
+    def jit_compile(self, f: Callable, donate_argnums: Tuple[int, ...] = ()) -> Callable:
         return JITFunction(self, f)
 
+    def axpy(self, a, x, y, b=1, in_place=False):
+        if in_place and isinstance(y, torch.Tensor) and isinstance(a, numbers.Number) and isinstance(b, numbers.Number) and torch._C._get_tracing_state() is None:
+            x = self.as_tensor(x)
+            if not (torch.is_grad_enabled() and (x.requires_grad or y.requires_grad)) and x.dtype == y.dtype and torch.broadcast_shapes(x.shape, y.shape) == y.shape:
+                if b != 1:
+                    y.mul_(b)
+                return y.add_(x, alpha=a)
+        return Backend.axpy(self, a, x, y, b)
+
     def custom_gradient(self, f: Callable, gradient: Callable = None, get_external_cache: Callable = None, on_call_skipped: Callable = None, jit_compile = True) -> Callable:
         """ See PyTorch_Jit.md """
         def select_jit(*args):
@@ -329,6 +338,9 @@ class TorchBackend(Backend):
         result = torch.permute(result, inv_perm)
         return result
 
+    def set_num_threads(self, num_threads: int):
+        torch.set_num_threads(num_threads)
+
     def grid_sample(self, grid, coordinates, extrapolation: str):
         assert extrapolation in ('undefined', 'zeros', 'boundary', 'periodic', 'symmetric', 'reflect'), extrapolation
         if get_functional_derivative_order() > 1:
@@ -201,10 +201,14 @@ def disassemble(obj: PhiMLDataclass, attr_type=variable_attributes):
     return DataclassTreeNode(type(obj), attr_type, keys, non_attributes, cache), values
 
 
-def assemble(container: DataclassTreeNode, values: List[Tensor]):
-    extracted = {a: assemble_tree(v, values, container.attr_type) for a, v in container.extracted.items()}
+def assemble(container: DataclassTreeNode, values: List[Tensor], validate=True):
+    extracted = {a: assemble_tree(v, values, container.attr_type, validate) for a, v in container.extracted.items()}
     instance = container.cls.__new__(container.cls)
-    instance.__init__(**extracted, **container.not_extracted)
+    if validate:
+        instance.__init__(**extracted, **container.not_extracted)
+    else:  # skip __post_init__
+        instance.__dict__.update(container.not_extracted)
+        instance.__dict__.update(extracted)
     instance.__dict__.update(container.cache)
     return instance
 
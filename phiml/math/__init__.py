@@ -14,7 +14,7 @@ See the documentation at https://tum-pbs.github.io/PhiML/
 """
 
 from ..backend._dtype import DType
-from ..backend import NUMPY, precision, set_global_precision, get_precision, set_global_default_backend as use
+from ..backend import NUMPY, precision, set_global_precision, get_precision, set_num_threads, set_global_default_backend as use
 
 from ._shape import (
     shape, Shape, EMPTY_SHAPE, DimFilter,
@@ -34,6 +34,8 @@ from ._magic_ops import (
 
 from ._tensors import Tensor, wrap, tensor, layout, native, numpy_ as numpy, reshaped_numpy, Dict, to_dict, from_dict, is_scalar, BROADCAST_FORMATTER as f, save, load
 
+from ._lazy import fuse
+
 from ._sparse import dense, get_sparsity, get_format, to_format, is_sparse, sparse_tensor, stored_indices, stored_values, tensor_like, matrix_rank
 
 from .extrapolation import Extrapolation, as_extrapolation
@@ -62,7 +64,7 @@ from ._ops import (
     dot,
     abs_ as abs, sign,
     round_ as round, ceil, floor,
-    maximum, minimum, clip,
+    maximum, minimum, clip, axpy,
     sqrt, exp, erf, log, log2, log10, sigmoid, soft_plus, softmax,
     sin, cos, tan, sinh, cosh, tanh, arcsin, arccos, arctan, arcsinh, arccosh, arctanh, log_gamma, factorial, incomplete_gamma,
     to_float, to_int32, to_int64, to_complex, imag, real, conjugate, angle,
@@ -98,7 +100,7 @@ from ._nd import (
 from ._trace import matrix_from_function
 
 from ._functional import (
-    LinearFunction, jit_compile_linear, jit_compile,
+    LinearFunction, jit_compile_linear, jit_compile, set_trace_cache, BufferManager,
     jacobian, gradient, custom_gradient, print_gradient,
     safe_mul,
     map_types, map_s2b, map_i2b, map_c2b, map_d2b, map_d2c, map_c2d,
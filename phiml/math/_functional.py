@@ -1,21 +1,26 @@
+import dataclasses
+import hashlib
 import inspect
+import os
+import pickle
 import time
 import types
 import warnings
+import weakref
 from functools import wraps, partial
 from numbers import Number
-from typing import Tuple, Callable, Dict, Generic, List, TypeVar, Any, Set, Union, Optional, Sequence
+from typing import Tuple, Callable, Dict, Generic, List, TypeVar, Any, Set, Union, Optional, Sequence, NamedTuple
 
 import numpy as np
 
 from . import _ops as math, all_available, stop_gradient
-from ._magic_ops import stack, slice_, find_differences, rename_dims, all_attributes
+from ._magic_ops import stack, slice_, find_differences, rename_dims, all_attributes, expand
 from ._shape import Shape, spatial, instance, batch, channel, merge_shapes, DimFilter, shape, dual
 from ._sparse import SparseCoordinateTensor
-from ._tensors import Tensor, disassemble_tree, assemble_tree, disassemble_tensors, assemble_tensors, variable_attributes, wrap, specs_equal, equality_by_shape_and_value, object_dims
-from ._trace import ShiftLinTracer, matrix_from_function, LinearTraceInProgress
+from ._tensors import Tensor, NativeTensor, TensorStack, Layout, cached, disassemble_tree, assemble_tree, disassemble_tensors, assemble_tensors, variable_attributes, serialize_spec, wrap, specs_equal, equality_by_shape_and_value, object_dims
+from ._trace import ShiftLinTracer, LinearTraceInProgress, trace_linear, matrix_from_tracer, tracer_sparsify_batch, tracer_pattern_key, tracer_coo_values, matrix_with_values
 from .magic import PhiTreeNode, Shapable
-from ..backend import Backend
+from ..backend import Backend, NUMPY
 from ..backend._backend import get_spatial_derivative_order, functional_derivative_evaluation, ML_LOGGER
 from ..backend._buffer import set_buffer_config, get_buffer_config, get_required_buffer_sizes, wasted_memory
 from ..backend._dtype import DType
@@ -152,6 +157,95 @@ def key_from_args(args: tuple,
     return key, tensors, natives, kwargs, attached_aux_kwargs
 
 
+def fast_signature(args: tuple, kwargs: Dict[str, Any], parameters: Tuple[str, ...], aux: Set[str] = ()) -> Tuple[Optional[tuple], Optional[list], Optional[list]]:
+    """
+    Cheap alternative to `key_from_args()` for repeated calls with arguments of the same structure.
+    Tensors are identified by shape, native shape, native type and data type.
+    All other values are identified by reference if they support weak references and by value otherwise, see `_fingerprint_ref()`.
+    `PhiTreeNode`s are identified by their non-variable attributes, not by reference, so that in-place modifications are detected.
+    Non-dataclass nodes without `__dict__` are not supported.
+
+    Returns:
+        fingerprint: Hashable tuple that is equal for two calls only if `key_from_args()` would produce equal keys.
+            `None` if the arguments contain values that are not supported, such as non-native tensors or Python numbers.
+        natives: Native tensors in the order produced by `key_from_args(..., cache=True)`.
+        refs: Weak references to the objects identified by reference.
+            The fingerprint is only valid while all of them are alive since the ids of collected objects may be reused.
+    """
+    if len(args) > len(parameters):
+        return None, None, None
+    kwargs = {**kwargs, **{parameters[i]: v for i, v in enumerate(args)}}
+    leaves = [tuple(kwargs), get_spatial_derivative_order()]
+    natives = []
+    refs = []
+    for name, value in kwargs.items():
+        if name in aux:
+            if not _fingerprint_ref(value, leaves, refs):
+                return None, None, None
+        elif not _fingerprint_tree(value, leaves, natives, refs):
+            return None, None, None
+    return tuple(leaves), natives, refs
+
+
+def _fingerprint_tree(obj, leaves: list, natives: list, refs: list) -> bool:
+    if isinstance(obj, NativeTensor):
+        obj = obj._cached()
+        native = obj._native
+        leaves.append((obj._shape, obj._native_shape, type(native), getattr(native, 'dtype', None)))
+        natives.append(native)
+        return True
+    elif isinstance(obj, TensorStack):
+        leaves.append((TensorStack, obj._stack_dim))
+        if obj.requires_broadcast:
+            return all(_fingerprint_tree(t, leaves, natives, refs) for t in obj._tensors)
+        return _fingerprint_tree(cached(obj), leaves, natives, refs)
+    elif isinstance(obj, (Tensor, Layout, Number, bool)):
+        return False
+    elif obj is None or isinstance(obj, str):
+        leaves.append(obj)
+        return True
+    elif isinstance(obj, (tuple, list)):
+        leaves.append((type(obj), len(obj)))
+        return all(_fingerprint_tree(item, leaves, natives, refs) for item in obj)
+    elif isinstance(obj, dict):
+        leaves.append((dict, tuple(obj)))
+        return all(_fingerprint_tree(item, leaves, natives, refs) for item in obj.values())
+    elif isinstance(obj, PhiTreeNode):
+        attributes = variable_attributes(obj)
+        leaves.append((type(obj), attributes))
+        if dataclasses.is_dataclass(obj):
+            if not all(_fingerprint_ref(getattr(obj, f.name), leaves, refs) for f in dataclasses.fields(obj) if f.name not in attributes):
+                return False
+        else:  # non-variable attributes may be modified in-place, so the object itself cannot be identified by reference
+            if not hasattr(obj, '__dict__'):
+                return False
+            constants = [(n, v) for n, v in vars(obj).items() if n not in attributes]
+            leaves.append(tuple([n for n, _ in constants]))
+            if not all(_fingerprint_ref(v, leaves, refs) for _, v in constants):
+                return False
+        return all(_fingerprint_tree(getattr(obj, a), leaves, natives, refs) for a in attributes)
+    return False
+
+
+def _fingerprint_ref(obj, leaves: list, refs: list) -> bool:
+    """
+    Identifies `obj` by its `id` and adds a weak reference to `refs` so that fast-path entries do not keep arguments alive.
+    Objects that cannot be weakly referenced, such as `str`, `int` or `tuple`, are identified by value instead if they are hashable.
+    """
+    try:
+        refs.append(weakref.ref(obj))
+        leaves.append(id(obj))
+        return True
+    except TypeError:
+        pass
+    try:
+        hash(obj)
+    except TypeError:
+        return False
+    leaves.append((type(obj), obj))
+    return True
+
+
 def function_parameters(f) -> Tuple[str]:
     return tuple(get_function_parameters(f).keys())
 
@@ -189,6 +283,7 @@ def f_name(f):
 def default_determine_config(traced_configs: Sequence[Dict[str, int]], requirement_history: Dict[str, Sequence[int]]) -> Tuple[Optional[int], Dict[str, int]]:
     """
     Decides on the buffer configuration to use for the next invocation of a JIT-compiled function.
+    This uses a `BufferManager` with default settings.
 
     Args:
         traced_configs: Configurations for which traces already exist. These should be preferred where possible.
@@ -199,29 +294,74 @@ def default_determine_config(traced_configs: Sequence[Dict[str, int]], requireme
         trace_index: If we should use an existing trace, returns the index into `traced_configs`. For a new trace, returns `None`.
         config: Configuration parameters to use, both for existing and new traces.
     """
-    last_required = {k: hist[-1] for k, hist in requirement_history.items()}
-    possible_configs = [c for c in traced_configs if wasted_memory(c, last_required) >= 0]
-    if possible_configs:
+    return _DEFAULT_BUFFER_MANAGER(traced_configs, requirement_history)
+
+
+class BufferManager:
+    """
+    Buffer size policy for JIT-compiled functions with data-dependent buffer sizes, such as particle neighbor lists.
+    Set it using `JitFunction.set_buffer_manager()`.
+
+    The expected requirement of each buffer is the `quantile` of the last `window` required sizes, but at least the most recent requirement.
+    Existing traces are used if their buffers are large enough for the most recent requirement.
+    The smallest such trace is chosen.
+    A new trace is created if no trace is large enough, or if the chosen trace allocates more than `1 + max_waste` times the expected requirement (including margin).
+    This way, a one-time spike in the required size does not cause all following evaluations to use oversized buffers.
+    """
+
+    def __init__(self, window=32, quantile=0.9, margin=0.25, multiple=32, max_waste=1., min_samples=8, max_traces: Optional[int] = 4):
+        """
+        Args:
+            window: Number of most recent evaluations to consider.
+            quantile: Quantile of the required sizes within `window` to allocate for.
+            margin: Relative size added to the expected requirement when creating a new trace.
+            multiple: Buffer sizes of new traces are rounded up to a multiple of this number.
+            max_waste: Re-trace if the chosen buffers are larger than `1 + max_waste` times the expected requirement.
+            min_samples: Minimum number of evaluations before re-tracing to reduce wasted memory.
+            max_traces: Maximum number of traces to keep per function signature. The least recently used traces are removed first. `None` for unlimited.
+        """
+        assert 0 <= quantile <= 1 and window >= 1 and max_waste >= 0
+        self.window = window
+        self.quantile = quantile
+        self.margin = margin
+        self.multiple = multiple
+        self.max_waste = max_waste
+        self.min_samples = min_samples
+        self.max_traces = max_traces
+
+    def expected_requirement(self, requirement_history: Dict[str, Sequence[int]]) -> Dict[str, int]:
+        return {k: max(int(hist[-1]), int(np.ceil(np.quantile(hist[-self.window:], self.quantile)))) for k, hist in requirement_history.items()}
+
+    def with_margin(self, size: int) -> int:
+        size = int(size * (1 + self.margin))
+        r = size % self.multiple
+        return size + self.multiple - r if r != 0 else size
+
+    def __call__(self, traced_configs: Sequence[Dict[str, int]], requirement_history: Dict[str, Sequence[int]]) -> Tuple[Optional[int], Dict[str, int]]:
+        last_required = {k: hist[-1] for k, hist in requirement_history.items()}
+        target = {k: self.with_margin(v) for k, v in self.expected_requirement(requirement_history).items()}
+        possible_configs = [c for c in traced_configs if wasted_memory(c, last_required) >= 0]
+        if not possible_configs:
+            return None, target
         best = min(possible_configs, key=lambda c: wasted_memory(c, last_required))
-        # ToDo if too much memory wasted, re-trace
-        # wasted_fraction = wasted_memory(best, last_required) /
+        samples = min([len(hist) for hist in requirement_history.values()], default=0)
+        if samples >= self.min_samples and sum(best.values()) > (1 + self.max_waste) * sum(target.values()) and target not in traced_configs:
+            return None, target  # too much memory wasted, re-trace with smaller buffers
         return traced_configs.index(best), best
-    # --- no previously traced config works ---
-    def with_margin(size: int, margin=0.25, multiple=32):
-        size = int(size * (1 + margin))
-        r = size % multiple
-        return size + multiple - r if r != 0 else size
-    new_config = {k: with_margin(v) for k, v in last_required.items()}
-    return None, new_config
+
+
+_DEFAULT_BUFFER_MANAGER = BufferManager(max_traces=None)
+_MAX_BUFFER_HISTORY = 1024
 
 
 class JitFunction:
 
-    def __init__(self, f: Callable, auxiliary_args: Set[str], forget_traces: bool):
+    def __init__(self, f: Callable, auxiliary_args: Set[str], forget_traces: bool, donate_args: Set[str] = frozenset()):
         self.f = f
         self.f_params = function_parameters(f)
         self.auxiliary_args = auxiliary_args
         self.forget_traces = forget_traces
+        self.donate_args = donate_args
         self.traces: Dict[SignatureKey, List[Callable]] = {}
         self.recorded_mappings: Dict[SignatureKey, List[SignatureKey]] = {}
         self.req_buffer_history: Dict[SignatureKey, Dict[str, List[int]]] = {}
@@ -229,9 +369,30 @@ class JitFunction:
         self._extract_tensors: List[Tuple[Tensor]] = []
         self._post_call: List[Callable] = []
         self._tracing_in_key: SignatureKey = None
-        self._buffer_manager = default_determine_config
-
-    def _jit_compile(self, in_key: SignatureKey, buffer_config: Dict[str, int], attached_aux_args: dict):
+        self._buffer_manager = BufferManager()
+        self._buffer_events: Dict[SignatureKey, Dict[str, int]] = {}  # evaluations, overflows, traces, dropped traces
+        self._trace_last_used: Dict[SignatureKey, List[int]] = {}  # call counter of last use per trace
+        self._fast_path: Dict[tuple, Tuple[Callable, SignatureKey, List[weakref.ref]]] = {}  # fingerprint -> (compiled function, output key, weak references)
+
+    def _jit_compile(self, in_key: SignatureKey, buffer_config: Dict[str, int], attached_aux_args: dict, donate_argnums: Tuple[int, ...] = ()):
+        native_function = self._native_function(in_key, buffer_config, attached_aux_args, donating=bool(donate_argnums))
+        if donate_argnums:
+            return in_key.backend.jit_compile(native_function, donate_argnums=donate_argnums)
+        return in_key.backend.jit_compile(native_function)
+
+    def _donated_natives(self, kwargs: Dict[str, Any]) -> Tuple[int, ...]:
+        """ Indices of the native tensors belonging to `donate_args`, in the order produced by `key_from_args()`. """
+        indices = []
+        offset = 0
+        for name, value in kwargs.items():
+            _, tensors = disassemble_tree(value, cache=True)
+            count = len(disassemble_tensors(tensors, expand=True)[0])
+            if name in self.donate_args:
+                indices.extend(range(offset, offset + count))
+            offset += count
+        return tuple(indices)
+
+    def _native_function(self, in_key: SignatureKey, buffer_config: Dict[str, int], attached_aux_args: dict, donating=False):
         def jit_f_native(*natives):
             ML_LOGGER.debug(f"Φ-ML-jit: Tracing '{f_name(self.f)}'")
             _TRACING_JIT.append(self)
@@ -255,6 +416,9 @@ class JitFunction:
                 tree, out_tensors = disassemble_tree((f_output, self._extract_tensors), cache=True)
                 result_natives, result_shapes, specs = disassemble_tensors(out_tensors, expand=True)
                 tracers = get_required_buffer_sizes()
+                if donating and get_buffer_config():  # raised while tracing, i.e. before the arguments are donated
+                    set_buffer_config({})
+                    raise NotImplementedError(f"donate_args cannot be used with '{f_name(self.f)}' because it uses buffers {tuple(tracers)}. Functions with buffers are re-run with the same arguments if a buffer is too small.")
                 out_key = SignatureKey(jit_f_native, tree, result_shapes, specs, in_key.backend, in_key.tracing, buffer_config=get_buffer_config())
                 if not buffer_config and get_buffer_config():
                     ML_LOGGER.info(f"Tracing {self} with default buffer sizes: {get_buffer_config()}")
@@ -267,11 +431,50 @@ class JitFunction:
             return result_natives + tuple(tracers.values())
 
         jit_f_native.__name__ = f"native({f_name(self.f) if isinstance(self.f, types.FunctionType) else str(self.f)})"
-        return in_key.backend.jit_compile(jit_f_native)
+        return jit_f_native
+
+    def _load_persistent_trace(self, key: SignatureKey, natives: tuple) -> Optional[Callable]:
+        """ Loads a compiled function and its output signature from the trace cache, see `set_trace_cache()`. """
+        if not key.backend.supports(Backend.import_compiled):
+            return None
+        stored = _read_trace_cache(self.f, key, 'jit', [key.backend.dtype(n) for n in natives])
+        if stored is None:
+            return None
+        try:
+            native_function = key.backend.import_compiled(stored['compiled'])
+        except Exception as exc:
+            ML_LOGGER.debug(f"Φ-ML-jit: Failed to load cached trace of '{f_name(self.f)}': {exc}")
+            return None
+        out_key = SignatureKey(native_function, stored['tree'], stored['shapes'], stored['specs'], key.backend, key.tracing, buffer_config=stored['buffer_config'])
+        self.recorded_mappings.setdefault(key, []).append(out_key)
+        return native_function
+
+    def _store_persistent_trace(self, key: SignatureKey, out_key: SignatureKey, attached_aux_args: dict, natives: tuple):
+        if not key.backend.supports(Backend.export_compiled):
+            return
+        mappings = self.recorded_mappings[key]
+        recorded = len(mappings)
+        try:
+            compiled = key.backend.export_compiled(self._native_function(key, out_key.buffer_config or {}, attached_aux_args), natives)
+        except Exception as exc:
+            ML_LOGGER.debug(f"Φ-ML-jit: Failed to export trace of '{f_name(self.f)}': {exc}")
+            return
+        finally:
+            del mappings[recorded:]  # exporting traces the function again
+        _write_trace_cache(self.f, key, 'jit', [key.backend.dtype(n) for n in natives], {'compiled': compiled, 'tree': out_key.tree, 'shapes': out_key.shapes, 'specs': out_key.specs, 'buffer_config': out_key.buffer_config})
 
     def __call__(self, *args, **kwargs):
+        # --- fast path: same argument structure, shapes and dtypes as a previous call ---
+        fingerprint = refs = None
+        if self._fast_path and not _TRACING_JIT:
+            fingerprint, fast_natives, refs = fast_signature(args, kwargs, self.f_params, self.auxiliary_args)
+            if fingerprint is not None and fingerprint in self._fast_path:
+                native_function, out_key, stored_refs = self._fast_path[fingerprint]
+                if all(ref() is not None for ref in stored_refs):
+                    return self._assemble_output(native_function(*fast_natives), out_key, validate=False)  # output structure was validated on the first call
+                del self._fast_path[fingerprint]  # a referenced object was collected and its id may have been reused
         try:
-            key, _, natives, _, aux_kwargs = key_from_args(args, kwargs, self.f_params, cache=True, aux=self.auxiliary_args, for_jit=True)
+            key, _, natives, in_kwargs, aux_kwargs = key_from_args(args, kwargs, self.f_params, cache=True, aux=self.auxiliary_args, for_jit=True)
         except LinearTraceInProgress:
             return self.f(*args, **kwargs)
         if isinstance(self.f, GradientFunction) and key.backend.supports(Backend.jit_compile_grad):
@@ -285,7 +488,7 @@ class JitFunction:
             trace_index, buffer_config = self._buffer_manager(traced_configs, self.req_buffer_history[key])
             if trace_index is None:
                 last_required = {k: hist[-1] for k, hist in self.req_buffer_history[key].items()}
-                ML_LOGGER.info(f"Re-tracing {self} due to larger buffer requirements: {last_required}. Setting {buffer_config}")
+                ML_LOGGER.info(f"Re-tracing {self} due to buffer requirements: {last_required}. Setting {buffer_config}")
             out_key = match_output_signature_list(key, self.recorded_mappings, self)[trace_index] if trace_index is not None else None
             # out_key = self.recorded_mappings[key][trace_index] if trace_index is not None else None
         else:  # called with new arguments
@@ -298,18 +501,38 @@ class JitFunction:
             if self.forget_traces:
                 self.traces.clear()
                 self.recorded_mappings.clear()
-            native_jit_function = self._jit_compile(key, buffer_config, aux_kwargs)
+                self._trace_last_used.clear()
+                self._buffer_events.clear()
+                self._fast_path.clear()
+            persistent = _TRACE_CACHE['directory'] is not None and not buffer_config and not key.tracing
+            native_jit_function = self._load_persistent_trace(key, natives) if persistent else None
+            loaded = native_jit_function is not None
+            if not loaded:
+                donate_argnums = self._donated_natives(in_kwargs) if self.donate_args and not key.tracing else ()
+                native_jit_function = self._jit_compile(key, buffer_config, aux_kwargs, donate_argnums)
             self.traces.setdefault(key, []).append(native_jit_function)
             if len(self.traces) >= 10:
                 warnings.warn(f"""Φ-ML: The jit-compiled function '{f_name(self.f)}' was traced {len(self.traces)} times.
 Performing many traces may be slow and cause memory leaks.
 Re-tracing occurs when the number or types of arguments vary, tensor shapes vary between calls or different auxiliary arguments are given (compared by reference).
 Set forget_traces=True to avoid memory leaks when many traces are required. Tracing reason: {trace_check(self, *args, **kwargs)[1]}""", RuntimeWarning)
-            all_natives = native_jit_function(*natives)  # this appends out_key to recorded_mappings
+            try:
+                all_natives = native_jit_function(*natives)  # this appends out_key to recorded_mappings
+            except Exception:
+                self.traces[key].pop(-1)  # failed traces must not be reused
+                if not self.traces[key]:
+                    del self.traces[key]
+                raise
             out_key = self.recorded_mappings[key][-1]
             buffer_config = out_key.buffer_config
+            if persistent and not loaded:
+                self._store_persistent_trace(key, out_key, aux_kwargs, natives)
+            trace_index = len(self.traces[key]) - 1
+            self._trace_last_used.setdefault(key, []).append(0)
+            self._buffer_events.setdefault(key, dict(evaluations=0, overflows=0, traces=0, dropped=0))['traces'] += 1
         else:
-            all_natives = self.traces[key][trace_index](*natives)  # call compiled function
+            native_jit_function = self.traces[key][trace_index]
+            all_natives = native_jit_function(*natives)  # call compiled function
         # --- record buffers ---
         if buffer_config:
             native_result = all_natives[:-len(buffer_config)]
@@ -317,17 +540,61 @@ Set forget_traces=True to avoid memory leaks when many traces are required. Trac
             req_buffers = {k: int(size) for k, size in zip(buffer_config.keys(), req_buffers)}
             history = self.req_buffer_history.setdefault(key, {})
             for k, size in req_buffers.items():
-                history.setdefault(k, []).append(size)
+                hist = history.setdefault(k, [])
+                hist.append(size)
+                del hist[:-_MAX_BUFFER_HISTORY]
+            events = self._buffer_events.setdefault(key, dict(evaluations=0, overflows=0, traces=0, dropped=0))
+            events['evaluations'] += 1
+            self._trace_last_used[key][trace_index] = events['evaluations']
+            self._drop_unused_traces(key, keep=trace_index)
             # --- re-run function if any buffer was too small ---
             re_run = any([req > buffer_config[k] for k, req in req_buffers.items()])
             if re_run:
+                events['overflows'] += 1
                 return self.__call__(*args, **kwargs)
         else:
             native_result = all_natives
             self.req_buffer_history.setdefault(key, {})
-        # --- assemble result ---
+            if (key.traced_aux is None or not key.traced_aux['indices']) and not key.tracing and not _TRACING_JIT:  # PyTorch always sets traced_aux but only adds natives for aux tensors requiring gradients
+                if fingerprint is None:
+                    fingerprint, _, refs = fast_signature(args, kwargs, self.f_params, self.auxiliary_args)
+                if fingerprint is not None:
+                    if len(self._fast_path) >= 16:
+                        self._fast_path.clear()
+                    self._fast_path[fingerprint] = (native_jit_function, out_key, refs)
+        return self._assemble_output(native_result, out_key)
+
+    def _drop_unused_traces(self, key: SignatureKey, keep: int):
+        """ Removes the least recently used traces of `key` until at most `max_traces` of the buffer manager remain. """
+        max_traces = getattr(self._buffer_manager, 'max_traces', None)
+        last_used = self._trace_last_used[key]
+        while max_traces is not None and len(last_used) > max(1, max_traces):
+            drop = min([i for i in range(len(last_used)) if i != keep], key=lambda i: last_used[i])
+            del self.traces[key][drop], self.recorded_mappings[key][drop], last_used[drop]
+            keep -= 1 if drop < keep else 0
+            self._buffer_events[key]['dropped'] += 1
+
+    @property
+    def buffer_statistics(self) -> List[Dict[str, Any]]:
+        """
+        Buffer usage of this function, one entry per traced signature that uses buffers.
+        Each entry is a `dict` containing the buffer configurations of the retained traces (`'configs'`),
+        statistics of the required sizes per buffer (`'required'`) and the number of `'evaluations'`, `'overflows'` (re-runs due to too small buffers),
+        `'traces'` and `'dropped'` traces.
+        """
+        result = []
+        for key, history in self.req_buffer_history.items():
+            if not history:
+                continue
+            expected = self._buffer_manager.expected_requirement(history) if isinstance(self._buffer_manager, BufferManager) else {}
+            required = {k: {'last': hist[-1], 'max': max(hist), 'mean': float(np.mean(hist)), 'expected': expected.get(k)} for k, hist in history.items()}
+            configs = [k.buffer_config for k in self.recorded_mappings.get(key, [])]
+            result.append({'signature': key, 'configs': configs, 'required': required, **self._buffer_events.get(key, {})})
+        return result
+
+    def _assemble_output(self, native_result: tuple, out_key: SignatureKey, validate=True):
         output_tensors = assemble_tensors(native_result, out_key.specs)
-        output, extracted_tensor_lists = assemble_tree(out_key.tree, output_tensors)
+        output, extracted_tensor_lists = assemble_tree(out_key.tree, output_tensors, validate=validate)
         for extracted_tensors, runnable in zip(extracted_tensor_lists, self._post_call):
             runnable(*extracted_tensors)
         return output
@@ -337,6 +604,13 @@ Set forget_traces=True to avoid memory leaks when many traces are required. Trac
         self._post_call.append(runnable)
 
     def set_buffer_manager(self, manager: Callable):
+        """
+        Sets the policy that determines the buffer sizes of new traces and which trace to use.
+
+        Args:
+            manager: `BufferManager` or function with the same signature as `default_determine_config()`.
+                If `manager` has an attribute `max_traces`, at most that many traces are kept per signature.
+        """
         assert callable(manager)
         self._buffer_manager = manager
 
@@ -348,7 +622,7 @@ Set forget_traces=True to avoid memory leaks when many traces are required. Trac
         return f_name(self.f)
 
 
-def jit_compile(f: Callable = None, auxiliary_args: str = '', forget_traces: bool = None) -> Callable:
+def jit_compile(f: Callable = None, auxiliary_args: str = '', forget_traces: bool = None, donate_args: str = '') -> Callable:
     """
     Compiles a graph based on the function `f`.
     The graph compilation is performed just-in-time (jit), e.g. when the returned function is called for the first time.
@@ -387,6 +661,10 @@ def jit_compile(f: Callable = None, auxiliary_args: str = '', forget_traces: boo
         auxiliary_args: Comma-separated parameter names of arguments that are not relevant to backpropagation.
         forget_traces: If `True`, only remembers the most recent compiled instance of this function.
             Upon tracing with new instance (due to changed shapes or auxiliary args), deletes the previous traces.
+        donate_args: Comma-separated parameter names of arguments whose memory may be reused for the outputs, e.g. the state in a time stepping function.
+            Donated arguments must not be used after the call.
+            This is only supported by Jax and ignored by other backends.
+            Functions that register buffers, see `phiml.backend._buffer.register_buffer()`, cannot donate arguments.
 
     Returns:
         Function with similar signature and return values as `f`.
@@ -395,7 +673,10 @@ def jit_compile(f: Callable = None, auxiliary_args: str = '', forget_traces: boo
         kwargs = {k: v for k, v in locals().items() if v is not None}
         return partial(jit_compile, **kwargs)
     auxiliary_args = set(s.strip() for s in auxiliary_args.split(',') if s.strip())
-    return f if isinstance(f, (JitFunction, LinearFunction)) and f.auxiliary_args == auxiliary_args else JitFunction(f, auxiliary_args, forget_traces or False)
+    donate_args = set(s.strip() for s in donate_args.split(',') if s.strip())
+    if isinstance(f, (JitFunction, LinearFunction)) and f.auxiliary_args == auxiliary_args and getattr(f, 'donate_args', set()) == donate_args:
+        return f
+    return JitFunction(f, auxiliary_args, forget_traces or False, donate_args)
 
 
 class LinearFunction(Generic[X, Y], Callable[[X], Y]):
@@ -405,12 +686,14 @@ class LinearFunction(Generic[X, Y], Callable[[X], Y]):
     Use `jit_compile_linear()` to create a linear function representation.
     """
 
-    def __init__(self, f, auxiliary_args: Set[str], forget_traces: bool):
+    def __init__(self, f, auxiliary_args: Set[str], forget_traces: bool, stable_pattern=False):
         self.f = f
         self.f_params = function_parameters(f)
         self.auxiliary_args = auxiliary_args
         self.forget_traces = forget_traces
+        self.stable_pattern = stable_pattern
         self.matrices_and_biases: Dict[SignatureKey, Tuple[SparseCoordinateTensor, Tensor, Tuple]] = {}
+        self.patterns: Dict[SignatureKey, Tuple[tuple, Tensor, SignatureKey]] = {}  # key without auxiliary args -> (pattern key, matrix, key of last matrix with this pattern)
         self.nl_jit = JitFunction(f, self.auxiliary_args, forget_traces)  # for backends that do not support sparse matrices
 
     def _get_or_trace(self, key: SignatureKey, args: tuple, f_kwargs: dict):
@@ -419,13 +702,41 @@ class LinearFunction(Generic[X, Y], Callable[[X], Y]):
         else:
             if self.forget_traces:
                 self.matrices_and_biases.clear()
+            dtypes = [t.dtype for t in disassemble_tree(args, cache=False)[1]] if _TRACE_CACHE['directory'] is not None else None
+            stored = _read_trace_cache(self.f, key, 'lin', dtypes) if _TRACE_CACHE['directory'] is not None and not key.tracing else None
+            if stored is not None:
+                matrix, bias, out_tensors = math.convert((stored['matrix'], stored['bias'], stored['out_tensors']), key.backend)
+                self.matrices_and_biases[key] = matrix, bias, (stored['out_tree'], [None, *out_tensors])  # the first output is replaced by matrix @ x + bias
+                return self.matrices_and_biases[key]
             _TRACING_LINEAR.append(self)
             try:
-                matrix, bias, raw_out = matrix_from_function(self.f, *args, **f_kwargs, auto_compress=True, _return_raw_output=True)
+                tracer, out_tree, result_tensors, target_backend = trace_linear(self.f, *args, **f_kwargs)
             finally:
                 assert _TRACING_LINEAR.pop(-1) is self
+            raw_out = out_tree, result_tensors
+            sparsify_batch = tracer_sparsify_batch(target_backend, auto_compress=True)
+            pattern_key = tracer_pattern_key(tracer, sparsify_batch) if self.stable_pattern and not key.tracing else None
+            if pattern_key is not None:
+                structure_key = SignatureKey(None, key.tree, key.shapes, key.specs, key.backend, key.tracing)
+                if structure_key in self.patterns and self.patterns[structure_key][0] == pattern_key:  # only the values changed
+                    _, pattern_matrix, prev_key = self.patterns[structure_key]
+                    values, bias, m_rank = tracer_coo_values(tracer, sparsify_batch)
+                    matrix = matrix_with_values(pattern_matrix, values, m_rank)
+                    self.matrices_and_biases.pop(prev_key, None)
+                    self.matrices_and_biases[key] = matrix, bias, raw_out
+                    self.patterns[structure_key] = pattern_key, pattern_matrix, key
+                    return matrix, bias, raw_out
+            matrix, bias = matrix_from_tracer(tracer, target_backend, auto_compress=True, sparsify_batch=sparsify_batch, prune_zeros=pattern_key is None)
+            if pattern_key is not None:
+                if self.forget_traces:
+                    self.patterns.clear()
+                pattern_matrix = matrix._with_values(matrix._values, matrix._matrix_rank)  # private copy, decompress() modifies the matrices handed to solvers
+                self.patterns[structure_key] = pattern_key, pattern_matrix, key
             if not key.tracing:
                 self.matrices_and_biases[key] = matrix, bias, raw_out
+                if _TRACE_CACHE['directory'] is not None:
+                    matrix_np, bias_np, out_tensors_np = math.convert((matrix, bias, list(raw_out[1][1:])), NUMPY)
+                    _write_trace_cache(self.f, key, 'lin', dtypes, {'matrix': matrix_np, 'bias': bias_np, 'out_tree': raw_out[0], 'out_tensors': out_tensors_np})
                 if len(self.matrices_and_biases) >= 4:
                     warnings.warn(f"""Φ-ML-lin: The compiled linear function '{f_name(self.f)}' was traced {len(self.matrices_and_biases)} times.
 Performing many traces may be slow and cause memory leaks.
@@ -495,7 +806,7 @@ Multiple linear traces can be avoided by jit-compiling the code that calls the l
         return f"lin({f_name(self.f)})"
 
 
-def jit_compile_linear(f: Callable[[X], Y] = None, auxiliary_args: str = None, forget_traces: bool = None) -> 'LinearFunction[X, Y]':
+def jit_compile_linear(f: Callable[[X], Y] = None, auxiliary_args: str = None, forget_traces: bool = None, stable_pattern: bool = None) -> 'LinearFunction[X, Y]':
     """
     Compile an optimized representation of the linear function `f`.
     For backends that support sparse tensors, a sparse matrix will be constructed for `f`.
@@ -517,6 +828,11 @@ def jit_compile_linear(f: Callable[[X], Y] = None, auxiliary_args: str = None, f
         auxiliary_args: Which parameters `f` is not linear in. These arguments are treated as conditioning arguments and will cause re-tracing on change.
         forget_traces: If `True`, only remembers the most recent compiled instance of this function.
             Upon tracing with new instance (due to changed shapes or auxiliary args), deletes the previous traces.
+        stable_pattern: If `True`, the sparsity pattern of the matrix is reused when only the values of auxiliary arguments change, e.g. masks or diffusivities.
+            This only speeds up the matrix assembly, i.e. index construction and compression are skipped.
+            `f` is still traced every time the auxiliary arguments change, which often takes longer than building the matrix.
+            To keep the pattern independent of the values, entries that are zero are stored explicitly.
+            Currently, only stencil-based functions, such as finite differences on grids, can reuse their pattern.
 
     Returns:
         `LinearFunction` with similar signature and return values as `f`.
@@ -532,13 +848,99 @@ def jit_compile_linear(f: Callable[[X], Y] = None, auxiliary_args: str = None, f
         assert auxiliary_args is None
         f_params = function_parameters(f)
         auxiliary_args = f_params[1:]
-    return f if isinstance(f, LinearFunction) and f.auxiliary_args == auxiliary_args else LinearFunction(f, auxiliary_args, forget_traces or False)
+    if isinstance(f, LinearFunction) and f.auxiliary_args == auxiliary_args and f.stable_pattern == (stable_pattern or False):
+        return f
+    return LinearFunction(f, auxiliary_args, forget_traces or False, stable_pattern or False)
 
 
 _TRACING_JIT: List[JitFunction] = []
 _TRACING_LINEAR: List[LinearFunction] = []
 
 
+_TRACE_CACHE = {'directory': None}
+
+
+def set_trace_cache(directory: Optional[str]):
+    """
+    Enables or disables the persistent trace cache.
+
+    When enabled, the results of tracing `jit_compile_linear()` functions, i.e. the sparse matrices and biases, are stored in `directory`.
+    Functions compiled with `jit_compile()` are stored as serialized executables if the backend supports it (currently Jax).
+    Other processes using the same directory load these instead of tracing the function again.
+
+    Entries are identified by the source code of the function, the signature of the call (tree structure, shapes, data types, auxiliary arguments),
+    the backend, its library version and the default device type.
+    Changes to closure variables or functions called by the traced function are not detected. Delete the directory when these change.
+
+    Args:
+        directory: Cache directory. Will be created if it does not exist. `None` disables the cache.
+    """
+    if directory is not None:
+        directory = os.path.abspath(os.path.expanduser(directory))
+        os.makedirs(directory, exist_ok=True)
+    _TRACE_CACHE['directory'] = directory
+
+
+def _trace_cache_file(f: Callable, key: SignatureKey, kind: str, dtypes: Sequence[DType]) -> Optional[str]:
+    """
+    Returns the cache file for tracing `f` with `key` or `None` if `f` or `key` cannot be identified across processes.
+    `SignatureKey` does not compare data types, so the `dtypes` of the traced tensors are added to the key.
+    """
+    while isinstance(f, (JitFunction, GradientFunction, HessianFunction, CustomGradientFunction, LinearFunction, partial)):
+        f = f.func if isinstance(f, partial) else f.f
+    try:
+        source = inspect.getsource(f)
+        aux_tree, aux_tensors = disassemble_tree(key.auxiliary_kwargs, cache=False, attr_type=all_attributes)
+        signature = pickle.dumps((key.tree, [serialize_spec(s) for s in key.specs], [str(d) for d in dtypes], aux_tree, key.spatial_derivative_order, key.traced_aux))
+        aux_values = [(repr(t.shape), np.ascontiguousarray(t.numpy(t.shape)).tobytes()) for t in aux_tensors]
+    except (OSError, TypeError, AttributeError, ValueError, NotImplementedError, pickle.PicklingError) as exc:
+        ML_LOGGER.debug(f"Φ-ML: Not caching trace of '{f_name(f)}': {exc}")
+        return None
+    digest = hashlib.sha256()
+    for item in (kind, getattr(f, '__module__', ''), getattr(f, '__qualname__', ''), source, key.backend.name, _library_version(key.backend.name), key.backend.get_default_device().device_type):
+        digest.update(str(item).encode())
+    digest.update(signature)
+    for shape_str, data in aux_values:
+        digest.update(shape_str.encode())
+        digest.update(data)
+    return os.path.join(_TRACE_CACHE['directory'], f"{f_name(f)}-{kind}-{digest.hexdigest()[:32]}.pkl")
+
+
+def _read_trace_cache(f: Callable, key: SignatureKey, kind: str, dtypes: Sequence[DType]) -> Optional[dict]:
+    file = _trace_cache_file(f, key, kind, dtypes)
+    if file is None or not os.path.isfile(file):
+        return None
+    try:
+        with open(file, 'rb') as stream:
+            stored = pickle.load(stream)
+    except Exception as exc:  # corrupt or incompatible file
+        ML_LOGGER.debug(f"Φ-ML: Failed to read cached trace {file}: {exc}")
+        return None
+    ML_LOGGER.debug(f"Φ-ML: Loaded trace of '{f_name(f)}' from {file}")
+    return stored
+
+
+def _write_trace_cache(f: Callable, key: SignatureKey, kind: str, dtypes: Sequence[DType], data: dict):
+    file = _trace_cache_file(f, key, kind, dtypes)
+    if file is None:
+        return
+    try:
+        tmp_file = f"{file}.{os.getpid()}.part"
+        with open(tmp_file, 'wb') as stream:
+            pickle.dump(data, stream)
+        os.replace(tmp_file, file)  # atomic, concurrent writers store identical content
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as exc:
+        ML_LOGGER.debug(f"Φ-ML: Failed to cache trace of '{f_name(f)}': {exc}")
+
+
+def _library_version(name: str) -> str:
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version({'numpy': 'numpy', 'torch': 'torch', 'jax': 'jaxlib', 'tensorflow': 'tensorflow'}.get(name, name))
+    except PackageNotFoundError:
+        return ''
+
+
 def when_available(runnable: Callable, *tensor_args: Tensor):
     """
     Calls `runnable(*tensor_args)` once the concrete values of all tensors are available.
@@ -1311,7 +1713,7 @@ def iterate(map_function: Callable,
         raise ValueError(f"iterations must be an int or Shape but got {type(iterations)}")
 
 
-def map_(function: Callable[..., Y], *args, dims: DimFilter = shape, range=range, unwrap_scalars=True, expand_results=False, simplify=False, **kwargs) -> Union[None, Tensor, Y]:
+def map_(function: Callable[..., Y], *args, dims: DimFilter = shape, range=range, unwrap_scalars=True, expand_results=False, simplify=False, parallel: Optional[str] = None, workers: int = None, chunk_size: int = None, **kwargs) -> Union[None, Tensor, Y]:
     """
     Calls `function` on slices of the arguments and returns the stacked result.
 
@@ -1330,10 +1732,25 @@ def map_(function: Callable[..., Y], *args, dims: DimFilter = shape, range=range
         range: Optional range function. Can be used to generate `tqdm` output by passing `trange`.
         unwrap_scalars: If `True`, passes the contents of scalar `Tensor`s instead of the tensor objects.
         simplify: If `True`, reduces constant dims of output tensors that don't vary across mapped slices.
+        parallel: How to execute the calls to `function`.
+
+            * `None` (default): Call `function` sequentially.
+            * `'threads'`: Distribute the calls among a thread pool. This is effective if `function` spends most of its time in code that releases the GIL, such as NumPy, SciPy or PyTorch operations.
+            * `'processes'`: Distribute the calls among worker processes. `function` and all arguments must be picklable.
+              NumPy arrays contained in sliceable arguments are transferred via shared memory instead of being copied to each worker.
+            * `'vectorize'`: Call `function` once with all mapped dims converted to batch dims.
+              This is only valid if `function` treats batch dims independently, which is the case for all element-wise and batched operations of Φ-ML.
+              In this mode, `unwrap_scalars` is ignored.
+
+            In all modes, the results are stacked in the same order as the sequential execution would produce.
+        workers: Number of threads or processes. Defaults to the number of CPUs.
+        chunk_size: Number of consecutive slices processed by one task. Larger chunks reduce the scheduling overhead, smaller chunks balance the load better.
+            By default, each worker receives about four chunks.
 
     Returns:
         `Tensor` of same shape as `value`.
     """
+    assert parallel in (None, 'threads', 'processes', 'vectorize'), f"parallel must be one of None, 'threads', 'processes', 'vectorize' but got {parallel}"
     sliceable_args = [v for v in args if isinstance(v, Shapable)]
     sliceable_kwargs = {k: v for k, v in kwargs.items() if isinstance(v, Shapable)}
     extra_args = [v for v in args if not isinstance(v, Shapable)]
@@ -1344,17 +1761,22 @@ def map_(function: Callable[..., Y], *args, dims: DimFilter = shape, range=range
         dims_ = merge_shapes(*sliceable_args, *sliceable_kwargs.values(), allow_varying_sizes=True).only(dims)
     assert dims_.well_defined, f"All arguments must have consistent sizes for all mapped dimensions. Trying to map along {dims} but some have varying sizes (marked as None)."
     assert dims_.volume > 0, f"map dims must have volume > 0 but got {dims_}"
-    results = []
-    for _, idx in zip(range(dims_.volume), dims_.meshgrid()):
-        idx_args = [slice_(v, idx) for v in sliceable_args]
-        idx_kwargs = {k: slice_(v, idx) for k, v in sliceable_kwargs.items()}
-        if unwrap_scalars:
-            idx_args = [v.native() if isinstance(v, Tensor) and v.rank == 0 else v for v in idx_args]
-            idx_kwargs = {k: v.native() if isinstance(v, Tensor) and v.rank == 0 else v for k, v in idx_kwargs.items()}
-        idx_extra_args = list(extra_args)
-        idx_all_args = [idx_args.pop(0) if isinstance(v, Shapable) else idx_extra_args.pop(0) for v in args]
-        f_output = function(*idx_all_args, **idx_kwargs, **extra_kwargs)
-        results.append(f_output)
+    if parallel == 'vectorize':
+        return _map_vectorized(function, args, kwargs, dims_, expand_output=not simplify)
+    if parallel:
+        indices = list(dims_.meshgrid())
+        workers = workers or os.cpu_count() or 1
+        chunk_size = chunk_size or max(1, -(-len(indices) // (4 * workers)))
+        chunks = [indices[i:i + chunk_size] for i in builtin_range(0, len(indices), chunk_size)]
+        if parallel == 'threads':
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(workers) as executor:
+                chunk_results = executor.map(lambda chunk: [_map_call(function, args, kwargs, idx, unwrap_scalars) for idx in chunk], chunks)
+                results = [r for _, r in zip(range(dims_.volume), (r for chunk in chunk_results for r in chunk))]
+        else:
+            results = _map_processes(function, args, kwargs, chunks, unwrap_scalars, workers, range, dims_.volume)
+    else:
+        results = [_map_call(function, args, kwargs, idx, unwrap_scalars) for _, idx in zip(range(dims_.volume), dims_.meshgrid())]
     if isinstance(results[0], tuple):
         stacked: List[Optional[Tensor]] = []
         for i in range(len(results[0])):
@@ -1371,6 +1793,98 @@ def map_(function: Callable[..., Y], *args, dims: DimFilter = shape, range=range
         return stack(results, dims_, expand_values=expand_results, simplify=simplify)
 
 
+def _map_call(function: Callable, args: tuple, kwargs: dict, idx: dict, unwrap_scalars: bool):
+    """ Calls `function` on the slices `idx` of all `Shapable` arguments. """
+    idx_args = [slice_(v, idx) if isinstance(v, Shapable) else v for v in args]
+    idx_kwargs = {k: slice_(v, idx) if isinstance(v, Shapable) else v for k, v in kwargs.items()}
+    if unwrap_scalars:
+        idx_args = [v.native() if isinstance(v, Tensor) and v.rank == 0 else v for v in idx_args]
+        idx_kwargs = {k: v.native() if isinstance(v, Tensor) and v.rank == 0 else v for k, v in idx_kwargs.items()}
+    return function(*idx_args, **idx_kwargs)
+
+
+def _map_vectorized(function: Callable, args: tuple, kwargs: dict, dims: Shape, expand_output: bool):
+    def call_with_kwargs(*all_args):
+        return function(*all_args[:len(args)], **dict(zip(kwargs, all_args[len(args):])))
+    output = map_types(call_with_kwargs, dims.non_batch, batch)(*args, *kwargs.values())
+    if expand_output:
+        def expand_(o):
+            return expand(o, dims) if isinstance(o, Shapable) else o
+        output = tuple([expand_(o) for o in output]) if isinstance(output, tuple) else expand_(output)
+    return output
+
+
+_MAP_WORKER_STATE = {}
+"""Function, arguments and shared memory blocks of a `map_()` worker process."""
+
+
+class _SharedArray(NamedTuple):
+    name: str
+    shape: tuple
+    dtype: str
+
+
+class _SharedTree(NamedTuple):
+    tree: Any
+    specs: tuple
+    natives: list
+
+
+def _map_processes(function: Callable, args: tuple, kwargs: dict, chunks: List[List[dict]], unwrap_scalars: bool, workers: int, range: Callable, count: int) -> list:
+    from concurrent.futures import ProcessPoolExecutor
+    try:  # forked workers inherit function without pickling it, check explicitly so the behavior does not depend on the start method
+        pickle.dumps(function)
+    except (pickle.PicklingError, TypeError, AttributeError) as exc:
+        raise ValueError(f"parallel='processes' requires a picklable function, such as a function defined at module level, but got {function}") from exc
+    blocks = []
+    try:
+        shared = [_to_shared_memory(v, blocks) if isinstance(v, Shapable) else v for v in (*args, *kwargs.values())]
+        with ProcessPoolExecutor(min(workers, len(chunks)), initializer=_init_map_worker, initargs=(function, len(args), tuple(kwargs), shared, unwrap_scalars)) as executor:
+            chunk_results = executor.map(_map_worker_chunk, chunks)
+            return [r for _, r in zip(range(count), (r for chunk in chunk_results for r in chunk))]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _to_shared_memory(obj, blocks: list):
+    """ Copies all NumPy arrays contained in `obj` into shared memory blocks and returns a picklable description of `obj`. """
+    from multiprocessing import shared_memory
+    tree, tensors = disassemble_tree(obj, cache=False, attr_type=all_attributes)
+    natives, _, specs = disassemble_tensors(tensors, expand=False)
+    natives = list(natives)
+    for i, n in enumerate(natives):
+        if isinstance(n, np.ndarray) and n.nbytes > 0 and n.dtype != object:
+            block = shared_memory.SharedMemory(create=True, size=n.nbytes)
+            blocks.append(block)
+            np.ndarray(n.shape, n.dtype, buffer=block.buf)[...] = n
+            natives[i] = _SharedArray(block.name, n.shape, n.dtype.str)
+    return _SharedTree(tree, specs, natives)
+
+
+def _from_shared_memory(obj: _SharedTree, blocks: list):
+    from multiprocessing import shared_memory
+    natives = list(obj.natives)
+    for i, n in enumerate(natives):
+        if isinstance(n, _SharedArray):
+            block = shared_memory.SharedMemory(name=n.name)
+            blocks.append(block)  # must stay open while the array is in use
+            natives[i] = np.ndarray(n.shape, np.dtype(n.dtype), buffer=block.buf)
+    return assemble_tree(obj.tree, assemble_tensors(natives, obj.specs), attr_type=all_attributes)
+
+
+def _init_map_worker(function: Callable, arg_count: int, kwarg_names: tuple, shared: list, unwrap_scalars: bool):
+    blocks = []
+    values = [_from_shared_memory(v, blocks) if isinstance(v, _SharedTree) else v for v in shared]
+    _MAP_WORKER_STATE.update(function=function, args=tuple(values[:arg_count]), kwargs=dict(zip(kwarg_names, values[arg_count:])), unwrap_scalars=unwrap_scalars, blocks=blocks)
+
+
+def _map_worker_chunk(chunk: List[dict]) -> list:
+    state = _MAP_WORKER_STATE
+    return [_map_call(state['function'], state['args'], state['kwargs'], idx, state['unwrap_scalars']) for idx in chunk]
+
+
 def identity(x):
     """
     Identity function for one argument.
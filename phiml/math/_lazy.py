@@ -0,0 +1,334 @@
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Tuple, Union, Dict, Sequence, List
+
+import numpy as np
+
+from ._magic_ops import tree_map, all_attributes
+from ._shape import Shape
+from ._tensors import Tensor, NativeTensor, compatible_tensor, _FUSE
+from ..backend import choose_backend, get_precision, precision, Backend
+from ..backend._dtype import DType
+
+
+_FUSIBLE_OP2 = {'add', 'radd', 'sub', 'rsub', 'mul', 'rmul', 'truediv', 'rtruediv', 'floordiv', 'rfloordiv', 'pow', 'rpow', 'mod', 'rmod',
+                'eq', 'ne', 'lt', 'le', 'gt', 'ge', 'and', 'rand', 'or', 'ror', 'xor', 'rxor'}
+_FUSIBLE_OP1 = {'abs', 'sign', 'round', 'ceil', 'floor', 'sqrt', 'exp', 'erf', 'log', 'log2', 'log10', 'sigmoid', 'softplus',
+                'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh', 'arcsinh', 'arccosh', 'arctanh',
+                'to_float', 'to_int32', 'to_int64', 'to_complex', 'real', 'imag', 'conj', 'isfinite', 'isnan'}
+_NUMPY_OP2 = {'add': (np.add, False), 'radd': (np.add, True), 'sub': (np.subtract, False), 'rsub': (np.subtract, True),
+              'mul': (np.multiply, False), 'rmul': (np.multiply, True), 'truediv': (np.true_divide, False), 'rtruediv': (np.true_divide, True),
+              'floordiv': (np.floor_divide, False), 'rfloordiv': (np.floor_divide, True), 'pow': (np.power, False), 'rpow': (np.power, True),
+              'mod': (np.remainder, False), 'rmod': (np.remainder, True)}
+"""Maps op names to the ufunc computing `auto_cast` followed by the operator, and whether the arguments are switched."""
+_MAX_OPS = 64
+"""Expressions with more operations are split by materializing operands."""
+_BLOCK_SIZE = 1 << 16
+"""Number of elements evaluated at once by the NumPy block evaluator. Small enough so that all temporaries of one block stay in cache."""
+_MAX_PROGRAMS = 256
+_PROGRAMS: Dict[tuple, '_Program'] = {}
+_PENDING: Dict[int, weakref.ref] = {}
+"""Lazy tensors that have not been evaluated yet, see `materialize_dependents()`."""
+
+
+@contextmanager
+def fuse(enable=True):
+    """
+    Records element-wise operations on tensors instead of executing them.
+    Each `Tensor` resulting from arithmetic, comparisons or element-wise functions like `sqrt` or `sin` is a lazy expression whose values are only computed once they are needed.
+    All recorded operations are then evaluated in one pass:
+
+    * Each input is transposed to the final dimension order once and never tiled.
+    * With NumPy, the expression is evaluated in blocks so that intermediate results stay small and cache-resident.
+    * With PyTorch or Jax, the expression is compiled into a single kernel which is cached by the structure of the expression.
+
+    Lazy tensors behave like regular tensors and are evaluated automatically when used by any non-element-wise operation.
+    Exiting this context does not evaluate them.
+    Lazy tensors that leave the context keep references to their inputs until they are evaluated, and in-place modifications of the inputs are only detected by `axpy()`.
+    Functions returning results computed within `fuse()` should therefore evaluate them first.
+
+    The setting applies to the current thread only.
+
+    Usage:
+
+    >>> with math.fuse():
+    >>>     new_state = state + dt / 6 * (k0 + 2 * (k1 + k2) + k3)
+
+    Args:
+        enable: Whether to record element-wise operations. Pass `False` to execute eagerly within an enclosing `fuse()` context.
+    """
+    _FUSE.stack.append(enable)
+    try:
+        yield None
+    finally:
+        assert _FUSE.stack.pop(-1) is enable
+
+
+class LazyTensor(NativeTensor):
+    """
+    Element-wise expression of `NativeTensor` leaves, evaluated on first access to `_native`.
+    Shapes are known upfront so that further element-wise operations can be recorded without computing intermediate results.
+
+    Expressions are nested tuples `(op_name, native_function, *args)` where each arg is an expression or the index of a leaf.
+    """
+
+    def __init__(self, expr: tuple, leaves: tuple, native_shape: Shape, shape: Shape, op_count: int):
+        Tensor.__init__(self)
+        self._expr = expr
+        self._leaves = leaves
+        self._op_count = op_count
+        self._precision = get_precision()
+        self._native_shape = native_shape
+        self._shape = shape
+        self._backend = None
+        self._result = None
+        _PENDING[id(self)] = weakref.ref(self, lambda _, key=id(self): _PENDING.pop(key, None))
+
+    @property
+    def _native(self):
+        if self._result is None:
+            with precision(self._precision):
+                program = _program(self._expr, self._leaves, self.default_backend)
+                order = self._native_shape.names
+                inputs = [leaf._transposed_native(order, False) if leaf.rank > 0 else leaf.native() for leaf in self._leaves]
+                self._result = program(inputs, self._native_shape.sizes)
+            self._expr = self._leaves = None
+            _PENDING.pop(id(self), None)
+        return self._result
+
+    def _transposed_native(self, order: Sequence[str], force_expand: bool):
+        self._native
+        return NativeTensor._transposed_native(self, order, force_expand)
+
+    @property
+    def dtype(self) -> DType:
+        if self._result is not None:
+            return choose_backend(self._result).dtype(self._result)
+        with precision(self._precision):
+            return _program(self._expr, self._leaves, self.default_backend).dtype
+
+    @property
+    def default_backend(self) -> Backend:
+        if self._result is not None:
+            return choose_backend(self._result)
+        if self._backend is None:
+            self._backend = choose_backend(*[leaf._native for leaf in self._leaves])
+        return self._backend
+
+    def _tensor(self, other) -> Tensor:
+        if isinstance(other, Tensor) or self._result is not None or isinstance(other, (tuple, list)):
+            return super()._tensor(other)
+        return compatible_tensor(other, compat_shape=self._shape, compat_natives=[leaf._native for leaf in self._leaves], convert=False)
+
+    def __reduce__(self):
+        return NativeTensor, (self._native, self._native_shape, self._shape)
+
+
+def materialize(tree):
+    """
+    Evaluates all lazy tensors contained in `tree` so that they no longer reference their inputs.
+
+    Args:
+        tree: `Tensor` or tree containing tensors, such as a `tuple` of fields.
+
+    Returns:
+        `tree`
+    """
+    def evaluate(t):
+        if isinstance(t, Tensor):
+            t._natives()
+        return t
+    tree_map(evaluate, tree, attr_type=all_attributes, include_non_attrs=False)
+    return tree
+
+
+def materialize_dependents(native):
+    """
+    Evaluates all pending lazy tensors that read from `native`.
+    Must be called before `native` is modified in-place.
+    """
+    for ref in list(_PENDING.values()):
+        lazy = ref()
+        if lazy is not None and lazy._result is None and any(_reads(leaf, native) for leaf in lazy._leaves):
+            lazy._native
+
+
+def _reads(leaf: NativeTensor, native) -> bool:
+    if isinstance(leaf, LazyTensor) and leaf._result is None:
+        return False  # checked separately
+    leaf_native = leaf._native
+    return leaf_native is native or getattr(leaf_native, 'base', None) is native
+
+
+def lazy_op2(x: NativeTensor, y: NativeTensor, native_function: Callable, op_name: str, switch_args: bool) -> LazyTensor:
+    if _is_inlined(x):  # leaf indices of x stay valid
+        leaves, x_expr, x_ops = list(x._leaves), x._expr, x._op_count
+    else:
+        leaves, x_expr, x_ops = [x], 0, 0
+    if y is x:
+        y_expr, y_ops = x_expr, x_ops
+    else:
+        y_expr, y_ops = _as_operand(y, leaves)
+    expr = (op_name, native_function, y_expr, x_expr) if switch_args else (op_name, native_function, x_expr, y_expr)
+    return LazyTensor(expr, tuple(leaves), x._native_shape & y._native_shape, x._shape & y._shape, x_ops + y_ops + 1)
+
+
+def lazy_op1(x: NativeTensor, native_function: Callable) -> LazyTensor:
+    leaves = []
+    x_expr, x_ops = _as_operand(x, leaves)
+    return LazyTensor((native_function.__name__, native_function, x_expr), tuple(leaves), x._native_shape, x._shape, x_ops + 1)
+
+
+def _is_inlined(t: NativeTensor):
+    return isinstance(t, LazyTensor) and t._result is None and t._op_count < _MAX_OPS
+
+
+def _as_operand(t: NativeTensor, leaves: list) -> Tuple[Union[tuple, int], int]:
+    if _is_inlined(t):
+        return _remap(t._expr, t._leaves, leaves, {}), t._op_count
+    return _leaf_index(t, leaves), 0
+
+
+def _remap(expr: Union[tuple, int], old_leaves: tuple, leaves: list, memo: dict):
+    """ Re-indexes the leaves of `expr`, keeping shared sub-expressions shared. """
+    if isinstance(expr, int):
+        return _leaf_index(old_leaves[expr], leaves)
+    if id(expr) not in memo:
+        memo[id(expr)] = expr[:2] + tuple([_remap(a, old_leaves, leaves, memo) for a in expr[2:]])
+    return memo[id(expr)]
+
+
+def _leaf_index(t: NativeTensor, leaves: list) -> int:
+    for i, leaf in enumerate(leaves):
+        if leaf is t:
+            return i
+    leaves.append(t)
+    return len(leaves) - 1
+
+
+def _structure(expr: Union[tuple, int]):
+    if isinstance(expr, int):
+        return expr
+    return (expr[0],) + tuple([_structure(a) for a in expr[2:]])
+
+
+def _nodes(expr: Union[tuple, int], nodes: list, visited: set) -> list:
+    """ Lists all unique operation nodes of `expr` in evaluation order. """
+    if isinstance(expr, tuple) and id(expr) not in visited:
+        visited.add(id(expr))
+        for a in expr[2:]:
+            _nodes(a, nodes, visited)
+        nodes.append(expr)
+    return nodes
+
+
+def _cast_precision(dtype: DType, fp_precision: int) -> DType:
+    return dtype if dtype.precision in (None, fp_precision) else DType(dtype.kind, precision=fp_precision)
+
+
+class _Program:
+    """
+    Sequence of steps evaluating an expression on a list of inputs.
+    Each step `(function, args, kwargs, release)` writes its result to a new slot and frees the slots listed in `release` which are not needed anymore.
+    """
+
+    def __init__(self, backend: Backend, steps: List[tuple], dtype: DType, numpy_dtype):
+        self.backend = backend
+        self.steps = steps
+        self.dtype = dtype
+        self.numpy_dtype = numpy_dtype
+        self.kernels: Dict[tuple, Callable] = {}
+
+    def run(self, natives: Sequence, out=None):
+        values = list(natives) + [None] * len(self.steps)
+        offset = len(natives)
+        for i, (function, args, kwargs, release) in enumerate(self.steps):
+            if kwargs is None:
+                values[offset + i] = function(*[values[a] for a in args])
+            elif out is not None and i == len(self.steps) - 1:
+                values[offset + i] = function(*[values[a] for a in args], out=out, **kwargs)
+            else:
+                values[offset + i] = function(*[values[a] for a in args], **kwargs)
+            for r in release:
+                values[r] = None
+        return values[-1]
+
+    def __call__(self, natives: list, sizes: tuple):
+        if self.backend.name == 'numpy':
+            return self._run_blocked(natives, sizes)
+        from ._functional import _TRACING_JIT, _TRACING_LINEAR
+        if _TRACING_JIT or _TRACING_LINEAR or self.backend.name not in ('torch', 'jax'):
+            return self.run(natives)
+        key = tuple([self.backend.staticshape(n) for n in natives])
+        if key not in self.kernels:
+            def fused_kernel(*natives):
+                return self.run(natives)
+            self.kernels[key] = self.backend.jit_compile(fused_kernel)
+        return self.kernels[key](*natives)
+
+    def _run_blocked(self, natives: list, sizes: tuple):
+        """ Runs the steps in chunks along the outermost non-singleton dimension, writing each block into a pre-allocated output. """
+        if not sizes or int(np.prod(sizes)) <= _BLOCK_SIZE:
+            return self.run(natives)
+        axis = next(i for i, s in enumerate(sizes) if s > 1)
+        step = max(1, _BLOCK_SIZE // int(np.prod(sizes[axis + 1:])))
+        if step >= sizes[axis]:
+            return self.run(natives)
+        result = np.empty(sizes, self.numpy_dtype)
+        prefix = (slice(None),) * axis
+        for start in range(0, sizes[axis], step):
+            block = prefix + (slice(start, start + step),)
+            out = result[block]
+            block_result = self.run([n[block] if np.ndim(n) and n.shape[axis] > 1 else n for n in natives], out=out)
+            if block_result is not out:
+                out[...] = block_result
+        return result
+
+
+def _program(expr: tuple, leaves: tuple, backend: Backend) -> _Program:
+    """ Returns the cached program evaluating `expr` for leaves with the data types of `leaves` at the current precision. """
+    dtypes = tuple([_cast_precision(leaf.dtype if isinstance(leaf, LazyTensor) else backend.dtype(leaf._native), get_precision()) for leaf in leaves])
+    key = (backend, _structure(expr), dtypes, get_precision())
+    program = _PROGRAMS.get(key, None)
+    if program is None:
+        if len(_PROGRAMS) >= _MAX_PROGRAMS:
+            _PROGRAMS.clear()
+        program = _PROGRAMS[key] = _compile(expr, [backend.zeros((0,), dtype) for dtype in dtypes], backend)
+    return program
+
+
+def _compile(expr: tuple, probes: list, backend: Backend) -> _Program:
+    """
+    Runs `expr` on empty `probes` to determine the data types of all intermediate results.
+    With NumPy, backend functions that cast their arguments and apply an operator are replaced by a single ufunc call with fixed `dtype`.
+    """
+    nodes = _nodes(expr, [], set())
+    slots = {id(node): len(probes) + i for i, node in enumerate(nodes)}
+    values = list(probes)
+    node_args = []
+    last_use = {}
+    for i, node in enumerate(nodes):
+        args = [a if isinstance(a, int) else slots[id(a)] for a in node[2:]]
+        node_args.append(args)
+        values.append(node[1](*[values[a] for a in args]))
+        for a in args:
+            last_use[a] = i
+    release = [[] for _ in nodes]
+    for slot, i in last_use.items():
+        if slot >= len(probes):
+            release[i].append(slot)
+    steps = []
+    for i, (node, args) in enumerate(zip(nodes, node_args)):
+        function, kwargs = node[1], None
+        if backend.name == 'numpy':
+            result_dtype = np.result_type(values[len(probes) + i])
+            ufunc = getattr(type(backend), node[0], None)
+            if len(args) == 2 and node[0] in _NUMPY_OP2 and result_dtype.kind in 'iufc':
+                function, switched = _NUMPY_OP2[node[0]]
+                args = args[::-1] if switched else args
+                kwargs = {'dtype': result_dtype}
+            elif len(args) == 1 and isinstance(ufunc, np.ufunc) and result_dtype.kind in 'fc' and np.result_type(values[args[0]]).kind == result_dtype.kind:
+                function, kwargs = ufunc, {'dtype': result_dtype}
+        steps.append((function, args, kwargs, release[i]))
+    result = values[-1]
+    return _Program(backend, steps, backend.dtype(result), np.result_type(result) if backend.name == 'numpy' else None)
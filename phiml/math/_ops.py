@@ -2616,6 +2616,46 @@ def minimum(x: Union[Tensor, float], y: Union[Tensor, float], allow_none=False):
     return custom_op2(x, y, minimum, lambda x_, y_: choose_backend(x_, y_).minimum(x_, y_), op_name='minimum')
 
 
+def axpy(a: Union[Number, Tensor], x: Union[Tensor, Number], y: Tensor, b: Union[Number, Tensor] = 1, in_place=False) -> Tensor:
+    """
+    Computes `a * x + b * y`.
+
+    With `in_place=True`, the result may be written into the memory of `y`, avoiding the allocation of a new array.
+    This is only done if the backend supports in-place updates (NumPy, PyTorch outside of gradient recording) and `a`, `b` are scalars.
+    Otherwise, a new tensor is returned, so the result must always be used in place of `y`.
+    With Jax, use `jit_compile(..., donate_args=...)` to reuse buffers instead.
+
+    **Warning:** When updating in-place, `y` and all tensors sharing memory with it are modified.
+    Only use this when `y` is not referenced elsewhere.
+
+    Args:
+        a: Factor of `x`.
+        x: `Tensor` whose shape is contained in `y.shape`.
+        y: `Tensor` to update.
+        b: Factor of `y`.
+        in_place: Whether `y` may be overwritten with the result.
+
+    Returns:
+        `Tensor`. If the update was performed in-place, this is `y`.
+    """
+    if not in_place or not isinstance(a, Number) or not isinstance(b, Number) or not isinstance(y, Tensor):
+        return a * x + (y if b == 1 else b * y)
+    x = wrap(x)
+    if isinstance(y, TensorStack) and not y._is_tracer:
+        dim = y._stack_dim
+        xs = unstack(x, dim.name) if dim.name in x.shape else [x] * dim.size
+        return TensorStack([axpy(a, x_, y_, b, in_place) for x_, y_ in zip(xs, y._tensors)], dim)
+    if isinstance(x, NativeTensor) and isinstance(y, NativeTensor) and y._native_shape == y._shape and x.shape in y.shape:
+        backend = choose_backend(x._native, y._native)
+        x_native = x._transposed_native(y._native_shape.names, False)
+        from ._lazy import _PENDING, materialize_dependents
+        if _PENDING:
+            materialize_dependents(y._native)
+        result = backend.axpy(a, x_native, y._native, b, in_place=True)
+        return y if result is y._native else NativeTensor(result, y._native_shape, y._shape)
+    return a * x + (y if b == 1 else b * y)
+
+
 def clip(x: Tensor, lower_limit: Union[float, Tensor] = 0, upper_limit: Union[float, Tensor, Shape] = 1):
     """ Limits the values of the `Tensor` `x` to lie between `lower_limit` and `upper_limit` (inclusive). """
     if isinstance(upper_limit, Shape):
@@ -1,5 +1,6 @@
 import re
 import warnings
+from functools import lru_cache
 from numbers import Number
 from typing import Tuple, Callable, List, Union, Any, Sequence, Optional, Dict
 
@@ -41,13 +42,21 @@ def enable_debug_checks():
     DEBUG_CHECKS.append(True)
 
 
+_SAME_SHAPE = object()  # stored in Shape._cache in place of the shape itself to avoid a reference cycle
+
+
 class Shape:
     """
     Shapes enumerate dimensions, each consisting of a name, size and type.
 
     There are five types of dimensions: `batch`, `dual`, `spatial`, `channel`, and `instance`.
+
+    Shapes are immutable.
+    Derived shapes, such as `Shape.spatial` or `Shape.non_batch`, and the name-to-index map are computed once per instance and stored in `_cache`.
     """
 
+    __slots__ = ('sizes', 'names', 'types', 'item_names', '_cache')
+
     def __init__(self, sizes: tuple, names: tuple, types: tuple, item_names: tuple):
         """
         To construct a `Shape`, use `batch`, `dual`, `spatial`, `channel` or `instance`, depending on the desired dimension type.
@@ -75,6 +84,7 @@ class Shape:
         """
         self.types: Tuple[str, ...] = types  # undocumented, may be private
         self.item_names: Tuple[Optional[Tuple[str, ...]], ...] = (None,) * len(sizes) if item_names is None else item_names  # undocumented
+        self._cache: Optional[dict] = None
         if DEBUG_CHECKS:
             assert len(sizes) == len(names) == len(types) == len(item_names), f"sizes={sizes}, names={names}, types={types}, item_names={item_names}"
             assert len(set(names)) == len(names), f"Duplicate dimension names: {names}"
@@ -100,6 +110,46 @@ class Shape:
                 if type == DUAL_DIM:
                     assert name.startswith('~'), f"Dual dimensions must start with '~' but got '{name}' in {self}"
 
+    def __getstate__(self):
+        return self.sizes, self.names, self.types, self.item_names
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # pickled before Shape used __slots__
+            state = state['sizes'], state['names'], state['types'], state['item_names']
+        self.sizes, self.names, self.types, self.item_names = state
+        self._cache = None
+
+    def _cached(self) -> dict:
+        if self._cache is None:
+            self._cache = {}
+        return self._cache
+
+    def _types_subset(self, types: tuple, keep: bool) -> 'Shape':
+        """ Sub-shape of the dims whose type is in `types` if `keep`, else of the dims whose type is not in `types`. Memoized. """
+        try:
+            result = self._cache[(types, keep)]
+        except (TypeError, KeyError):  # no cache yet or not computed
+            indices = [i for i, t in enumerate(self.types) if (t in types) == keep]
+            result = self._cached()[(types, keep)] = _SAME_SHAPE if len(indices) == len(self.types) else self[indices]
+        return self if result is _SAME_SHAPE else result
+
+    @property
+    def _name_index(self) -> Dict[str, int]:
+        try:
+            return self._cache['index']
+        except (TypeError, KeyError):
+            result = self._cached()['index'] = {n: i for i, n in enumerate(self.names)}
+            return result
+
+    @property
+    def _is_static(self) -> bool:
+        """ Whether all sizes are `int` or `None`. Only static shapes are hashed by value in `merge_shapes()`. """
+        cache = self._cached()
+        result = cache.get('static')
+        if result is None:
+            result = cache['static'] = all(s is None or isinstance(s, int) for s in self.sizes)
+        return result
+
     def _check_is_valid_tensor_shape(self):
         if DEBUG_CHECKS:
             from ._tensors import Tensor
@@ -152,6 +202,8 @@ class Shape:
         return len(self.sizes)
 
     def __contains__(self, item):
+        if isinstance(item, str) and item and ',' not in item:
+            return item.strip() in self._name_index
         if isinstance(item, (str, tuple, list)):
             dims = parse_dim_order(item)
             return all(dim in self.names for dim in dims)
@@ -166,7 +218,11 @@ class Shape:
         return not any(dim in self.names for dim in other)
 
     def __iter__(self):
-        return iter(self[i] for i in range(self.rank))
+        cache = self._cached()
+        dims = cache.get('dims')
+        if dims is None:
+            dims = cache['dims'] = tuple([Shape((self.sizes[i],), (self.names[i],), (self.types[i],), (self.item_names[i],)) for i in range(len(self.names))])
+        return iter(dims)
 
     def index(self, dim: Union[str, 'Shape', None]) -> int:
         """
@@ -184,12 +240,13 @@ class Shape:
         if dim is None:
             return None
         elif isinstance(dim, str):
-            if dim not in self.names:
+            index = self._name_index.get(dim)
+            if index is None:
                 raise ValueError(f"Shape {self} has no dimension '{dim}'")
-            return self.names.index(dim)
+            return index
         elif isinstance(dim, Shape):
             assert dim.rank == 1, f"index() requires a single dimension as input but got {dim}. Use indices() for multiple dimensions."
-            return self.names.index(dim.name)
+            return self._name_index[dim.name]
         else:
             raise ValueError(f"index() requires a single dimension as input but got {dim}")
 
@@ -232,12 +289,13 @@ class Shape:
             assert dim.rank == 1, f"get_size() requires a single dimension but got {dim}. Use indices() to get multiple sizes."
             dim = dim.name
         if isinstance(dim, str):
-            if dim not in self.names:
+            index = self._name_index.get(dim)
+            if index is None:
                 if default is None:
                     raise KeyError(f"get_size() failed because '{dim}' is not part of Shape {self} and no default value was provided")
                 else:
                     return default
-            return self.sizes[self.names.index(dim)]
+            return self.sizes[index]
         else:
             raise ValueError(f"get_size() requires a single dim name but got {dim}. Use indices() to get multiple sizes.")
 
@@ -351,7 +409,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t == BATCH_DIM]]
+        return self._types_subset((BATCH_DIM,), True)
 
     @property
     def non_batch(self) -> 'Shape':
@@ -364,7 +422,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t != BATCH_DIM]]
+        return self._types_subset((BATCH_DIM,), False)
 
     @property
     def spatial(self) -> 'Shape':
@@ -377,7 +435,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t == SPATIAL_DIM]]
+        return self._types_subset((SPATIAL_DIM,), True)
 
     @property
     def non_spatial(self) -> 'Shape':
@@ -390,7 +448,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t != SPATIAL_DIM]]
+        return self._types_subset((SPATIAL_DIM,), False)
 
     @property
     def instance(self) -> 'Shape':
@@ -403,7 +461,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t == INSTANCE_DIM]]
+        return self._types_subset((INSTANCE_DIM,), True)
 
     @property
     def non_instance(self) -> 'Shape':
@@ -416,7 +474,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t != INSTANCE_DIM]]
+        return self._types_subset((INSTANCE_DIM,), False)
 
     @property
     def channel(self) -> 'Shape':
@@ -429,7 +487,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t == CHANNEL_DIM]]
+        return self._types_subset((CHANNEL_DIM,), True)
 
     @property
     def non_channel(self) -> 'Shape':
@@ -442,7 +500,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t != CHANNEL_DIM]]
+        return self._types_subset((CHANNEL_DIM,), False)
 
     @property
     def dual(self) -> 'Shape':
@@ -455,7 +513,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t == DUAL_DIM]]
+        return self._types_subset((DUAL_DIM,), True)
 
     @property
     def non_dual(self) -> 'Shape':
@@ -468,7 +526,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t != DUAL_DIM]]
+        return self._types_subset((DUAL_DIM,), False)
 
     @property
     def primal(self) -> 'Shape':
@@ -481,7 +539,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t not in [DUAL_DIM, BATCH_DIM]]]
+        return self._types_subset((DUAL_DIM, BATCH_DIM), False)
 
     @property
     def non_primal(self) -> 'Shape':
@@ -494,7 +552,7 @@ class Shape:
         Returns:
             New `Shape` object
         """
-        return self[[i for i, t in enumerate(self.types) if t in [DUAL_DIM, BATCH_DIM]]]
+        return self._types_subset((DUAL_DIM, BATCH_DIM), True)
 
     @property
     def transposed(self):
@@ -697,6 +755,8 @@ class Shape:
         return '(' + ', '.join(strings) + ')'
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Shape):
             return False
         if self.names != other.names or self.types != other.types:
@@ -798,11 +858,17 @@ class Shape:
         elif callable(dims):
             dims = dims(self)
         if isinstance(dims, str):
-            return self[[i for i in range(self.rank) if self.names[i] not in parse_dim_order(dims)]]
+            dims = parse_dim_order(dims)
         elif isinstance(dims, Shape):
-            return self[[i for i in range(self.rank) if self.names[i] not in dims.names]]
+            dims = dims.names
         if isinstance(dims, (tuple, list, set)) and all([isinstance(d, str) for d in dims]):
-            return self[[i for i in range(self.rank) if self.names[i] not in dims]]
+            cache = self._cached()
+            key = ('without', dims if isinstance(dims, tuple) else tuple(dims))
+            result = cache.get(key)
+            if result is None:
+                indices = [i for i in range(self.rank) if self.names[i] not in dims]
+                result = cache[key] = _SAME_SHAPE if len(indices) == self.rank else self[indices]
+            return self if result is _SAME_SHAPE else result
         elif isinstance(dims, (tuple, list, set)):
             result = self
             for wo in dims:
@@ -850,14 +916,18 @@ class Shape:
                     dim_names.extend(d.names)
                 else:
                     raise ValueError(f"Format not understood for Shape.only(): {dims}")
-            if reorder:
-                dim_names = [d.name if isinstance(d, Shape) else d for d in dim_names]
-                assert all(isinstance(d, str) for d in dim_names)
-                return self[[self.names.index(d) for d in dim_names if d in self.names]]
-            else:
-                dim_names = [d.name if isinstance(d, Shape) else d for d in dim_names]
-                assert all(isinstance(d, str) for d in dim_names)
-                return self[[i for i in range(self.rank) if self.names[i] in dim_names]]
+            dim_names = [d.name if isinstance(d, Shape) else d for d in dim_names]
+            assert all(isinstance(d, str) for d in dim_names)
+            cache = self._cached()
+            key = ('only', tuple(dim_names), reorder)
+            result = cache.get(key)
+            if result is None:
+                if reorder:
+                    indices = [self.names.index(d) for d in dim_names if d in self.names]
+                else:
+                    indices = [i for i in range(self.rank) if self.names[i] in dim_names]
+                result = cache[key] = _SAME_SHAPE if indices == list(range(self.rank)) else self[indices]
+            return self if result is _SAME_SHAPE else result
         raise ValueError(dims)
 
     def is_compatible(self, *others: 'Shape'):
@@ -1485,12 +1555,17 @@ def parse_dim_order(order: Union[str, tuple, list, Shape, None]) -> Union[tuple,
     elif isinstance(order, tuple):
         return order
     elif isinstance(order, str):
-        parts = order.split(',')
-        parts = [p.strip() for p in parts if p]
-        return tuple(parts)
+        return _parse_dim_str(order)
     raise ValueError(order)
 
 
+@lru_cache(maxsize=4096)
+def _parse_dim_str(order: str) -> tuple:
+    parts = order.split(',')
+    parts = [p.strip() for p in parts if p]
+    return tuple(parts)
+
+
 def _construct_shape(dim_type: str, *args, **dims):
     sizes = ()
     names = []
@@ -1630,11 +1705,11 @@ def spatial(*args, **dims: Union[int, str, tuple, list, Shape, 'Tensor']) -> Sha
     Returns:
         `Shape` containing only dimensions of type spatial.
     """
+    if len(args) == 1 and not dims and isinstance(args[0], Shape):
+        return args[0].spatial
     from .magic import Shaped
     if all(isinstance(arg, str) for arg in args) or dims:
         return _construct_shape(SPATIAL_DIM, *args, **dims)
-    elif len(args) == 1 and isinstance(args[0], Shape):
-        return args[0].spatial
     elif len(args) == 1 and isinstance(args[0], Shaped):
         return shape(args[0]).spatial
     else:
@@ -1672,11 +1747,11 @@ def channel(*args, **dims: Union[int, str, tuple, list, Shape, 'Tensor']) -> Sha
     Returns:
         `Shape` containing only dimensions of type channel.
     """
+    if len(args) == 1 and not dims and isinstance(args[0], Shape):
+        return args[0].channel
     from .magic import Shaped
     if all(isinstance(arg, str) for arg in args) or dims:
         return _construct_shape(CHANNEL_DIM, *args, **dims)
-    elif len(args) == 1 and isinstance(args[0], Shape):
-        return args[0].channel
     elif len(args) == 1 and isinstance(args[0], Shaped):
         return shape(args[0]).channel
     else:
@@ -1714,11 +1789,11 @@ def batch(*args, **dims: Union[int, str, tuple, list, Shape, 'Tensor']) -> Shape
     Returns:
         `Shape` containing only dimensions of type batch.
     """
+    if len(args) == 1 and not dims and isinstance(args[0], Shape):
+        return args[0].batch
     from .magic import Shaped
     if all(isinstance(arg, str) for arg in args) or dims:
         return _construct_shape(BATCH_DIM, *args, **dims)
-    elif len(args) == 1 and isinstance(args[0], Shape):
-        return args[0].batch
     elif len(args) == 1 and isinstance(args[0], Shaped):
         return shape(args[0]).batch
     else:
@@ -1756,11 +1831,11 @@ def instance(*args, **dims: Union[int, str, tuple, list, Shape, 'Tensor']) -> Sh
     Returns:
         `Shape` containing only dimensions of type instance.
     """
+    if len(args) == 1 and not dims and isinstance(args[0], Shape):
+        return args[0].instance
     from .magic import Shaped
     if all(isinstance(arg, str) for arg in args) or dims:
         return _construct_shape(INSTANCE_DIM, *args, **dims)
-    elif len(args) == 1 and isinstance(args[0], Shape):
-        return args[0].instance
     elif len(args) == 1 and isinstance(args[0], Shaped):
         return shape(args[0]).instance
     else:
@@ -1807,11 +1882,11 @@ def dual(*args, **dims: Union[int, str, tuple, list, Shape, 'Tensor']) -> Shape:
     Returns:
         `Shape` containing only dimensions of type dual.
     """
+    if len(args) == 1 and not dims and isinstance(args[0], Shape):
+        return args[0].dual
     from .magic import Shaped
     if all(isinstance(arg, str) for arg in args) or dims:
         return _construct_shape(DUAL_DIM, *args, **dims)
-    elif len(args) == 1 and isinstance(args[0], Shape):
-        return args[0].dual
     elif len(args) == 1 and isinstance(args[0], Shaped):
         return shape(args[0]).dual
     else:
@@ -1939,7 +2014,19 @@ def merge_shapes(*objs: Union[Shape, Any], order=(batch, dual, instance, spatial
     """
     if not objs:
         return EMPTY_SHAPE
-    shapes = [obj if isinstance(obj, Shape) else shape(obj) for obj in objs]
+    shapes = tuple([obj if isinstance(obj, Shape) else shape(obj) for obj in objs])
+    if all(s._is_static for s in shapes):
+        return _merge_static_shapes(shapes, order, allow_varying_sizes)
+    return _merge_shapes(shapes, order, allow_varying_sizes)
+
+
+@lru_cache(maxsize=1024)
+def _merge_static_shapes(shapes: Tuple[Shape, ...], order: tuple, allow_varying_sizes: bool) -> Shape:
+    """ Shapes with `int` sizes are compared by value, so repeated merges of equal shapes return the same `Shape` instance. """
+    return _merge_shapes(shapes, order, allow_varying_sizes)
+
+
+def _merge_shapes(shapes: Sequence[Shape], order: tuple, allow_varying_sizes: bool) -> Shape:
     merged = []
     for dim_type in order:
         type_group = dim_type(shapes[0])
@@ -1980,10 +2067,10 @@ def non_batch(obj) -> Shape:
     Returns:
         `Shape`
     """
-    from .magic import Shaped
     if isinstance(obj, Shape):
         return obj.non_batch
-    elif isinstance(obj, Shaped):
+    from .magic import Shaped
+    if isinstance(obj, Shaped):
         return shape(obj).non_batch
     else:
         raise AssertionError(f"non_batch() must be called either on a Shape or an object with a 'shape' property but got {obj}")
@@ -1999,10 +2086,10 @@ def non_spatial(obj) -> Shape:
     Returns:
         `Shape`
     """
-    from .magic import Shaped
     if isinstance(obj, Shape):
         return obj.non_spatial
-    elif isinstance(obj, Shaped):
+    from .magic import Shaped
+    if isinstance(obj, Shaped):
         return shape(obj).non_spatial
     else:
         raise AssertionError(f"non_spatial() must be called either on a Shape or an object with a 'shape' property but got {obj}")
@@ -2018,10 +2105,10 @@ def non_instance(obj) -> Shape:
     Returns:
         `Shape`
     """
-    from .magic import Shaped
     if isinstance(obj, Shape):
         return obj.non_instance
-    elif isinstance(obj, Shaped):
+    from .magic import Shaped
+    if isinstance(obj, Shaped):
         return shape(obj).non_instance
     else:
         raise AssertionError(f"non_instance() must be called either on a Shape or an object with a 'shape' property but got {obj}")
@@ -2037,10 +2124,10 @@ def non_channel(obj) -> Shape:
     Returns:
         `Shape`
     """
-    from .magic import Shaped
     if isinstance(obj, Shape):
         return obj.non_channel
-    elif isinstance(obj, Shaped):
+    from .magic import Shaped
+    if isinstance(obj, Shaped):
         return shape(obj).non_channel
     else:
         raise AssertionError(f"non_channel() must be called either on a Shape or an object with a 'shape' property but got {obj}")
@@ -2056,10 +2143,10 @@ def non_dual(obj) -> Shape:
     Returns:
         `Shape`
     """
-    from .magic import Shaped
     if isinstance(obj, Shape):
         return obj.non_dual
-    elif isinstance(obj, Shaped):
+    from .magic import Shaped
+    if isinstance(obj, Shaped):
         return shape(obj).non_dual
     else:
         raise AssertionError(f"non_dual() must be called either on a Shape or an object with a 'shape' property but got {obj}")
@@ -2075,10 +2162,10 @@ def non_primal(obj) -> Shape:
     Returns:
         `Shape`
     """
-    from .magic import Shaped
     if isinstance(obj, Shape):
         return obj.non_primal
-    elif isinstance(obj, Shaped):
+    from .magic import Shaped
+    if isinstance(obj, Shaped):
         return shape(obj).non_primal
     else:
         raise AssertionError(f"non_dual() must be called either on a Shape or an object with a 'shape' property but got {obj}")
@@ -2094,10 +2181,10 @@ def primal(obj) -> Shape:
     Returns:
         `Shape`
     """
-    from .magic import Shaped
     if isinstance(obj, Shape):
         return obj.primal
-    elif isinstance(obj, Shaped):
+    from .magic import Shaped
+    if isinstance(obj, Shaped):
         return shape(obj).primal
     else:
         raise AssertionError(f"primal() must be called either on a Shape or an object with a 'shape' property but got {obj}")
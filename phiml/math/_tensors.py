@@ -1,4 +1,6 @@
 import dataclasses
+import json
+import threading
 from numbers import Number
 import traceback
 import warnings
@@ -931,6 +933,15 @@ class TensorDim(BoundDim):
 _EQUALITY_REDUCE = [{'type': 'elementwise'}]
 
 
+class _FuseState(threading.local):
+    """ Stack of `math.fuse()` settings. Each thread has its own stack so that fusing in one thread does not affect others. """
+    def __init__(self):
+        self.stack = [False]
+
+
+_FUSE = _FuseState()
+
+
 @contextmanager
 def equality_by_ref():
     """
@@ -1339,6 +1350,10 @@ class NativeTensor(Tensor):
             return (NativeTensor(self._native, new_native_shape, new_shape),) * self._shape.get_size(dim)
 
     def _op1(self, native_function):
+        if _FUSE.stack[-1]:
+            from ._lazy import _FUSIBLE_OP1, lazy_op1
+            if getattr(native_function, '__name__', None) in _FUSIBLE_OP1:
+                return lazy_op1(self, native_function)
         native = native_function(self._native)
         return NativeTensor(native, self._native_shape, self._shape) if native is not None else self
 
@@ -1352,6 +1367,10 @@ class NativeTensor(Tensor):
             return NotImplemented
         if not isinstance(other_tensor, NativeTensor):
             other_tensor = NativeTensor(other_tensor.native(other_tensor.shape), other_tensor.shape, other_tensor.shape)
+        if _FUSE.stack[-1]:
+            from ._lazy import _FUSIBLE_OP2, lazy_op2
+            if op_name in _FUSIBLE_OP2:
+                return lazy_op2(self, other_tensor, native_function, op_name, switch_args)
         broadcast_shape = self._native_shape & other_tensor._native_shape
         natives = [t.native(order=broadcast_shape, force_expand=False) if t.rank > 0 else t.native() for t in [self, other_tensor]]
         if switch_args:
@@ -1944,8 +1963,17 @@ def disassemble_tree(obj: PhiTreeNodeType, cache: bool, attr_type=variable_attri
             return obj, []
 
 
-def assemble_tree(obj: PhiTreeNodeType, values: List[Tensor], attr_type=variable_attributes) -> PhiTreeNodeType:
-    """ Reverses `disassemble_tree()` given an empty nested structure and a list of tensors. """
+def assemble_tree(obj: PhiTreeNodeType, values: List[Tensor], attr_type=variable_attributes, validate=True) -> PhiTreeNodeType:
+    """
+    Reverses `disassemble_tree()` given an empty nested structure and a list of tensors.
+
+    Args:
+        obj: Empty structure as returned by `disassemble_tree()`.
+        values: Tensors to fill in. Consumed values are removed from the list.
+        attr_type: Attribute type passed to `disassemble_tree()`.
+        validate: If `False`, dataclasses are created without calling their constructor, skipping any validation in `__post_init__`.
+            Only use this if the tensors are known to be compatible with the structure.
+    """
     if isinstance(obj, str) and obj == MISSING_TENSOR:
         return None
     elif isinstance(obj, str) and obj == NATIVE_TENSOR:
@@ -1959,23 +1987,23 @@ def assemble_tree(obj: PhiTreeNodeType, values: List[Tensor], attr_type=variable
         assert isinstance(value, Tensor)
         return value
     elif isinstance(obj, list):
-        return [assemble_tree(item, values, attr_type) for item in obj]
+        return [assemble_tree(item, values, attr_type, validate) for item in obj]
     elif isinstance(obj, tuple):
-        return tuple([assemble_tree(item, values, attr_type) for item in obj])
+        return tuple([assemble_tree(item, values, attr_type, validate) for item in obj])
     elif isinstance(obj, dict) and '__layout__' in obj:
-        content = assemble_tree(obj['obj'], values, attr_type)
+        content = assemble_tree(obj['obj'], values, attr_type, validate)
         return Layout(content, Shape._from_dict(obj['stack_dim']))
     elif isinstance(obj, dict):
-        return {name: assemble_tree(val, values, attr_type) for name, val in obj.items()}
+        return {name: assemble_tree(val, values, attr_type, validate) for name, val in obj.items()}
     elif isinstance(obj, Tensor):
         return obj
     elif dataclasses.is_dataclass(obj):
         from ..dataclasses._dataclasses import DataclassTreeNode, assemble
         if isinstance(obj, DataclassTreeNode):
-            return assemble(obj, values)
+            return assemble(obj, values, validate)
     if isinstance(obj, PhiTreeNode):
         attributes = attr_type(obj)
-        values = {a: assemble_tree(getattr(obj, a), values, attr_type) for a in attributes}
+        values = {a: assemble_tree(getattr(obj, a), values, attr_type, validate) for a in attributes}
         return copy_with(obj, **values)
     return obj
 
@@ -2952,51 +2980,78 @@ def specs_equal(spec1, spec2):
     return spec1 == spec2
 
 
-def save(file: str, obj):
+def save(file: str, obj, format='npz'):
     """
     Saves a `Tensor` or tree using NumPy.
     This function converts all tensors contained in `obj` to NumPy tensors before storing.
     Each tensor is given a name corresponding to its path within `obj`, allowing reading only specific arrays from the file later on.
-    Pickle is used for structures, but no reference to `Tensor` or its sub-classes is included.
+
+    Two formats are supported:
+
+    * `'npz'`: NumPy archive. Pickle is used for structures, but no reference to `Tensor` or its sub-classes is included.
+    * `'raw'`: Single file consisting of a JSON header followed by the raw array data, each aligned to 64 bytes.
+      NumPy arrays are written directly without intermediate copies and `load()` memory-maps the data instead of reading it.
+      Tensor specifications, paths and the tree are stored as JSON, so only trees consisting of `dict`, `list`, `tuple`, `str`, numbers, `None` and tensors are supported.
 
     See Also:
         `load()`.
 
     Args:
-        file: Target file, will be stored as `.npz`.
+        file: Target file. With `format='npz'`, the extension `.npz` is appended if not present.
         obj: `Tensor` or tree to store.
+        format: `'npz'` or `'raw'`.
     """
+    assert format in ('npz', 'raw'), f"format must be 'npz' or 'raw' but got {format}"
     tree, tensors = disassemble_tree(obj, False, all_attributes)
     paths = attr_paths(obj, all_attributes, 'root')
     assert len(paths) == len(tensors)
     natives = [t._natives() for t in tensors]
-    specs = [serialize_spec(t._spec_dict()) for t in tensors]
     native_paths = [[f'{p}:{i}' for i in range(len(ns))] for p, ns in zip(paths, natives)]
     all_natives = sum(natives, ())
     all_paths = sum(native_paths, [])
     all_np = [choose_backend(n).numpy(n) for n in all_natives]
-    np.savez(file, tree=np.asarray(tree, dtype=object), specs=specs, paths=paths, **{p: n for p, n in zip(all_paths, all_np)})
+    if format == 'raw':
+        _save_raw(file, tree, [t._spec_dict() for t in tensors], paths, all_paths, all_np)
+    else:
+        specs = [serialize_spec(t._spec_dict()) for t in tensors]
+        np.savez(file, tree=np.asarray(tree, dtype=object), specs=specs, paths=paths, **{p: n for p, n in zip(all_paths, all_np)})
 
 
-def load(file: str):
+def load(file: str, paths: Sequence[str] = None):
     """
     Loads a `Tensor` or tree from a file previously written using `save`.
 
     All tensors are restored as NumPy arrays, not the backend-specific tensors they may have been written as.
     Use `convert()` to convert all or some of the tensors to a different backend.
+    Files written with `format='raw'` are memory-mapped in copy-on-write mode, i.e. data is only read from disc when accessed and modifications are not written back.
 
     Args:
         file: File to read.
+        paths: (Optional) Paths of the tensors to load, such as `'root'` or `'root[key]'`.
+            If specified, only these tensors are loaded and the structure of the stored object is not restored.
 
     Returns:
-        Same type as what was written.
+        Same type as what was written if `paths` is `None`, else `dict` mapping the requested paths to `Tensor` objects.
     """
-    data = np.load(file, allow_pickle=True)
-    all_np = {k: data[k] for k in data if k not in ['tree', 'specs', 'paths']}
-    specs = [unserialize_spec(spec) for spec in data['specs'].tolist()]
-    tensors = assemble_tensors(list(all_np.values()), specs)
-    tree = data['tree'].tolist()  # this may require outside classes via pickle
-    stored_paths = data['paths'].tolist()
+    with open(file, 'rb') as stream:
+        is_raw = stream.read(len(_RAW_MAGIC)) == _RAW_MAGIC
+    if is_raw:
+        tree, specs, stored_paths, arrays = _load_raw(file)
+    else:
+        data = np.load(file, allow_pickle=True)
+        specs = [unserialize_spec(spec) for spec in data['specs'].tolist()]
+        stored_paths = data['paths'].tolist()
+        tree = None if paths is not None else data['tree'].tolist()  # this may require outside classes via pickle
+        arrays = {k: (lambda k=k: data[k]) for k in data if k not in ['tree', 'specs', 'paths']}
+    if paths is not None:
+        result = {}
+        for path in paths:
+            assert path in stored_paths, f"No tensor stored at path '{path}'. Available: {stored_paths}"
+            spec = specs[stored_paths.index(path)]
+            natives = [arrays[f'{path}:{i}']() for i in range(_native_count(spec))]
+            result[path] = assemble_tensors(natives, [spec])[0]
+        return result
+    tensors = assemble_tensors([a() for a in arrays.values()], specs)
     new_paths = attr_paths_from_container(tree, all_attributes, 'root')
     if tuple(stored_paths) != tuple(new_paths):
         lookup = {path: t for path, t in zip(stored_paths, tensors)}
@@ -3004,6 +3059,128 @@ def load(file: str):
     return assemble_tree(tree, tensors, attr_type=all_attributes)
 
 
+_RAW_MAGIC = b'PHIMLRAW'
+_RAW_ALIGNMENT = 64
+
+
+def _save_raw(file: str, tree, specs: List[dict], paths: List[str], native_paths: List[str], arrays: List[np.ndarray]):
+    spec_tensors = []  # tensors referenced by specs, e.g. constant sparse indices, or by the sizes of non-uniform shapes
+    header = {'version': 1, 'paths': paths, 'specs': _to_json(specs, spec_tensors), 'spec_tensors': [], 'arrays': []}
+    try:
+        header['tree'] = _to_json(tree, spec_tensors)
+    except TypeError as err:
+        raise ValueError(f"Cannot save tree in raw format: {err}. Only dict, list, tuple, str, numbers, None and tensors are supported. Use format='npz' instead.") from err
+    arrays = list(arrays)
+    native_paths = list(native_paths)
+    while len(header['spec_tensors']) < len(spec_tensors):  # encoding a spec may add more tensors
+        t = spec_tensors[len(header['spec_tensors'])]
+        natives = t._natives()
+        native_paths.extend([f"spec_tensor{len(header['spec_tensors'])}:{i}" for i in range(len(natives))])
+        arrays.extend([choose_backend(n).numpy(n) for n in natives])
+        header['spec_tensors'].append(_to_json(t._spec_dict(), spec_tensors))
+    offset = 0
+    for path, array in zip(native_paths, arrays):
+        assert not array.dtype.hasobject, f"Cannot store object arrays in raw format: {path}"
+        header['arrays'].append({'path': path, 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset += -(-array.nbytes // _RAW_ALIGNMENT) * _RAW_ALIGNMENT
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(_RAW_MAGIC) + 8 + len(header_bytes)) // _RAW_ALIGNMENT) * _RAW_ALIGNMENT
+    with open(file, 'wb') as stream:
+        stream.write(_RAW_MAGIC)
+        stream.write(np.uint64(data_start).tobytes())
+        stream.write(header_bytes)
+        for entry, array in zip(header['arrays'], arrays):
+            stream.seek(data_start + entry['offset'])
+            np.ascontiguousarray(array).tofile(stream)  # writes directly from the array's memory
+        stream.truncate(data_start + offset)
+
+
+def _load_raw(file: str):
+    with open(file, 'rb') as stream:
+        stream.seek(len(_RAW_MAGIC))
+        data_start = int(np.frombuffer(stream.read(8), np.uint64)[0])
+        header = json.loads(stream.read(data_start - len(_RAW_MAGIC) - 8).rstrip(b'\0').decode('utf-8'))
+
+    def map_array(entry: dict):
+        shape = tuple(entry['shape'])
+        if int(np.prod(shape)) == 0:
+            return np.empty(shape, entry['dtype'])
+        return np.memmap(file, dtype=np.dtype(entry['dtype']), mode='c', offset=data_start + entry['offset'], shape=shape)
+
+    arrays = {entry['path']: (lambda entry=entry: map_array(entry)) for entry in header['arrays']}
+    spec_tensors = {}
+
+    def spec_tensor(index: int) -> Tensor:
+        if index not in spec_tensors:
+            spec = _from_json(header['spec_tensors'][index], spec_tensor)
+            natives = [arrays[f'spec_tensor{index}:{i}']() for i in range(_native_count(spec))]
+            spec_tensors[index] = assemble_tensors(natives, [spec])[0]
+        return spec_tensors[index]
+
+    specs = _from_json(header['specs'], spec_tensor)
+    tree = _from_json(header['tree'], spec_tensor)
+    return tree, specs, header['paths'], {p: a for p, a in arrays.items() if not p.startswith('spec_tensor')}
+
+
+def _native_count(spec: dict) -> int:
+    if spec['type'] is NativeTensor:
+        return 1
+    if spec['type'] is TensorStack:
+        return sum(_native_count(t) for t in spec['tensors'])
+    return sum(_native_count(v) for v in spec.values() if isinstance(v, dict) and 'type' in v)
+
+
+def _to_json(obj, tensors: list = None):
+    """
+    Encodes specs and tree structures as JSON-compatible values. Raises a `TypeError` for unsupported objects.
+
+    Args:
+        obj: Value to encode.
+        tensors: If given, `Tensor` values are appended to this list and encoded by their index.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, (np.integer, np.floating, np.bool_)):
+        return obj.item()
+    if isinstance(obj, list):
+        return [_to_json(v, tensors) for v in obj]
+    if isinstance(obj, tuple):
+        return {'__tuple__': [_to_json(v, tensors) for v in obj]}
+    if isinstance(obj, dict):
+        return {'__dict__': [[_to_json(k, tensors), _to_json(v, tensors)] for k, v in obj.items()]}
+    if isinstance(obj, Shape):
+        return {'__shape__': _to_json(dict(names=obj.names, types=obj.types, item_names=obj.item_names, sizes=obj.sizes), tensors)}
+    if isinstance(obj, Tensor) and tensors is not None:
+        tensors.append(obj)
+        return {'__tensor__': len(tensors) - 1}
+    if isinstance(obj, type) and obj in _spec_types():
+        return {'__type__': _spec_types()[obj]}
+    raise TypeError(f"Cannot encode {type(obj).__name__} as JSON")
+
+
+def _from_json(obj, spec_tensor: Callable[[int], Tensor] = None):
+    if isinstance(obj, list):
+        return [_from_json(v, spec_tensor) for v in obj]
+    if isinstance(obj, dict):
+        if '__tuple__' in obj:
+            return tuple(_from_json(v, spec_tensor) for v in obj['__tuple__'])
+        if '__dict__' in obj:
+            return {_from_json(k, spec_tensor): _from_json(v, spec_tensor) for k, v in obj['__dict__']}
+        if '__shape__' in obj:
+            shape = _from_json(obj['__shape__'], spec_tensor)
+            return Shape(tuple(shape['sizes']), tuple(shape['names']), tuple(shape['types']), tuple(shape['item_names']))
+        if '__tensor__' in obj:
+            return spec_tensor(obj['__tensor__'])
+        if '__type__' in obj:
+            return {name: t for t, name in _spec_types().items()}[obj['__type__']]
+    return obj
+
+
+def _spec_types() -> Dict[type, str]:
+    from ._sparse import SparseCoordinateTensor, CompactSparseTensor, CompressedSparseMatrix
+    return {NativeTensor: 'dense', TensorStack: 'stack', CompressedSparseMatrix: 'compressed', SparseCoordinateTensor: 'coo', CompactSparseTensor: 'compact'}
+
+
 def serialize_spec(spec: dict):
     from ._sparse import SparseCoordinateTensor, CompactSparseTensor, CompressedSparseMatrix
     type_names = {NativeTensor: 'dense', TensorStack: 'stack', CompressedSparseMatrix: 'compressed', SparseCoordinateTensor: 'coo', CompactSparseTensor: 'compact'}
@@ -9,10 +9,10 @@ from scipy.sparse import csr_matrix
 from ..backend import choose_backend, NUMPY, Backend
 from ._ops import choose_backend_t, concat_tensor, scatter, zeros_like
 from ._shape import Shape, parse_dim_order, merge_shapes, spatial, instance, batch, concat_shapes, EMPTY_SHAPE, dual, channel, non_batch, primal, non_channel, DEBUG_CHECKS
-from ._magic_ops import stack, expand, rename_dims, unpack_dim, unstack, value_attributes
+from ._magic_ops import stack, expand, rename_dims, unpack_dim, unstack, value_attributes, pack_dims
 from ._tensors import Tensor, wrap, disassemble_tree, disassemble_tensors, assemble_tree, TensorStack, may_vary_along, \
     discard_constant_dims, variable_shape, NativeTensor, equality_by_shape_and_value
-from ._sparse import SparseCoordinateTensor, is_sparse, sparse_dims, same_sparsity_pattern, sparse_tensor, stored_indices, stored_values, add_sparse_batch_dim
+from ._sparse import SparseCoordinateTensor, CompressedSparseMatrix, is_sparse, sparse_dims, same_sparsity_pattern, sparse_tensor, stored_indices, stored_values, add_sparse_batch_dim
 from . import _ops as math
 from ..backend._dtype import combine_types
 
@@ -690,6 +690,44 @@ def matrix_from_function(f: Callable,
             Input dimensions will be `dual` dimensions of the matrix while output dimensions will be regular.
         bias: Bias for affine functions or zero-vector if the function is purely linear.
     """
+    tracer, out_tree, result_tensors, target_backend = trace_linear(f, *args, auxiliary_args=auxiliary_args, **kwargs)
+    matrix, bias = matrix_from_tracer(tracer, target_backend, auto_compress, sparsify_batch, separate_independent)
+    return (matrix, bias, (out_tree, result_tensors)) if _return_raw_output else (matrix, bias)
+
+
+def matrix_from_tracer(tracer: Tensor, target_backend: Backend, auto_compress=False, sparsify_batch=None, separate_independent=False, prune_zeros=True) -> Tuple[Tensor, Tensor]:
+    """
+    Builds the matrix and bias of a traced linear function, see `matrix_from_function()`.
+
+    Args:
+        prune_zeros: If `False`, the sparsity pattern of stencils does not depend on their values, i.e. entries that are zero are stored explicitly.
+    """
+    sparsify_batch = tracer_sparsify_batch(target_backend, auto_compress) if sparsify_batch is None else sparsify_batch
+    # --- Convert to COO ---
+    if isinstance(tracer, SparseLinTracer):
+        matrix, bias = tracer._get_matrix(sparsify_batch), tracer._bias
+    elif isinstance(tracer, GatherLinTracer):
+        matrix, bias = to_sparse_tracer(tracer, None)._get_matrix(sparsify_batch), tracer._bias
+    else:
+        matrix, bias = tracer_to_coo(tracer, sparsify_batch, separate_independent, prune_zeros)
+    # --- Compress ---
+    if auto_compress and matrix.default_backend.supports(Backend.mul_csr_dense) and target_backend.supports(Backend.mul_csr_dense) and isinstance(matrix, SparseCoordinateTensor):
+        matrix = matrix.compress_rows()
+    # elif backend.supports(Backend.mul_csc_dense):
+    #     return matrix.compress_cols(), tracer._bias
+    return matrix, bias
+
+
+def trace_linear(f: Callable, *args, auxiliary_args=None, **kwargs) -> Tuple[Tensor, Any, List[Tensor], Backend]:
+    """
+    Runs the linear function `f` with a tracer in place of its linear argument.
+
+    Returns:
+        tracer: Traced output of `f`.
+        out_tree: Tree of the output of `f`.
+        result_tensors: Tensors of the output of `f`, the first one being the unsimplified tracer.
+        target_backend: Backend of the linear argument.
+    """
     assert isinstance(auxiliary_args, str) or auxiliary_args is None, f"auxiliary_args must be a comma-separated str but got {auxiliary_args}"
     from ._functional import function_parameters, f_name
     f_params = function_parameters(f)
@@ -712,32 +750,22 @@ def matrix_from_function(f: Callable,
     #     assert not t._is_tracer, f"Linear function must only return a single tracer at position 0 but got {result_tensors}"
     tracer = result_tensors[0]._simplify()
     assert tracer._is_tracer, f"Tracing linear function '{f_name(f)}' failed. Make sure only linear operations are used. Output: {tracer.shape}"
-    # --- Convert to COO ---
-    if sparsify_batch is None:
-        if auto_compress:
-            sparsify_batch = not target_backend.supports(Backend.csr_matrix_batched)
-        else:
-            sparsify_batch = not target_backend.supports(Backend.sparse_coo_tensor_batched)
-    if isinstance(tracer, SparseLinTracer):
-        matrix, bias = tracer._get_matrix(sparsify_batch), tracer._bias
-    elif isinstance(tracer, GatherLinTracer):
-        matrix, bias = to_sparse_tracer(tracer, None)._get_matrix(sparsify_batch), tracer._bias
+    return tracer, out_tree, result_tensors, target_backend
+
+
+def tracer_sparsify_batch(target_backend: Backend, auto_compress: bool) -> bool:
+    if auto_compress:
+        return not target_backend.supports(Backend.csr_matrix_batched)
     else:
-        matrix, bias = tracer_to_coo(tracer, sparsify_batch, separate_independent)
-    # --- Compress ---
-    if auto_compress and matrix.default_backend.supports(Backend.mul_csr_dense) and target_backend.supports(Backend.mul_csr_dense) and isinstance(matrix, SparseCoordinateTensor):
-        matrix = matrix.compress_rows()
-    # elif backend.supports(Backend.mul_csc_dense):
-    #     return matrix.compress_cols(), tracer._bias
-    return (matrix, bias, (out_tree, result_tensors)) if _return_raw_output else (matrix, bias)
-    
+        return not target_backend.supports(Backend.sparse_coo_tensor_batched)
+
 
-def tracer_to_coo(tracer: Tensor, sparsify_batch: bool, separate_independent: bool):  # ToDo this may return compressed if function uses
+def tracer_to_coo(tracer: Tensor, sparsify_batch: bool, separate_independent: bool, prune_zeros=True):  # ToDo this may return compressed if function uses
     # if isinstance(tracer, CollapsedTensor):
     #     tracer = tracer._cached if tracer.is_cached else tracer._inner  # ignore collapsed dimensions. Alternatively, we could expand the result
     #     return tracer_to_coo(tracer, sparsify_batch, separate_independent)
     if isinstance(tracer, TensorStack):  # This indicates separable solves
-        matrices, biases = zip(*[tracer_to_coo(t, sparsify_batch, separate_independent) for t in tracer._tensors])
+        matrices, biases = zip(*[tracer_to_coo(t, sparsify_batch, separate_independent, prune_zeros) for t in tracer._tensors])
         bias = stack(biases, tracer._stack_dim)
         if not separate_independent:
             indices = [math.concat_tensor([m._indices, expand(i, instance(m._indices), channel(sparse_idx=tracer._stack_dim.name))], 'sparse_idx') for i, m in enumerate(matrices)]
@@ -764,7 +792,7 @@ def tracer_to_coo(tracer: Tensor, sparsify_batch: bool, separate_independent: bo
     src_indices = []
     values = []
     for shift_, shift_val in tracer.val.items():
-        if shift_val.default_backend is NUMPY:  # sparsify stencil further
+        if prune_zeros and shift_val.default_backend is NUMPY:  # sparsify stencil further
             native_shift_values = math.reshaped_native(shift_val, [batch_val, *out_shape])
             mask = np.sum(abs(native_shift_values), 0)  # only 0 where no batch entry has a non-zero value
             out_idx = numpy.nonzero(mask)
@@ -795,6 +823,65 @@ def tracer_to_coo(tracer: Tensor, sparsify_batch: bool, separate_independent: bo
     return matrix, tracer._bias
 
 
+def tracer_pattern_key(tracer: Tensor, sparsify_batch: bool) -> Optional[tuple]:
+    """
+    Everything that determines the indices of the matrix built by `tracer_to_coo()` with `prune_zeros=False`.
+    Two tracers with equal keys result in matrices with the same sparsity pattern and entry order.
+
+    Returns:
+        Hashable key or `None` if the pattern of `tracer` cannot be reused.
+    """
+    if isinstance(tracer, TensorStack):
+        keys = [tracer_pattern_key(t, sparsify_batch) for t in tracer._tensors]
+        return None if any(k is None for k in keys) else ('stack', tracer._stack_dim, tuple(keys))
+    if not isinstance(tracer, ShiftLinTracer):
+        return None
+    matrix_dims = matrix_dims_for_tracer(tracer, sparsify_batch)
+    if non_batch(matrix_dims[0]).is_empty:
+        return None
+    return 'shift', tuple(tracer.val), matrix_dims, tracer.shape, tracer._source.shape, tuple(tracer._renamed.items()), merge_shapes(*tracer.val.values()).without(matrix_dims[0])
+
+
+def tracer_coo_values(tracer: Tensor, sparsify_batch: bool) -> Tuple[Tensor, Tensor, Union[Tensor, int]]:
+    """
+    Computes only the values and bias of `tracer_to_coo(tracer, sparsify_batch, False, prune_zeros=False)`.
+    The values are ordered like the entries of that matrix.
+    Requires `tracer_pattern_key(tracer)` to not be `None`.
+
+    Returns:
+        values: Matrix values along the instance dimension `entries`.
+        bias: `Tensor`
+        m_rank: Maximum rank of the matrix or -1 if unknown.
+    """
+    if isinstance(tracer, TensorStack):
+        values, biases, _ = zip(*[tracer_coo_values(t, sparsify_batch) for t in tracer._tensors])
+        return math.concat_tensor(values, 'entries'), stack(biases, tracer._stack_dim), -1
+    out_shape = matrix_dims_for_tracer(tracer, sparsify_batch)[0]
+    batch_val = merge_shapes(*tracer.val.values()).without(out_shape)
+    values = [math.reshaped_native(shift_val, [batch_val, out_shape]) for shift_val in tracer.val.values()]
+    values = math.reshaped_tensor(choose_backend(*values).concat(values, axis=-1), [batch_val, instance('entries')], convert=False)
+    return values, tracer._bias, out_shape.volume - tracer.min_rank_deficiency()
+
+
+def matrix_with_values(matrix: Tensor, values: Tensor, m_rank: Union[Tensor, int] = -1) -> Tensor:
+    """
+    Replaces the values of a matrix built by `matrix_from_tracer()` with `prune_zeros=False`, keeping its indices.
+
+    Args:
+        matrix: `SparseCoordinateTensor` or `CompressedSparseMatrix`.
+            Compressed matrices must not have been decompressed since `decompress()` discards the entry permutation.
+        values: Values in the entry order of the uncompressed matrix, as returned by `tracer_coo_values()`.
+        m_rank: Maximum rank of the new matrix.
+    """
+    if isinstance(matrix, SparseCoordinateTensor):
+        return matrix._with_values(values, m_rank)
+    assert isinstance(matrix, CompressedSparseMatrix), f"Cannot replace values of {type(matrix)}"
+    values = pack_dims(values, 'entries', instance('sp_entries'))
+    if matrix._uncompressed_indices_perm is not None:
+        values = values[matrix._uncompressed_indices_perm]
+    return matrix._with_values(values, m_rank)
+
+
 def matrix_dims_for_tracer(tracer: Union[ShiftLinTracer, SparseLinTracer], sparsify_batch: bool):
     renamed_src_names = [o for n, o in tracer._out_name_to_original.items() if n != o]
     removed_dims = tracer._source.shape.without(tracer.shape).without(renamed_src_names)  # these were sliced off
@@ -0,0 +1,39 @@
+"""
+Compression ratio, write/read throughput and maximum error of the field codecs, see `phi.field.write()`.
+
+Run with `python tests/benchmarks/bench_codecs.py [resolution]`.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from phi.flow import *
+
+
+def benchmark(grid: CenteredGrid, codec, repeat=3):
+    raw_bytes = grid.values.numpy(grid.shape).nbytes
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'field.npz')
+        t = time.perf_counter()
+        for _ in range(repeat):
+            field.write(grid, file, compress=True, codec=codec)
+        write_time = (time.perf_counter() - t) / repeat
+        t = time.perf_counter()
+        for _ in range(repeat):
+            loaded = field.read(file)
+        read_time = (time.perf_counter() - t) / repeat
+        ratio = raw_bytes / os.path.getsize(file)
+    max_error = float(math.max(abs(loaded.values - grid.values)))
+    return ratio, raw_bytes / write_time / 1e6, raw_bytes / read_time / 1e6, max_error
+
+
+if __name__ == '__main__':
+    resolution = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    grid = CenteredGrid(Noise(scale=20), 0, x=resolution, y=resolution, z=resolution)
+    print(f"{resolution}^3 float32 smooth noise, savez_compressed")
+    print(f"{'codec':<16}{'ratio':>7}{'write MB/s':>12}{'read MB/s':>11}{'max error':>11}")
+    for name, codec in [('none', None), ('float16', 'float16'), ('bfloat16', 'bfloat16'),
+                        ('quantize(1e-3)', field.Quantize(1e-3)), ('block(1e-3)', field.BlockTransform(1e-3)), ('block(1e-2)', field.BlockTransform(1e-2))]:
+        ratio, write_speed, read_speed, error = benchmark(grid, codec)
+        print(f"{name:<16}{ratio:>7.1f}{write_speed:>12.0f}{read_speed:>11.0f}{error:>11.1e}")
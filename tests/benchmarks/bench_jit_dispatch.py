@@ -0,0 +1,53 @@
+"""
+Dispatch overhead of `jit_compile()`-ed functions with and without the fast path of `JitFunction`.
+
+The NumPy backend is given a fake `jit_compile` that returns the outputs of the first trace, so only the time spent outside the compiled function is measured.
+
+Run with `python tests/benchmarks/bench_jit_dispatch.py`.
+"""
+import time
+from unittest import mock
+
+from phiml.backend._numpy_backend import NumPyBackend
+from phiml.math import _functional
+
+from phi.flow import *
+
+
+def fake_jit(self, f, **kwargs):
+    result = []
+
+    def compiled(*natives):
+        if not result:
+            result.append(f(*natives))
+        return result[0]
+    return compiled
+
+
+def time_per_call(function, *args, repeat: int):
+    for _ in range(3):
+        function(*args)
+    t = time.perf_counter()
+    for _ in range(repeat):
+        function(*args)
+    return (time.perf_counter() - t) / repeat
+
+
+def step(v, p):
+    return v * 1.001, p + 1
+
+
+def benchmark():
+    tensor_args = math.random_normal(spatial(x=64, y=64), channel(vector='x,y')), math.zeros(spatial(x=64, y=64))
+    field_args = StaggeredGrid(Noise(), 0, x=64, y=64), CenteredGrid(0, ZERO_GRADIENT, x=64, y=64)
+    return time_per_call(jit_compile(step), *tensor_args, repeat=500), time_per_call(jit_compile(step), *field_args, repeat=20)
+
+
+if __name__ == '__main__':
+    with mock.patch.object(NumPyBackend, 'jit_compile', fake_jit):
+        with mock.patch.object(_functional, 'fast_signature', lambda *args, **kwargs: (None, None, None)):
+            slow_tensor, slow_field = benchmark()
+        fast_tensor, fast_field = benchmark()
+    print(f"{'call':<44}{'slow path':>12}{'fast path':>12}")
+    print(f"{'step(Tensor 64x64x2, Tensor 64x64)':<44}{slow_tensor * 1e6:>9.0f} us{fast_tensor * 1e6:>9.0f} us")
+    print(f"{'step(StaggeredGrid 64^2, CenteredGrid 64^2)':<44}{slow_field * 1e3:>9.1f} ms{fast_field * 1e3:>9.1f} ms")
@@ -0,0 +1,60 @@
+"""
+Run time of the batch-parallel NumPy backend operations for different thread counts, see `phiml.backend.set_num_threads()`.
+
+Run with `python tests/benchmarks/bench_numpy_threads.py [batch_size]`.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse
+
+from phiml.backend import NUMPY, set_num_threads, get_num_threads
+
+
+def time_per_call(function, repeat=5):
+    function()
+    t = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - t) / repeat
+
+
+def operations(batch_size: int) -> dict:
+    rnd = np.random.default_rng(0)
+    grid = rnd.standard_normal((batch_size, 128, 128, 2)).astype(np.float32)
+    value = rnd.standard_normal((batch_size, 2, 128, 128)).astype(np.float32)
+    kernel = rnd.standard_normal((1, 2, 2, 5, 5)).astype(np.float32)
+    coordinates = rnd.uniform(-2, 130, (batch_size, 100000, 2)).astype(np.float32)
+    indices = rnd.integers(0, 128, (batch_size, 100000, 2))
+    values = rnd.standard_normal((batch_size, 100000, 2)).astype(np.float32)
+    matrix = scipy.sparse.random(4096, 4096, density=1e-3, format='csr', dtype=np.float32, random_state=0)
+    csr_values = np.tile(matrix.data[None, :, None], (batch_size, 1, 2))
+    col = np.tile(matrix.indices[None], (batch_size, 1))
+    ptr = np.tile(matrix.indptr[None], (batch_size, 1))
+    dense = rnd.standard_normal((batch_size, 4096, 2, 64)).astype(np.float32)
+    return {
+        'conv 128^2, 5x5 kernel': lambda: NUMPY.conv(value, kernel),
+        'scatter 100k points, add': lambda: NUMPY.scatter(grid, indices, values, 'add'),
+        'grid_sample 100k points': lambda: NUMPY.grid_sample(grid, coordinates, 'periodic'),
+        'fft 128^2': lambda: NUMPY.fft(grid, [1, 2]),
+        'mul_csr_dense 4096^2 x 64': lambda: NUMPY.mul_csr_dense(col, ptr, csr_values, (4096, 4096), dense),
+    }
+
+
+if __name__ == '__main__':
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    thread_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    previous = get_num_threads()
+    print(f"batch size {batch_size}, {os.cpu_count()} CPUs")
+    print(f"{'operation':<28}" + ''.join(f"{f'{n} threads':>12}" for n in thread_counts))
+    try:
+        for name, op in operations(batch_size).items():
+            times = []
+            for num_threads in thread_counts:
+                set_num_threads(num_threads)
+                times.append(time_per_call(op))
+            print(f"{name:<28}" + ''.join(f"{t * 1e3:>9.1f} ms" for t in times))
+    finally:
+        set_num_threads(previous)
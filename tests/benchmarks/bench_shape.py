@@ -0,0 +1,44 @@
+"""
+Time spent in `Shape` operations that run inside most tensor operations, with and without the memoization of derived shapes.
+
+Memoization is disabled by giving each `Shape` a fresh cache on every access and bypassing the `merge_shapes()` cache.
+
+Run with `python tests/benchmarks/bench_shape.py`.
+"""
+import time
+from unittest import mock
+
+from phiml.math import _shape
+
+from phi.flow import *
+
+
+def time_per_call(function, repeat: int):
+    for _ in range(3):
+        function()
+    t = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - t) / repeat
+
+
+def shape_ops(s: Shape, other: Shape):
+    s.spatial, s.non_batch, s.batch, s.channel, s.non_channel, s.primal
+    s.without('vector'), s.only('x,y'), s.index('y')
+    math.merge_shapes(s, other), s & other
+
+
+def benchmark():
+    s = batch(b=4) & spatial(x=64, y=64) & channel(vector='x,y')
+    other = spatial(x=64, y=64)
+    a, b = math.zeros(s), math.ones(other)
+    return time_per_call(lambda: shape_ops(s, other), repeat=20000), time_per_call(lambda: a + b, repeat=5000)
+
+
+if __name__ == '__main__':
+    with mock.patch.object(Shape, '_cached', lambda self: {}), mock.patch.object(_shape, '_merge_static_shapes', _shape._merge_shapes):
+        slow_ops, slow_add = benchmark()
+    fast_ops, fast_add = benchmark()
+    print(f"{'operation':<36}{'uncached':>12}{'cached':>12}{'speedup':>9}")
+    print(f"{'11 shape ops (b=4, x=64, y=64, vector)':<36}{slow_ops * 1e6:>9.1f} us{fast_ops * 1e6:>9.1f} us{slow_ops / fast_ops:>8.1f}x")
+    print(f"{'Tensor + Tensor (4x64x64x2 + 64x64)':<36}{slow_add * 1e6:>9.1f} us{fast_add * 1e6:>9.1f} us{slow_add / fast_add:>8.1f}x")
@@ -0,0 +1,65 @@
+import os
+from unittest import TestCase, mock
+
+import numpy as np
+
+from phiml import math
+from phiml.backend import NUMPY, set_num_threads, get_num_threads
+from phiml.backend._numpy_backend import NumPyBackend
+from phiml.math import spatial, channel, batch, instance, extrapolation, vec
+
+
+def gather_grid_sample(grid, coordinates, ext):
+    """ Samples using the gather-based implementation of `math.grid_sample()`. """
+    with mock.patch.object(NumPyBackend, 'grid_sample', lambda *args: NotImplemented):
+        return math.grid_sample(grid, coordinates, ext)
+
+
+class TestNumPyBackend(TestCase):
+
+    def setUp(self):
+        self.grid = math.random_normal(batch(b=2), spatial(x=7, y=5), channel(c=2))
+        self.inside = math.random_uniform(batch(b=2), instance(points=100), channel(vector='x,y')) * vec(x=7.98, y=5.98) - .99  # at most one cell outside
+        self.outside = math.random_uniform(batch(b=2), instance(points=100), channel(vector='x,y'), low=-4, high=10)
+        self.num_threads = get_num_threads()
+
+    def tearDown(self):
+        set_num_threads(self.num_threads)  # also configures other backends, such as PyTorch
+
+    def test_grid_sample_matches_gather(self):
+        for ext in [extrapolation.ZERO, extrapolation.ONE, extrapolation.ZERO_GRADIENT, extrapolation.PERIODIC]:
+            math.assert_close(gather_grid_sample(self.grid, self.outside, ext), math.grid_sample(self.grid, self.outside, ext), abs_tolerance=1e-5, msg=ext)
+        # mixed extrapolations pad one layer, so they are only exact up to one cell outside, see math.grid_sample()
+        ext = extrapolation.combine_sides(x=extrapolation.PERIODIC, y=(extrapolation.ZERO, extrapolation.ZERO_GRADIENT))
+        math.assert_close(gather_grid_sample(self.grid, self.inside, ext), math.grid_sample(self.grid, self.inside, ext), abs_tolerance=1e-5)
+
+    def test_grid_sample_mirrored(self):
+        for ext in [extrapolation.SYMMETRIC, extrapolation.REFLECT]:  # the gather implementation does not support these, compare to sampling the padded grid
+            grid = math.random_normal(batch(b=2), spatial(x=12, y=10), channel(c=2))
+            reference = math.grid_sample(math.pad(grid, {'x': (8, 8), 'y': (8, 8)}, ext), self.outside + 8, extrapolation.ZERO_GRADIENT)
+            math.assert_close(reference, math.grid_sample(grid, self.outside, ext), abs_tolerance=1e-5, msg=ext)
+
+    def test_fft(self):
+        x = np.random.randn(3, 16, 8).astype(np.float32)
+        k = NUMPY.fft(x, [1, 2])
+        self.assertEqual(np.complex64, k.dtype)
+        np.testing.assert_allclose(np.fft.fftn(x, axes=[1, 2]), k, rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(x, NUMPY.ifft(k, [1, 2]).real, rtol=1e-4, atol=1e-5)
+
+    def test_set_num_threads(self):
+        math.set_num_threads(3)
+        self.assertEqual(3, get_num_threads())
+        set_num_threads(None)
+        self.assertEqual(os.cpu_count() or 1, get_num_threads())
+        set_num_threads(1)
+        self.assertEqual(1, get_num_threads())
+
+    def test_threaded_ops_match_single_threaded(self):
+        x = np.random.randn(4, 32, 16).astype(np.float32)
+        set_num_threads(1)
+        single = (math.grid_sample(self.grid, self.outside, extrapolation.PERIODIC), NUMPY.fft(x, [1, 2]))
+        set_num_threads(3)
+        self.assertEqual(list(range(10)), NUMPY._map_batches(lambda i: i, 10))
+        threaded = (math.grid_sample(self.grid, self.outside, extrapolation.PERIODIC), NUMPY.fft(x, [1, 2]))
+        math.assert_close(single[0], threaded[0], abs_tolerance=0)
+        np.testing.assert_array_equal(single[1], threaded[1])
@@ -1,11 +1,16 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from os.path import dirname, abspath, join, basename
+import numpy as np
+
+import os
+import shutil
+from os.path import dirname, abspath, join, basename, isfile
 
 import phi
 from phi import math
 from phi import field
-from phi.field import Scene, CenteredGrid, StaggeredGrid
+from phi.field import Scene, CenteredGrid, StaggeredGrid, Noise
+from phi.field._scene import get_frames
 from phiml.math import batch, extrapolation, wrap, stack, vec
 
 DIR = join(dirname(dirname(dirname(dirname(abspath(__file__))))), 'test_data')
@@ -161,3 +166,206 @@ class TestScene(TestCase):
         velocity = field.read(join(path, 'velo_001000.npz'))
         self.assertTrue(velocity.is_grid)
         self.assertTrue(velocity.is_staggered)
+
+    def test_async_writer(self):
+        smoke = CenteredGrid(1, extrapolation.BOUNDARY, x=32, y=32)
+        vel = StaggeredGrid(2, 0, x=32, y=32)
+        scene = Scene.create(DIR)
+        with scene.async_writer(max_pending=2, workers=2, compress={'vel': False}) as writer:
+            for frame in range(4):
+                writer.write(smoke=smoke * frame, vel=vel, frame=frame)
+        self.assertEqual((0, 1, 2, 3), scene.complete_frames)
+        field.assert_close(smoke * 3, scene.read('smoke', frame=3))
+        field.assert_close(vel, scene.read('vel', frame=2))
+        scene.remove()
+
+    def test_write_read_chunked(self):
+        smoke = CenteredGrid(1, extrapolation.BOUNDARY, x=32, y=32) * math.random_uniform(batch(count=2))
+        vel = StaggeredGrid(2, 0, x=32, y=32)
+        scene = Scene.create(DIR, count=2)
+        for frame in range(5):
+            scene.write(smoke=smoke * frame, frame=frame, chunked=2)
+            scene.write(vel=vel * frame, frame=frame)
+        scene.convert_to_chunked('vel', chunk_size=3)
+        self.assertEqual(('smoke', 'vel'), scene[{'count': 0}].fieldnames)
+        self.assertEqual((0, 1, 2, 3, 4), scene[{'count': 1}].complete_frames)
+        field.assert_close(smoke * 3, scene.read('smoke', frame=3))
+        field.assert_close(vel * 4, scene.read('vel', frame=4))
+        scene.remove()
+
+    def test_read_lazy(self):
+        smoke = CenteredGrid(1, extrapolation.BOUNDARY, x=32, y=32) * math.random_uniform(batch(count=2))
+        vel = StaggeredGrid(2, 0, x=32, y=32)
+        scene = Scene.create(DIR)
+        scene.write(smoke=smoke, compress=False)
+        scene.write(vel=vel, chunked=True)
+        smoke_ = scene.read_field('smoke', 0, lazy=True)
+        self.assertIsInstance(smoke_.values._native, np.memmap)
+        field.assert_close(smoke, smoke_)
+        field.assert_close(smoke[{'x': slice(4, 8)}], smoke_[{'x': slice(4, 8)}])
+        field.assert_close(vel, scene.read_field('vel', 0, lazy=True))
+        scene.remove()
+
+    def test_dataset(self):
+        scene = Scene.create(DIR, count=3)
+        for frame in range(4):
+            scene.write(smoke=CenteredGrid(frame, 0, x=4, y=4) * math.range(batch(count=3)), vel=StaggeredGrid(frame, 0, x=4, y=4), frame=frame)
+        batches = list(scene.dataset('smoke', batch=5, shuffle=True, seed=0, workers=2))
+        self.assertEqual([5, 5, 2], [b.shape.get_size('batch') for b in batches])
+        batches = list(scene.dataset(('smoke', 'vel'), frames=(1, 3), batch=batch(b=3)))
+        self.assertEqual(2, len(batches))
+        smoke, vel = batches[0]
+        math.assert_close([0, 0, 1], math.mean(smoke.values, math.non_batch))
+        math.assert_close([1, 3, 1], math.mean(vel.values, math.non_batch))
+        scene.remove()
+
+    def test_dataset_frames_of_requested_fields(self):
+        scene = Scene.create(DIR)
+        scene.write(obstacle=CenteredGrid(0, 0, x=4, y=4), frame=0)  # written once
+        for frame in range(3):
+            scene.write(smoke=CenteredGrid(frame, 0, x=4, y=4), frame=frame)
+        self.assertEqual((0,), scene.complete_frames)
+        batches = list(scene.dataset('smoke', batch=1))
+        self.assertEqual([0, 1, 2], [float(b.values.mean) for b in batches])
+        self.assertEqual(1, len(list(scene.dataset(('smoke', 'obstacle'), batch=1))))
+        scene.remove()
+
+    def test_frame_index(self):
+        scene = Scene.create(DIR)
+        for frame in range(3):
+            scene.write(smoke=CenteredGrid(frame, 0, x=4, y=4), frame=frame)
+        scene.write(vel=StaggeredGrid(0, 0, x=4, y=4), frame=1)
+        with open(join(scene.path, 'frame_index.jsonl')) as index_file:
+            self.assertEqual(2 + 3, len(index_file.readlines()))  # snapshot, rebuild entry, one entry per later write
+        self.assertEqual((1,), scene.complete_frames)
+        self.assertEqual((0, 1, 2), scene.frames)
+        os.remove(join(scene.path, 'smoke_000001.npz'))  # external change
+        self.assertEqual((), scene.complete_frames)
+        self.assertEqual((0, 2), get_frames(scene.path, 'smoke'))
+        field.write(CenteredGrid(0, 0, x=4, y=4), join(scene.path, 'smoke_000003.npz'))  # e.g. written by another process
+        scene.write(vel=StaggeredGrid(0, 0, x=4, y=4), frame=3)
+        self.assertEqual((0, 2, 3), get_frames(scene.path, 'smoke'))
+        self.assertEqual((1, 3), get_frames(scene.path, 'vel'))
+        scene.remove()
+
+    def test_frame_index_read_only_and_compaction(self):
+        from phi.field import _scene
+        scene = Scene.create(DIR)
+        scene.write(smoke=CenteredGrid(0, 0, x=4, y=4), frame=0)
+        index_path = join(scene.path, 'frame_index.jsonl')
+        os.remove(join(scene.path, 'smoke_000000.npz'))  # external change
+        with open(index_path) as index_file:
+            before = index_file.read()
+        self.assertEqual((), get_frames(scene.path, 'smoke'))
+        with open(index_path) as index_file:
+            self.assertEqual(before, index_file.read())  # readers do not rebuild the index
+        with mock.patch.object(_scene, '_FRAME_INDEX_COMPACT', 4):
+            for frame in range(10):
+                scene.write(smoke=CenteredGrid(frame, 0, x=4, y=4), frame=frame)
+        with open(index_path) as index_file:
+            self.assertLess(len(index_file.readlines()), 2 + 4)
+        self.assertEqual(tuple(range(10)), get_frames(scene.path, 'smoke'))
+        scene.remove()
+
+    def test_foreign_npz_file(self):
+        scene = Scene.create(DIR)
+        scene.write(smoke=CenteredGrid(0, 0, x=4, y=4), frame=0)
+        np.savez(join(scene.path, 'stats.npz'), mean=np.zeros(3))  # not a field
+        scene.write(smoke=CenteredGrid(1, 0, x=4, y=4), frame=1)
+        self.assertEqual(('smoke',), scene.fieldnames)
+        self.assertEqual((0, 1), scene.frames)
+        os.remove(join(scene.path, 'smoke_000001.npz'))  # external change, the directory is listed
+        self.assertEqual(('smoke',), scene.fieldnames)
+        self.assertEqual((0,), get_frames(scene.path, 'smoke'))
+        scene.remove()
+
+    def test_write_read_codecs(self):
+        smoke = CenteredGrid(Noise(scale=20), extrapolation.BOUNDARY, x=32, y=32)
+        vel = StaggeredGrid(Noise(scale=20), 0, x=32, y=32)
+        scene = Scene.create(DIR)
+        for codec, tolerance in [('float16', 1e-2), ('bfloat16', 5e-2), (field.Quantize(1e-3), 1e-3), (field.BlockTransform(1e-3), 1e-3)]:
+            scene.write(smoke=smoke, vel=vel, codec={'smoke': codec})
+            math.assert_close(smoke.values, scene.read('smoke').values, abs_tolerance=tolerance)
+            self.assertEqual(0, math.max(abs(vel.values - scene.read('vel').values)))
+            scene.write(vel=vel, codec=codec)
+            math.assert_close(vel.values, scene.read('vel').values, abs_tolerance=tolerance)
+        scene.remove()
+
+    def test_convert_codec_to_chunked(self):
+        smoke = CenteredGrid(Noise(scale=20), extrapolation.BOUNDARY, x=32, y=32)
+        scene = Scene.create(DIR)
+        for frame in range(3):
+            scene.write(smoke=smoke * frame, frame=frame, codec=field.Quantize(1e-3))
+        scene.convert_to_chunked('smoke')
+        self.assertEqual(('smoke',), scene.fieldnames)
+        self.assertFalse(isfile(join(scene.path, 'smoke_000002.npz')))
+        math.assert_close((smoke * 2).values, scene.read('smoke', frame=2).values, abs_tolerance=1e-3)
+        scene.remove()
+
+    def test_codec_non_finite(self):
+        data = np.array([0., 1., np.nan, 2.])
+        for codec in [field.Quantize(1e-3), field.BlockTransform(1e-3)]:
+            with self.assertRaises(ValueError):
+                codec.encode(data, [0])
+        self.assertTrue(np.isnan(field.Float16().encode(data, [0])['codec_data'][2]))
+
+    def test_checkpoint_restore(self):
+        scene = Scene.create(DIR)
+        smoke = CenteredGrid(Noise(), 0, x=32, y=32)
+        vel = StaggeredGrid(Noise(), 0, x=32, y=32)
+        states = {}
+        with scene.checkpointer(keyframe_interval=3, chunk_bytes=256, keep_recent=1, keep_old_keyframes=1) as checkpointer:
+            for frame in range(8):
+                smoke = smoke.with_values(smoke.values + (frame % 2))
+                states[frame] = (smoke, {'vel': vel})
+                checkpointer.save(states[frame], frame)
+        self.assertEqual((0, 6, 7), scene.checkpoints)
+        for frame in (0, 6, 7):
+            restored_smoke, restored_vel = scene.restore(frame)
+            math.assert_close(states[frame][0].values, restored_smoke.values)
+            math.assert_close(vel.values, restored_vel['vel'].values)
+        self.assertEqual(restored_smoke.geometry, smoke.geometry)
+        scene.remove()
+
+    def test_create_concurrent_ids(self):
+        from concurrent.futures import ThreadPoolExecutor
+        parent = join(DIR, 'concurrent')
+        with ThreadPoolExecutor(8) as pool:
+            scenes = list(pool.map(lambda _: Scene.create(parent, copy_calling_script=False), range(16)))
+        self.assertEqual(16, len({s.path for s in scenes}))
+        self.assertEqual(16, len(Scene.list(parent)))
+        shutil.rmtree(parent)
+
+    def test_reuse_ids_of_removed_scenes(self):
+        parent = join(DIR, 'reuse_ids')
+        scene = Scene.create(parent, copy_calling_script=False)
+        path = scene.path
+        scene.remove()
+        self.assertEqual(path, Scene.create(parent, copy_calling_script=False).path)
+        self.assertEqual([basename(path)], os.listdir(parent))  # no hidden files
+        shutil.rmtree(parent)
+
+    def test_no_cache_in_shared_directory(self):
+        parent = join(DIR, 'shared')
+        os.makedirs(parent, exist_ok=True)
+        os.chmod(parent, 0o1777)  # sticky bit, like /tmp
+        scene = Scene.create(parent, copy_calling_script=False)
+        self.assertEqual(1, len(Scene.list(parent, cache=True)))
+        self.assertEqual([basename(scene.path)], os.listdir(parent))
+        shutil.rmtree(parent)
+
+    def test_list_where(self):
+        parent = join(DIR, 'list_where')
+        scenes = Scene.create(parent, batch(scenes=3), copy_calling_script=False)
+        for i in range(3):
+            scenes.scenes[i].put_properties(resolution=16 * (i + 1), solver='CG' if i < 2 else 'direct')
+        self.assertEqual(2, len(Scene.list(parent, where={'solver': 'CG'})))
+        self.assertEqual(1, len(Scene.list(parent, where=lambda p: p['resolution'] > 40)))
+        scenes.scenes[0].put_properties(solver='direct')
+        self.assertEqual(2, len(Scene.list(parent, where={'solver': 'direct'})))
+        self.assertEqual(0, len(Scene.list(parent, where={'missing': 1})))
+        self.assertFalse(isfile(join(parent, '.scene_index.json')))
+        for _ in range(2):  # writes and then reads the cache
+            self.assertEqual(2, len(Scene.list(parent, where={'solver': 'direct'}, cache=True)))
+        self.assertTrue(isfile(join(parent, '.scene_index.json')))
+        shutil.rmtree(parent)
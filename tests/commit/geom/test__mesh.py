@@ -2,7 +2,7 @@ from unittest import TestCase
 
 from phi import math
 from phi.geom import Box, build_mesh, Sphere, mesh_from_numpy
-from phiml.math import spatial, vec
+from phiml.math import spatial, vec, dual
 
 
 class TestGrid(TestCase):
@@ -34,3 +34,28 @@ class TestGrid(TestCase):
         math.assert_close(-.1, mesh.approximate_signed_distance(vec(x=.1, y=.5)))
         math.assert_close(-.1, mesh.approximate_signed_distance(vec(x=.5, y=.1)))
         math.assert_close(.1, mesh.approximate_signed_distance(vec(x=.5, y=-.1)))
+
+    def test_build_faces_3d(self):
+        points = [(x, y, z) for x in range(4) for y in range(2) for z in range(2)]
+        idx = lambda x, y, z: x * 4 + y * 2 + z
+        hexes = [[idx(i, 0, 0), idx(i+1, 0, 0), idx(i+1, 1, 0), idx(i, 1, 0), idx(i, 0, 1), idx(i+1, 0, 1), idx(i+1, 1, 1), idx(i, 1, 1)] for i in range(3)]
+        x_lo = [idx(0, 0, 0), idx(0, 1, 0), idx(0, 1, 1), idx(0, 0, 1)]
+        mesh = mesh_from_numpy(points, hexes, {'x-': [x_lo], 'walls': None}, element_rank=3)
+        math.assert_close(1, mesh.volume)
+        math.assert_close([1, 2, 1], math.sum(mesh.cell_connectivity, dual))
+        self.assertEqual(slice(3, 4), mesh.boundary_faces['x-']['~cells'])
+        self.assertEqual(slice(4, 17), mesh.boundary_faces['walls']['~cells'])
+        # --- periodic ---
+        bnd = {'x-': [x_lo], 'x+': [[idx(3, 0, 0), idx(3, 1, 0), idx(3, 1, 1), idx(3, 0, 1)]], 'walls': None}
+        mesh = mesh_from_numpy(points, hexes, bnd, element_rank=3, periodic='x')
+        math.assert_close(2, math.sum(mesh.cell_connectivity, dual))
+
+    def test_build_faces_3d_many_vertices(self):
+        n = 8200  # hexes along x, 4 * (n + 1) > 2 ** 15 vertices
+        points = [(x, y, z) for x in range(n + 1) for y in range(2) for z in range(2)]
+        idx = lambda x, y, z: x * 4 + y * 2 + z
+        hexes = [[idx(i, 0, 0), idx(i+1, 0, 0), idx(i+1, 1, 0), idx(i, 1, 0), idx(i, 0, 1), idx(i+1, 0, 1), idx(i+1, 1, 1), idx(i, 1, 1)] for i in range(n)]
+        mesh = mesh_from_numpy(points, hexes, {'walls': None}, element_rank=3)
+        self.assertGreater(len(points), 2 ** 15)
+        math.assert_close(2 * (n - 1), math.sum(mesh.cell_connectivity))
+        self.assertEqual(slice(n, n + 4 * n + 2), mesh.boundary_faces['walls']['~cells'])
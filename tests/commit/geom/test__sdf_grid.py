@@ -1,6 +1,6 @@
 from unittest import TestCase
 
-from phi.geom import Box, Sphere, sample_sdf, SDFGrid
+from phi.geom import Box, Sphere, sample_sdf, SDFGrid, BlockSDFGrid
 from phiml import math
 from phiml.math import channel, vec
 
@@ -51,3 +51,27 @@ class TestSDFGrid(TestCase):
         bounds = Box(x=3, y=2)
         sdf = sample_sdf(spheres, bounds, x=64, y=64, rebuild='from-surface')
 
+
+    def test_sdf_fast_sweep(self):
+        sphere = Sphere(x=1, y=1, radius=.8)
+        sdf = sample_sdf(sphere, Box(x=3, y=3), x=100, y=100, rebuild='fast-sweep')
+        math.assert_close(sphere.approximate_signed_distance(sdf.points), sdf.values, abs_tolerance=.03)
+        sphere = Sphere(x=1, y=1, z=1, radius=.6)
+        sdf = sample_sdf(sphere, Box(x=2, y=2, z=(0, 1.5)), x=32, y=32, z=24, rebuild='fast-sweep')
+        math.assert_close(sphere.approximate_signed_distance(sdf.points), sdf.values, abs_tolerance=.05)
+
+    def test_sdf_fast_sweep_far_geometry(self):
+        sphere = Sphere(x=10, y=8, radius=.5)  # no cell is close to the surface
+        sdf = sample_sdf(sphere, Box(x=2, y=1.5), x=64, y=48, rebuild='fast-sweep')
+        math.assert_close(sphere.approximate_signed_distance(sdf.points), sdf.values, abs_tolerance=.02)
+
+    def test_block_sdf(self):
+        sphere = Sphere(x=1, y=1, z=1, radius=.6)
+        sdf = sample_sdf(sphere, Box(x=2, y=2, z=2), x=64, y=64, z=64, block_size=8)
+        self.assertIsInstance(sdf, BlockSDFGrid)
+        self.assertLess(sdf.block_count, 8 ** 3 / 2)
+        points = sphere.center + vec(x=[.58, -.61, 0], y=0, z=[0, 0, .62])
+        math.assert_close(sphere.approximate_signed_distance(points), sdf.approximate_signed_distance(points), abs_tolerance=1e-3)
+        math.assert_close(sphere.lies_inside(points), sdf.lies_inside(points))
+        _, _, normal, _, _ = sdf.approximate_closest_surface(points)
+        math.assert_close(sphere.approximate_closest_surface(points)[2], normal, abs_tolerance=.05)
@@ -64,4 +64,16 @@ class TestGeom(TestCase):
         math.assert_close(1, u.volume)
         math.assert_close(False, u.lies_inside(vec(x=0.5, y=-0.5)))
         math.assert_close(True, u.lies_inside(vec(x=0.5, y=0.5)))
-        math.assert_close(False, u.lies_inside(vec(x=0.9, y=0.9)))
\ No newline at end of file
+        math.assert_close(False, u.lies_inside(vec(x=0.9, y=0.9)))
+
+    def test_union_culling(self):
+        geometries = [Box(x=(i, i + .5), y=(i % 3, i % 3 + 1)) if i % 2 else Sphere(x=i, y=i % 3, radius=.4) for i in range(20)]
+        u = geom.union(*geometries)
+        points = geom.UniformGrid(x=40, y=10, bounds=Box(x=(-1, 21), y=(-1, 4))).center
+        inside = math.any(stack([g.lies_inside(points) for g in geometries], instance('g')), 'g')
+        sdf = math.min(stack([g.approximate_signed_distance(points) for g in geometries], instance('g')), 'g')
+        math.assert_close(inside, u.lies_inside(points))
+        math.assert_close(sdf, u.approximate_signed_distance(points))
+        i = geom.intersection(*[Box(x=(i * .1, 5), y=(0, 5)) if i % 2 else Sphere(x=2.5, y=2.5, radius=3 - i * .1) for i in range(10)])
+        inside = math.all(stack([g.lies_inside(points) for g in i.geometries], instance('g')), 'g')
+        math.assert_close(inside, i.lies_inside(points))
\ No newline at end of file
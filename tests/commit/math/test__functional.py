@@ -0,0 +1,291 @@
+import dataclasses
+import gc
+import os
+import shutil
+import tempfile
+import weakref
+from unittest import TestCase, mock
+
+from phiml import math
+from phiml.backend import _buffer
+from phiml.backend._numpy_backend import NumPyBackend
+from phiml.math import spatial, channel, instance, batch, Tensor
+from phiml.math import _functional
+
+
+@dataclasses.dataclass(frozen=True)
+class State:
+    velocity: Tensor
+    pressure: Tensor
+    name: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Config:
+    factor: float
+
+
+class Particles:
+
+    def __init__(self, position: Tensor, material=None):
+        self.position = position
+        self.material = material
+
+    def __value_attrs__(self):
+        return 'position',
+
+    def __variable_attrs__(self):
+        return 'position',
+
+    def __with_attrs__(self, **attrs):
+        return Particles(attrs.get('position', self.position), self.material)
+
+
+def step(state: State, config: Config):
+    return State(state.velocity * config.factor, state.pressure + math.mean(state.velocity), state.name), math.sum(state.pressure)
+
+
+def eager_jit(self, f, **kwargs):  # compiled functions re-run the traced Python function
+    return f
+
+
+class TestJitFastPath(TestCase):
+
+    def test_fast_path_matches_eager(self):
+        config = Config(1.5)
+        state = State(math.random_normal(spatial(x=8, y=6), channel(vector='x,y')), math.zeros(spatial(x=8, y=6)), 'a')
+        with mock.patch.object(NumPyBackend, 'jit_compile', eager_jit):
+            jit_step = math.jit_compile(step, auxiliary_args='config')
+            jit_state, _ = jit_step(state, config)  # trace
+            self.assertEqual(1, len(jit_step._fast_path))
+            key_from_args = mock.Mock(side_effect=_functional.key_from_args)
+            with mock.patch.object(_functional, 'key_from_args', key_from_args):
+                for _ in range(3):
+                    eager_state, eager_sum = step(jit_state, config)
+                    jit_state, jit_sum = jit_step(jit_state, config)
+                    self.assertIsInstance(jit_state, State)
+                    self.assertEqual('a', jit_state.name)
+                    self.assertEqual(eager_state.velocity.shape, jit_state.velocity.shape)
+                    math.assert_close(eager_state.velocity, jit_state.velocity)
+                    math.assert_close(eager_state.pressure, jit_state.pressure)
+                    math.assert_close(eager_sum, jit_sum)
+            key_from_args.assert_not_called()
+            # --- different shape or aux arg: normal path ---
+            jit_step(State(math.zeros(spatial(x=4, y=6), channel(vector='x,y')), math.zeros(spatial(x=4, y=6)), 'a'), config)
+            jit_step(state, Config(2.))
+            self.assertEqual(3, len(jit_step._fast_path))
+
+    def test_fast_path_weak_references(self):
+        particles = Particles(math.random_uniform(spatial(x=1000)))
+        particles_ref = weakref.ref(particles)
+        with mock.patch.object(NumPyBackend, 'jit_compile', eager_jit):
+            move = math.jit_compile(lambda p: Particles(p.position + 1))
+            moved = move(particles)
+            self.assertEqual(1, len(move._fast_path))
+            del particles, moved
+            gc.collect()
+            self.assertIsNone(particles_ref())
+            particles = Particles(math.zeros(spatial(x=1000)))  # may reuse the id of the collected object
+            math.assert_close(1, move(particles).position)
+            math.assert_close(2, move(move(particles)).position)
+            self.assertEqual(1, len(move._fast_path))
+
+    def test_fast_path_non_variable_attributes(self):
+        with mock.patch.object(NumPyBackend, 'jit_compile', eager_jit):
+            move = math.jit_compile(lambda p: Particles(p.position + p.material, p.material))
+            particles = Particles(math.zeros(spatial(x=10)), 1.)
+            math.assert_close(1, move(particles).position)
+            particles.material = 2.  # modified in-place, the trace of material=1 must not be used
+            math.assert_close(2, move(particles).position)
+            key_from_args = mock.Mock(side_effect=_functional.key_from_args)
+            with mock.patch.object(_functional, 'key_from_args', key_from_args):
+                math.assert_close(2, move(Particles(math.zeros(spatial(x=10)), 2.)).position)  # new object, equal attributes
+            key_from_args.assert_not_called()
+
+
+
+_EXPORTED = []  # stands in for serialized executables
+
+
+def export_compiled(self, f, args):
+    _EXPORTED.append(f)
+    return str(len(_EXPORTED) - 1).encode()
+
+
+def import_compiled(self, data: bytes):
+    return _EXPORTED[int(data)]
+
+
+def scale(x, factor):
+    return x * factor
+
+
+def difference(x):
+    return x[{'x': slice(1, None)}] - x[{'x': slice(None, -1)}]
+
+
+class TestTraceCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        math.set_trace_cache(self.directory)
+
+    def tearDown(self):
+        math.set_trace_cache(None)
+        shutil.rmtree(self.directory)
+
+    def test_cache_key(self):
+        x = math.zeros(spatial(x=4))
+        jit_scale = math.jit_compile(scale, auxiliary_args='factor')
+
+        def file(x, factor=2., f=scale):
+            key = _functional.key_from_args((x,), {'factor': factor}, jit_scale.f_params, aux=jit_scale.auxiliary_args, for_jit=True)[0]
+            return _functional._trace_cache_file(f, key, 'jit', [x.dtype])
+        self.assertTrue(file(x).startswith(self.directory))
+        self.assertEqual(file(x), file(math.ones(spatial(x=4))))  # values are not part of the key
+        self.assertNotEqual(file(x), file(math.zeros(spatial(x=5))))
+        self.assertNotEqual(file(x), file(math.zeros(spatial(y=4))))
+        self.assertNotEqual(file(x), file(math.zeros(spatial(x=4), dtype=int)))
+        self.assertNotEqual(file(x), file(x, factor=3.))
+        self.assertNotEqual(file(x), file(x, f=difference))
+        self.assertNotEqual(file(x), file(x, f=math.jit_compile(lambda x, factor: x * factor)))  # different source
+        namespace = {}
+        exec("def scale(x, factor):\n    return x * factor", namespace)
+        self.assertIsNone(file(x, f=namespace['scale']))  # source not available
+
+    def test_jit_persistent(self):
+        x = math.random_normal(spatial(x=4))
+        with mock.patch.multiple(NumPyBackend, jit_compile=eager_jit, export_compiled=export_compiled, import_compiled=import_compiled):
+            math.assert_close(x * 2, math.jit_compile(scale, auxiliary_args='factor')(x, 2.))
+            self.assertEqual(1, len(os.listdir(self.directory)))
+            traced = []
+            with mock.patch.object(NumPyBackend, 'jit_compile', lambda self, f, **kwargs: traced.append(f) or f):
+                math.assert_close(x * 2, math.jit_compile(scale, auxiliary_args='factor')(x, 2.))  # new function object, e.g. in another process
+                self.assertEqual(0, len(traced))
+                math.assert_close(x * 3, math.jit_compile(scale, auxiliary_args='factor')(x, 3.))
+                self.assertEqual(1, len(traced))
+            self.assertEqual(2, len(os.listdir(self.directory)))
+
+    def test_linear_persistent(self):
+        x = math.random_normal(spatial(x=5))
+        math.assert_close(difference(x), math.jit_compile_linear(difference)(x))
+        self.assertEqual(1, len(os.listdir(self.directory)))
+        trace_linear = mock.Mock(side_effect=_functional.trace_linear)
+        with mock.patch.object(_functional, 'trace_linear', trace_linear):
+            math.assert_close(difference(x), math.jit_compile_linear(difference)(x))
+            trace_linear.assert_not_called()
+            for f in os.listdir(self.directory):  # corrupt entries are ignored
+                with open(os.path.join(self.directory, f), 'wb') as stream:
+                    stream.write(b'corrupt')
+            math.assert_close(difference(x), math.jit_compile_linear(difference)(x))
+            trace_linear.assert_called_once()
+        math.set_trace_cache(None)
+        shutil.rmtree(self.directory)
+        math.jit_compile_linear(difference)(x)
+        self.assertFalse(os.path.exists(self.directory))
+        os.makedirs(self.directory)
+
+
+class Traced:  # makes register_buffer() treat sizes as placeholders, like while tracing with Jax
+    name = 'jax'
+
+    @staticmethod
+    def is_available(x):
+        return False
+
+
+def compile_once(self, f, **kwargs):
+    """ Compiled functions evaluate `f` again but, like real compiled functions, do not record new output signatures after the first call. """
+    closure = {name: cell.cell_contents for name, cell in zip(f.__code__.co_freevars, f.__closure__)}
+    calls = []
+
+    def compiled(*natives):
+        result = f(*natives)
+        if calls:
+            closure['self'].recorded_mappings[closure['in_key']].pop(-1)
+        calls.append(f)
+        return result
+    return compiled
+
+
+def neighbor_buffer(x, required):
+    size = _buffer.register_buffer('neighbors', required.native(), 16)
+    return x + math.zeros(instance(neighbors=size)), math.tensor(size)
+
+
+class TestBufferManager(TestCase):
+
+    def test_policy(self):
+        manager = math.BufferManager(window=4, quantile=1., margin=.25, multiple=8, max_waste=.5, min_samples=2)
+        self.assertEqual({'a': 9}, manager.expected_requirement({'a': [1, 9, 2, 3, 4]}))
+        self.assertEqual({'a': 4}, manager.expected_requirement({'a': [9, 1, 2, 3, 4]}))  # outside window
+        self.assertEqual(16, manager.with_margin(10))
+        self.assertEqual(None, manager([{'a': 8}], {'a': [9]})[0])  # too small
+        self.assertEqual({'a': 16}, manager([{'a': 8}], {'a': [9]})[1])
+        self.assertEqual((1, {'a': 16}), manager([{'a': 32}, {'a': 16}], {'a': [9, 9]}))  # smallest fitting trace
+        self.assertEqual((None, {'a': 8}), manager([{'a': 64}], {'a': [5, 5]}))  # too much memory wasted
+        self.assertEqual((0, {'a': 64}), manager([{'a': 64}], {'a': [5]}))  # too few samples to re-trace
+
+    def test_max_traces_and_statistics(self):
+        with mock.patch.object(NumPyBackend, 'jit_compile', compile_once), mock.patch.object(_buffer, 'choose_backend', lambda *values: Traced):
+            jit_f = math.jit_compile(neighbor_buffer)
+            jit_f.set_buffer_manager(math.BufferManager(window=4, quantile=1., margin=0, multiple=8, max_waste=.5, min_samples=2, max_traces=2))
+            sizes = []
+            for required in [10, 10, 40, 40, 100, 5, 5, 5, 5, 5, 5]:
+                result, size = jit_f(math.tensor(1.), math.tensor(required))
+                self.assertEqual(instance(neighbors=int(size)), result.shape)
+                self.assertLessEqual(required, int(size))
+                self.assertLessEqual(len(jit_f.traces[next(iter(jit_f.traces))]), 2)
+                sizes.append(int(size))
+        self.assertEqual([16, 16, 40, 40, 104, 104, 40, 40, 40, 8, 8], sizes)
+        stats, = jit_f.buffer_statistics
+        self.assertEqual([{'neighbors0': 40}, {'neighbors0': 8}], stats['configs'])
+        self.assertEqual(11 + 2, stats['evaluations'])
+        self.assertEqual(2, stats['overflows'])
+        self.assertEqual(4, stats['traces'])
+        self.assertEqual(2, stats['dropped'])
+        self.assertEqual({'last': 5, 'max': 100, 'expected': 5}, {k: stats['required']['neighbors0'][k] for k in ('last', 'max', 'expected')})
+
+    def test_forget_traces_with_buffers(self):
+        with mock.patch.object(NumPyBackend, 'jit_compile', compile_once), mock.patch.object(_buffer, 'choose_backend', lambda *values: Traced):
+            jit_f = math.jit_compile(neighbor_buffer, forget_traces=True)
+            jit_f.set_buffer_manager(math.BufferManager(window=4, quantile=1., margin=0, multiple=8, max_waste=.5, min_samples=2, max_traces=2))
+            for i, required in enumerate([10, 40, 100, 5, 200, 5, 300, 5, 10, 40]):
+                x = math.zeros(spatial(x=1 + i % 2))  # alternating shapes discard all traces of the other shape
+                result, size = jit_f(x, math.tensor(required))
+                self.assertLessEqual(required, int(size))
+                key, = jit_f.traces
+                self.assertEqual(len(jit_f.traces[key]), len(jit_f._trace_last_used[key]))
+            self.assertEqual(1, len(jit_f.buffer_statistics[-1]['configs']))
+
+    def test_donate_args_with_buffers(self):
+        with mock.patch.object(NumPyBackend, 'jit_compile', compile_once), mock.patch.object(_buffer, 'choose_backend', lambda *values: Traced):
+            jit_f = math.jit_compile(neighbor_buffer, donate_args='x')
+            for _ in range(2):
+                with self.assertRaises(NotImplementedError):
+                    jit_f(math.zeros(spatial(x=4)), math.tensor(10))
+            self.assertEqual({}, _buffer.get_buffer_config())
+
+
+def normalize(x, offset, scale=1.):
+    return (x - math.mean(x) + offset) * scale, math.max(x)
+
+
+class TestParallelMap(TestCase):
+
+    def test_parallel_matches_sequential(self):
+        x = math.random_normal(batch(b=5), spatial(x=6), channel(c=3))
+        offset = math.range(channel(c=3))
+        expected = math.map(normalize, x, offset, dims='b,c', scale=2.)
+        for parallel in ['threads', 'processes', 'vectorize']:
+            for chunk_size in [None, 4]:
+                values, maxima = math.map(normalize, x, offset, dims='b,c', scale=2., parallel=parallel, workers=2, chunk_size=chunk_size)
+                self.assertEqual(expected[0].shape, values.shape, msg=parallel)
+                math.assert_close(expected[0], values, msg=parallel)
+                math.assert_close(expected[1], maxima, msg=parallel)
+
+    def test_processes_not_picklable(self):
+        x = math.random_normal(batch(b=3))
+        with self.assertRaises(ValueError):
+            math.map(lambda v: v * 2, x, parallel='processes', workers=2)
+        math.assert_close(x * 2, math.map(lambda v: v * 2, x, parallel='threads', workers=2))
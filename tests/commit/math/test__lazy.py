@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from phiml import math
+from phiml.math import spatial, channel, batch
+from phiml.math import _lazy
+from phiml.math._lazy import LazyTensor
+
+
+def expression(a, b, c):
+    return math.sqrt(abs(a * b - c / 3 + 1)) + math.sin(a) ** 2 - (a > b) * math.exp(-c) + (b % 1.5) / (1 + c ** 2)
+
+
+class TestLazy(TestCase):
+
+    def test_fuse_matches_eager(self):
+        a = math.random_normal(batch(b=2), spatial(x=17, y=9))
+        b = math.random_uniform(spatial(y=9, x=17), channel(vector='x,y'))  # different dimension order, broadcast
+        c = math.range(spatial(x=17))  # int
+        eager = expression(a, b, c)
+        with math.fuse():
+            fused = expression(a, b, c)
+            self.assertIsInstance(fused, LazyTensor)
+        self.assertEqual(eager.shape, fused.shape)
+        self.assertEqual(eager.dtype, fused.dtype)
+        math.assert_close(eager, fused, rel_tolerance=1e-5, abs_tolerance=1e-6)
+
+    def test_fuse_comparisons_and_int(self):
+        a = math.range(spatial(x=10))
+        with math.fuse():
+            fused = (a * 3 + 1, a // 3, (a > 4) & (a < 8), math.to_float(a) / 2)
+        eager = (a * 3 + 1, a // 3, (a > 4) & (a < 8), math.to_float(a) / 2)
+        for e, f in zip(eager, fused):
+            self.assertEqual(e.dtype, f.dtype)
+            math.assert_close(e, f)
+
+    def test_fuse_blocked(self):
+        a = math.random_normal(spatial(x=300, y=257))
+        b = math.random_normal(spatial(y=257))
+        c = math.random_normal(batch(b=1), spatial(x=300))
+        self.assertGreater(a.shape.volume, _lazy._BLOCK_SIZE)
+        run = mock.Mock(side_effect=_lazy._Program.run)
+        with mock.patch.object(_lazy._Program, 'run', lambda self, natives, out=None: run(self, natives, out=out)):
+            with math.fuse():
+                fused = expression(a, b, c)
+            fused.native(fused.shape)  # evaluate
+        self.assertGreater(run.call_count, 1)
+        self.assertTrue(all(call.kwargs['out'] is not None for call in run.call_args_list))
+        math.assert_close(expression(a, b, c), fused, rel_tolerance=1e-5, abs_tolerance=1e-6)
+
+    def test_fuse_long_expression(self):
+        a = math.random_uniform(spatial(x=8))
+        eager = fused = a
+        for i in range(2 * _lazy._MAX_OPS + 3):
+            eager = eager * 0.99 + 0.01
+        with math.fuse():
+            for i in range(2 * _lazy._MAX_OPS + 3):
+                fused = fused * 0.99 + 0.01
+        math.assert_close(eager, fused)
+
+    def test_nested_fuse_disabled(self):
+        a = math.random_normal(spatial(x=5))
+        with math.fuse():
+            lazy = a * 2
+            with math.fuse(False):
+                eager = a * 2 + lazy
+                self.assertNotIsInstance(eager, LazyTensor)
+            self.assertIsInstance(lazy + 1, LazyTensor)
+        self.assertNotIsInstance(a * 2, LazyTensor)
+        math.assert_close(a * 4, eager)
+        math.assert_close(a * 2, lazy)
+
+    def test_fuse_thread_local(self):
+        a = math.random_normal(spatial(x=5))
+        with math.fuse():
+            with ThreadPoolExecutor(1) as pool:
+                other_thread = pool.submit(lambda: a * 2).result()
+            self.assertIsInstance(a * 2, LazyTensor)
+        self.assertNotIsInstance(other_thread, LazyTensor)
+
+    def test_materialize(self):
+        a = math.random_normal(spatial(x=5))
+        with math.fuse():
+            lazy = (a * 2, {'b': a + 1})
+        _lazy.materialize(lazy)
+        self.assertIsNone(lazy[0]._leaves)
+        self.assertIsNone(lazy[1]['b']._leaves)
+        math.assert_close(a * 2, lazy[0])
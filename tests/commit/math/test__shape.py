@@ -0,0 +1,68 @@
+import copyreg
+import pickle
+from unittest import TestCase
+
+from phiml import math
+from phiml.math import spatial, channel, batch, instance, merge_shapes, IncompatibleShapes
+from phiml.math._shape import Shape
+
+
+class OldShape:  # pickles like a Shape from before Shape used __slots__, i.e. with a __dict__ state
+
+    def __init__(self, shape: Shape):
+        self.state = {'sizes': shape.sizes, 'names': shape.names, 'types': shape.types, 'item_names': shape.item_names}
+
+    def __reduce__(self):
+        return copyreg._reconstructor, (Shape, object, None), self.state
+
+
+class TestShape(TestCase):
+
+    def test_pickle(self):
+        s = batch(b=2) & spatial(x=4, y=3) & channel(vector='x,y')
+        s.non_batch, s.index('y')  # fill the cache
+        loaded = pickle.loads(pickle.dumps(s))
+        self.assertEqual(s, loaded)
+        self.assertEqual(s.item_names, loaded.item_names)
+        self.assertIsNone(loaded._cache)
+        self.assertEqual(spatial(x=4, y=3) & channel(vector='x,y'), loaded.non_batch)
+        self.assertEqual(('x', 'y'), loaded['vector'].item_names[0])
+
+    def test_unpickle_dict_state(self):
+        s = spatial(x=4) & channel(vector='x,y')
+        loaded = pickle.loads(pickle.dumps(OldShape(s)))
+        self.assertIsInstance(loaded, Shape)
+        self.assertEqual(s, loaded)
+        self.assertEqual(s.item_names, loaded.item_names)
+        self.assertEqual(channel(vector='x,y'), loaded.channel)
+        self.assertEqual(1, loaded.index('vector'))
+
+    def test_merge_cache_item_names(self):
+        unnamed = channel(vector=2)
+        for names in ['x,y', 'a,b', 'x,y']:
+            merged = merge_shapes(instance(points=3), unnamed, channel(vector=names))
+            self.assertEqual(tuple(names.split(',')), merged.get_item_names('vector'))
+            self.assertEqual(merged, merge_shapes(instance(points=3), unnamed, channel(vector=names)))
+        self.assertIsNone(merge_shapes(instance(points=3), unnamed).get_item_names('vector'))
+        self.assertEqual(('x', 'y'), merge_shapes(channel(vector='x,y'), unnamed).get_item_names('vector'))
+        merge_shapes(channel(vector='x,y'), channel(vector='x,y'))
+        with self.assertRaises(IncompatibleShapes):
+            merge_shapes(channel(vector='x,y'), channel(vector='y,x'))
+        with self.assertRaises(IncompatibleShapes):
+            merge_shapes(channel(vector='x,y'), channel(vector='a,b'))
+
+    def test_merge_cache_varying_sizes(self):
+        self.assertEqual(spatial(x=4), merge_shapes(spatial(x=4), spatial(x=4), allow_varying_sizes=True))
+        self.assertIsNone(merge_shapes(spatial(x=4), spatial(x=5), allow_varying_sizes=True).get_size('x'))
+        with self.assertRaises(IncompatibleShapes):
+            merge_shapes(spatial(x=4), spatial(x=5))
+        non_uniform = math.stack([math.zeros(spatial(x=2)), math.zeros(spatial(x=3))], batch('b')).shape
+        self.assertEqual(non_uniform, merge_shapes(non_uniform, batch(b=2)))
+
+    def test_cache_without_reference_cycle(self):
+        s = spatial(x=4, y=3)
+        self.assertIs(s, s.spatial)
+        self.assertIs(s, s.without('vector'))
+        self.assertIs(s, s.only('x,y'))
+        self.assertIs(s, s.spatial)  # cached
+        self.assertFalse(any(v is s for v in s._cache.values()))
@@ -0,0 +1,77 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from phiml import math
+from phiml.math import spatial, channel, batch, instance, dual
+
+
+class TestSaveLoad(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.tree = {
+            'velocity': math.random_normal(spatial(x=5, y=4), channel(vector='x,y')),
+            'points': math.stack([math.zeros(instance(points=3)), math.ones(instance(points=2))], batch('b')),  # non-uniform
+            'scalars': (math.tensor(2.5), 'label', None, [1, 2]),
+            'empty': math.zeros(instance(points=0)),
+        }
+
+    def tearDown(self):
+        for f in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, f))
+        os.rmdir(self.directory)
+
+    def assert_tree_equal(self, expected: dict, loaded: dict):
+        self.assertEqual(set(expected), set(loaded))
+        math.assert_close(expected['velocity'], loaded['velocity'])
+        self.assertEqual(expected['velocity'].shape, loaded['velocity'].shape)
+        self.assertEqual(expected['points'].shape, loaded['points'].shape)
+        math.assert_close(expected['points'], loaded['points'])
+        math.assert_close(2.5, loaded['scalars'][0])
+        self.assertEqual(('label', None, [1, 2]), loaded['scalars'][1:])
+        self.assertEqual(expected['empty'].shape, loaded['empty'].shape)
+
+    def test_save_load_npz(self):
+        file = os.path.join(self.directory, 'tree.npz')
+        math.save(file, self.tree)
+        self.assert_tree_equal(self.tree, math.load(file))
+
+    def test_save_load_raw(self):
+        file = os.path.join(self.directory, 'tree.raw')
+        math.save(file, self.tree, format='raw')
+        loaded = math.load(file)
+        self.assert_tree_equal(self.tree, loaded)
+        self.assertIsInstance(loaded['velocity']._native, np.memmap)
+        loaded['velocity']._native[...] = 0  # copy-on-write
+        self.assert_tree_equal(self.tree, math.load(file))
+
+    def test_save_raw_unsupported_tree(self):
+        file = os.path.join(self.directory, 'set.raw')
+        with self.assertRaises(ValueError):
+            math.save(file, {'ids': frozenset({1, 2}), 'values': math.range(spatial(x=4))}, format='raw')  # sets cannot be stored as JSON
+
+    def test_save_load_raw_sparse_constant_indices(self):
+        file = os.path.join(self.directory, 'sparse.raw')
+        indices = math.tensor([(0, 0), (1, 2), (2, 1)], instance('nnz'), channel(vector='x,~x'))
+        matrix = math.sparse_tensor(indices, math.random_normal(instance(nnz=3)), spatial(x=3) & dual(x=3), indices_constant=True)
+        for sparse in [matrix, math.to_format(matrix, 'csr')]:
+            math.save(file, {'m': sparse}, format='raw')
+            with open(file, 'rb') as stream:
+                self.assertNotIn(b'pickle', stream.read(4096))
+            loaded = math.load(file)['m']
+            self.assertEqual(type(sparse), type(loaded))
+            math.assert_close(math.dense(sparse), math.dense(loaded))
+
+    def test_load_paths(self):
+        for format in ['npz', 'raw']:
+            file = os.path.join(self.directory, 'tree.' + format)
+            math.save(file, self.tree, format=format)
+            loaded = math.load(file, paths=['root[velocity]', 'root[points]'])
+            self.assertEqual({'root[velocity]', 'root[points]'}, set(loaded))
+            math.assert_close(self.tree['velocity'], loaded['root[velocity]'])
+            math.assert_close(self.tree['points'], loaded['root[points]'])
+            with self.assertRaises(AssertionError):
+                math.load(file, paths=['root[missing]'])
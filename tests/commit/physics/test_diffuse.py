@@ -1,9 +1,10 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from phi import math, field
 from phi.field import CenteredGrid, Noise, StaggeredGrid
 from phiml.math import extrapolation, NotConverged, batch, spatial, wrap, vec
 from phi.physics import diffuse
+from phiml.math import _functional
 
 
 class TestDiffusion(TestCase):
@@ -79,5 +80,10 @@ class TestDiffusion(TestCase):
         result = diffuse.explicit(grid, diffusivity, 1).values
         math.assert_close(wrap([[0, 1, 0], [2, -5, 2], [0, 1, 0]], spatial('x,y')), result)
 
-
-
+    def test_implicit_diffusivity_change_reuses_pattern(self):
+        grid = CenteredGrid(Noise(), extrapolation.ZERO, x=16, y=16)
+        with mock.patch.object(_functional, 'matrix_from_tracer', wraps=_functional.matrix_from_tracer) as build_matrix:
+            for diffusivity in [0.5, 2., 1.]:
+                implicit = diffuse.implicit(grid, diffusivity, 1, solve=math.Solve('CG', 1e-6, 1e-6))
+                field.assert_close(grid, diffuse.explicit(implicit, diffusivity, -1), abs_tolerance=1e-4)
+        self.assertLessEqual(build_matrix.call_count, 1)  # later diffusivities only update the values
@@ -1,5 +1,5 @@
 from typing import Callable
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import phi
 from phi import math, field
@@ -7,7 +7,7 @@ from phi.geom import Box, Sphere
 from phi.field import StaggeredGrid, CenteredGrid, divergence, Noise
 from phiml.math import batch
 from phiml.backend import Backend
-from phiml.math.extrapolation import BOUNDARY, ZERO, PERIODIC, combine_sides
+from phiml.math.extrapolation import BOUNDARY, ZERO, ONE, PERIODIC, combine_sides
 from phi.physics import fluid
 
 
@@ -71,3 +71,51 @@ class FluidTest(TestCase):
                     assert math.isfinite(grad.values).all
                     grads.append(grad)
         math.assert_close(*grads, abs_tolerance=1e-5)
+
+    def test_make_incompressible_ilu_moving_obstacle(self):
+        velocity = StaggeredGrid(Noise(), 0, x=32, y=32)
+        for x in [10, 14]:  # the second obstacle reuses the matrix pattern of the first
+            obstacle = fluid.Obstacle(Box(x=(x, x + 6), y=(10, 20)))
+            velocity, _ = fluid.make_incompressible(velocity, [obstacle], math.Solve('CG', 1e-5, 1e-5, preconditioner='ilu'))
+            math.assert_close(0, divergence(velocity).values, abs_tolerance=1e-4)
+
+    def test_obstacle_masks_moving_window(self):
+        for boundary in [ZERO, PERIODIC, combine_sides(x=BOUNDARY, y=ZERO)]:
+            velocity = StaggeredGrid(Noise(), boundary, x=32, y=24)
+            for geometry in [Sphere(x=10.3, y=20.7, radius=3), Box(x=(0.5, 5), y=(16, 23.9))]:
+                obstacle = fluid.Obstacle(geometry, velocity=(1, 0))
+                windowed = fluid._soft_obstacle_mask(obstacle, velocity)
+                math.assert_close(field.resample(geometry, velocity, soft=True, balance=1).values, windowed.values, abs_tolerance=1e-5)
+
+    def test_obstacle_masks_moving_traced(self):
+        velocity = StaggeredGrid(Noise(), ZERO, x=32, y=24)
+        obstacles = [fluid.Obstacle(Sphere(x=10.3, y=20.7, radius=3), velocity=(1, 0))]
+        windowed = fluid._obstacle_masks(velocity, obstacles, ZERO)
+        all_available = math.all_available
+        traced_obstacles = lambda *values: not any(isinstance(v, Sphere) for v in values) and all_available(*values)  # positions are unknown while tracing
+        with mock.patch.object(fluid.math, 'all_available', traced_obstacles):
+            self.assertIsNone(fluid._windowed_sample(obstacles[0].geometry, velocity, 'center', ZERO))
+            full = fluid._obstacle_masks(velocity, obstacles, ZERO)
+        for windowed_mask, full_mask in zip(windowed, full):
+            math.assert_close(windowed_mask.values, full_mask.values)
+
+    def test_obstacle_masks_cached_per_velocity_boundary(self):
+        obstacles = [fluid.Obstacle(Box(x=(6, 10), y=(6, 10)))]
+        v_zero = StaggeredGrid(Noise(), ZERO, x=16, y=16)
+        v_one = StaggeredGrid(Noise(), ONE, x=16, y=16)  # same accessible boundary as ZERO
+        cached = [fluid.make_incompressible(v, obstacles)[0] for v in (v_zero, v_one)]
+        for v in (v_zero, v_one):
+            _, hard_bcs = fluid._obstacle_masks(v, obstacles, ZERO)
+            self.assertEqual(v.boundary, hard_bcs.boundary)
+        for v, cached_v in zip((v_zero, v_one), cached):
+            fluid._MASK_CACHE.clear()
+            field.assert_close(fluid.make_incompressible(v, obstacles)[0], cached_v, abs_tolerance=1e-5)
+
+    def test_obstacle_masks_cached(self):
+        velocity = StaggeredGrid(Noise(), ZERO, x=16, y=16)
+        obstacles = [fluid.Obstacle(Sphere(x=5, y=5, radius=2))]
+        masks1 = fluid._obstacle_masks(velocity, obstacles, ZERO)
+        masks2 = fluid._obstacle_masks(velocity, [fluid.Obstacle(Sphere(x=5, y=5, radius=2))], ZERO)
+        self.assertIs(masks1[1], masks2[1])
+        masks3 = fluid._obstacle_masks(velocity, [fluid.Obstacle(Sphere(x=6, y=5, radius=2))], ZERO)
+        self.assertIsNot(masks1[1], masks3[1])
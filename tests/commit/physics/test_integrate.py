@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from phi import math, field
+from phi.field import CenteredGrid, StaggeredGrid, Noise
+from phiml.math import extrapolation, spatial
+from phi.physics.integrate import euler, rk4, low_storage_rk4
+
+
+class TestIntegrate(TestCase):
+
+    def test_integrators_in_place(self):
+        u0 = math.random_normal(spatial(x=16))
+        for integrator, tolerance in [(euler, 1e-2), (rk4, 1e-6), (low_storage_rk4, 1e-6)]:
+            u = math.copy(u0)
+            u_new, = integrator(lambda u: (-u,), u, dt=.1)
+            math.assert_close(u0, u)
+            math.assert_close(u0 * math.exp(-.1), u_new, rel_tolerance=tolerance, abs_tolerance=1e-5)
+            u_in_place, = integrator(lambda u: (-u,), u, dt=.1, in_place=True)
+            math.assert_close(u_new, u_in_place, u, abs_tolerance=1e-6)
+
+    def test_low_storage_rk4_fields(self):
+        grid = CenteredGrid(Noise(), extrapolation.PERIODIC, x=8, y=8)
+        ref, = rk4(lambda v: (field.laplace(v),), grid, dt=.01)
+        low_storage, = low_storage_rk4(lambda v: (field.laplace(v),), grid, dt=.01, in_place=True)
+        field.assert_close(ref, low_storage, abs_tolerance=1e-5)
+        grid = StaggeredGrid(Noise(vector='x,y'), extrapolation.ZERO_GRADIENT, x=8, y=8)
+        ref, = rk4(lambda v: (-v,), grid, dt=.1)
+        low_storage, = low_storage_rk4(lambda v: (-v,), grid, dt=.1, in_place=True)
+        field.assert_close(ref, low_storage, abs_tolerance=1e-5)
+        self.assertEqual(extrapolation.ZERO_GRADIENT, low_storage.boundary)
+
+    def test_rk4_fused(self):
+        grid = CenteredGrid(Noise(), extrapolation.PERIODIC, x=8, y=8)
+        eager, = rk4(lambda v: (field.laplace(v),), grid, dt=.01)
+        fused, = rk4(lambda v: (field.laplace(v),), grid, dt=.01, fuse=True)
+        self.assertIsNone(getattr(fused.values, '_leaves', None))  # evaluated before returning
+        field.assert_close(eager, fused, abs_tolerance=1e-6)
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+
+def run_in_fresh_interpreter(code: str) -> str:
+    return subprocess.check_output([sys.executable, '-c', code], text=True, stderr=subprocess.DEVNULL).strip()
+
+
+class TestImportTime(TestCase):
+
+    def test_flow_import_is_lean(self):
+        heavy = ['matplotlib', 'plotly', 'dash', 'skimage', 'scipy.signal', 'scipy.stats', 'scipy.fft', 'scipy.ndimage', 'scipy.special', 'torch', 'jax', 'tensorflow']
+        loaded = run_in_fresh_interpreter(f"import sys; from phi.flow import *; print(','.join(m for m in {heavy} if m in sys.modules))")
+        self.assertEqual('', loaded, f"'from phi.flow import *' should not import {loaded}")
+
+    def test_flow_import_time(self):
+        seconds = float(run_in_fresh_interpreter("import time; t = time.perf_counter(); from phi.flow import *; print(time.perf_counter() - t)"))
+        self.assertLess(seconds, 5, f"'from phi.flow import *' took {seconds:.2f} s")
@@ -0,0 +1,55 @@
+import gc
+import os
+import weakref
+from os.path import dirname, abspath, join
+from unittest import TestCase
+
+import numpy as np
+
+from phi import math
+from phi.field import Scene
+from phi.vis import load_scalars
+from phi.vis._log import SceneLog
+
+DIR = join(dirname(dirname(dirname(dirname(abspath(__file__))))), 'test_data')
+
+
+class TestLog(TestCase):
+
+    def test_log_load_scalars(self):
+        scene = Scene.create(DIR, copy_calling_script=False)
+        log = SceneLog(scene, flush_interval=100)
+        for frame in range(5):
+            log.log_scalars(frame, math.mean, loss=frame * 2.)
+        frames, values = log.get_scalar_curve('loss')
+        np.testing.assert_equal([0, 1, 2, 3, 4], frames)
+        np.testing.assert_equal([0, 2, 4, 6, 8], values)
+        self.assertEqual(8, os.path.getsize(join(scene.path, 'log_loss.bin')))  # only the header, rows are still buffered
+        log.flush()
+        curve = load_scalars(scene, 'loss')
+        math.assert_close([0, 2, 4, 6, 8], curve.vector['loss'].batch[0])
+        log.close()
+        scene.remove()
+
+    def test_close(self):
+        scene = Scene.create(DIR, copy_calling_script=False)
+        with SceneLog(scene, flush_interval=100) as log:
+            log.log_scalars(0, math.mean, loss=1.)
+            stream = log._scalar_streams['loss']
+        self.assertTrue(stream.closed)
+        self.assertTrue(log.file_handler.stream is None)
+        math.assert_close([1.], load_scalars(scene, 'loss').vector['loss'].batch[0])
+        log.close()  # no effect
+        log_ref = weakref.ref(log)
+        del log
+        gc.collect()
+        self.assertIsNone(log_ref())  # not referenced by atexit
+        scene.remove()
+
+    def test_load_legacy_text_scalars(self):
+        scene = Scene.create(DIR, copy_calling_script=False)
+        with open(join(scene.path, 'log_loss.txt'), 'w') as f:
+            f.write("0 1.0\n1 0.5\n")
+        curve = load_scalars(scene, 'loss')
+        math.assert_close([1, .5], curve.vector['loss'].batch[0])
+        scene.remove()